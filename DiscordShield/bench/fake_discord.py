@@ -0,0 +1,267 @@
+import asyncio
+import itertools
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+import discord
+from discord.http import Route
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Snowflakes handed out to synthetic objects
+_snowflakes = itertools.count(1_100_000_000_000_000_000)
+
+def snowflake() -> int:
+    """Get a new unique ID."""
+    return next(_snowflakes)
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def user_payload(user_id: int, bot: bool = False) -> Dict[str, Any]:
+    """Build a USER object."""
+    return {
+        'id': str(user_id),
+        'username': f"user{user_id % 100000}",
+        'discriminator': '0',
+        'global_name': None,
+        'avatar': None,
+        'bot': bot
+    }
+
+def member_payload(user_id: int, roles: Optional[List[int]] = None, bot: bool = False) -> Dict[str, Any]:
+    """Build a GUILD_MEMBER object."""
+    return {
+        'user': user_payload(user_id, bot),
+        'roles': [str(role_id) for role_id in roles or ()],
+        'joined_at': _now(),
+        'deaf': False,
+        'mute': False,
+        'flags': 0
+    }
+
+def role_payload(role_id: int, name: str, position: int, permissions: int = 0) -> Dict[str, Any]:
+    """Build a ROLE object."""
+    return {
+        'id': str(role_id),
+        'name': name,
+        'color': 0,
+        'hoist': False,
+        'position': position,
+        'permissions': str(permissions),
+        'managed': False,
+        'mentionable': False,
+        'flags': 0
+    }
+
+def channel_payload(channel_id: int, guild_id: int, name: str, position: int = 0) -> Dict[str, Any]:
+    """Build a guild text CHANNEL object."""
+    return {
+        'id': str(channel_id),
+        'guild_id': str(guild_id),
+        'type': 0,
+        'name': name,
+        'position': position,
+        'permission_overwrites': [],
+        'nsfw': False,
+        'topic': None,
+        'last_message_id': None,
+        'rate_limit_per_user': 0
+    }
+
+class FakeGuild:
+    """IDs and payloads for a synthetic guild."""
+    
+    def __init__(self, members: int = 1000, channels: int = 5, reaction_roles: int = 5):
+        self.id = snowflake()
+        self.owner_id = snowflake()
+        self.bot_role_id = snowflake()
+        self.channel_ids = [snowflake() for _ in range(channels)]
+        self.reaction_role_ids = [snowflake() for _ in range(reaction_roles)]
+        self.member_ids = [self.owner_id] + [snowflake() for _ in range(members - 1)]
+        self.reaction_message_id = snowflake()
+    
+    def payload(self, bot_user_id: int) -> Dict[str, Any]:
+        """Build the GUILD_CREATE payload, with the bot holding the top role."""
+        roles = [role_payload(self.id, '@everyone', 0, 0)]
+        roles += [role_payload(role_id, f"reaction-{i}", i + 1) for i, role_id in enumerate(self.reaction_role_ids)]
+        roles.append(role_payload(self.bot_role_id, 'bench-bot', len(self.reaction_role_ids) + 1, 8))
+        
+        members = [member_payload(member_id) for member_id in self.member_ids]
+        members.append(member_payload(bot_user_id, [self.bot_role_id], bot=True))
+        
+        return {
+            'id': str(self.id),
+            'name': 'Bench Guild',
+            'owner_id': str(self.owner_id),
+            'icon': None,
+            'features': [],
+            'roles': roles,
+            'emojis': [],
+            'stickers': [],
+            'channels': [
+                channel_payload(channel_id, self.id, f"channel-{i}", i)
+                for i, channel_id in enumerate(self.channel_ids)
+            ],
+            'members': members,
+            'member_count': len(members),
+            'presences': [],
+            'voice_states': [],
+            'threads': [],
+            'stage_instances': [],
+            'guild_scheduled_events': [],
+            'large': len(members) > 250,
+            'verification_level': 0,
+            'explicit_content_filter': 0,
+            'default_message_notifications': 0,
+            'mfa_level': 0,
+            'nsfw_level': 0,
+            'premium_tier': 0,
+            'afk_timeout': 300,
+            'system_channel_id': None,
+            'system_channel_flags': 0,
+            'preferred_locale': 'en-US'
+        }
+
+class FakeRest:
+    """Stand-in for Discord's REST API with a fixed simulated round trip."""
+    
+    def __init__(self, bot_user_id: int, latency: float = 0.0):
+        self.bot_user_id = bot_user_id
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._patterns: Dict[str, re.Pattern] = {}
+    
+    def _params(self, route: Route) -> Dict[str, str]:
+        """Recover the path parameters from a route's URL."""
+        pattern = self._patterns.get(route.path)
+        if pattern is None:
+            regex = re.sub(r'\\{(\w+)\\}', r'(?P<\1>[^/]+)', re.escape(route.path))
+            pattern = self._patterns[route.path] = re.compile(regex + '$')
+        match = pattern.search(route.url)
+        return match.groupdict() if match else {}
+    
+    async def request(self, route: Route, **kwargs) -> Any:
+        """Answer a request the way Discord would, after the simulated latency."""
+        self.calls[route.key] = self.calls.get(route.key, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        
+        params = self._params(route)
+        body = kwargs.get('json') or {}
+        
+        if route.method == 'POST' and route.path == '/channels/{channel_id}/messages':
+            return {
+                'id': str(snowflake()),
+                'channel_id': params['channel_id'],
+                'author': user_payload(self.bot_user_id, bot=True),
+                'content': body.get('content') or '',
+                'timestamp': _now(),
+                'edited_timestamp': None,
+                'tts': False,
+                'mention_everyone': False,
+                'mentions': [],
+                'mention_roles': [],
+                'attachments': [],
+                'embeds': body.get('embeds') or [],
+                'pinned': False,
+                'type': 0,
+                'flags': 0
+            }
+        
+        if route.method == 'PATCH' and route.path == '/guilds/{guild_id}/members/{user_id}':
+            payload = member_payload(int(params['user_id']))
+            payload['communication_disabled_until'] = body.get('communication_disabled_until')
+            return payload
+        
+        if route.method == 'POST' and route.path == '/users/@me/channels':
+            return {
+                'id': str(snowflake()),
+                'type': 1,
+                'recipients': [user_payload(int(body['recipient_id']))]
+            }
+        
+        if route.method == 'PATCH' and route.path == '/channels/{channel_id}':
+            payload = channel_payload(int(params['channel_id']), int(route.guild_id or 0), body.get('name') or 'channel')
+            payload['permission_overwrites'] = body.get('permission_overwrites') or []
+            return payload
+        
+        return None
+
+class FakeGateway:
+    """Feeds synthetic gateway events into a bot's connection state."""
+    
+    def __init__(self, bot: discord.Client, rest_latency: float = 0.0):
+        self.bot = bot
+        self.state = bot._connection
+        self.bot_user_id = snowflake()
+        self.rest = FakeRest(self.bot_user_id, rest_latency)
+        self.guilds: List[FakeGuild] = []
+        self.message_ids = itertools.count(snowflake())
+    
+    async def connect(self):
+        """Set up the loop, the bot user and the fake REST layer."""
+        await self.bot._async_setup_hook()
+        self.state.user = discord.ClientUser(state=self.state, data=user_payload(self.bot_user_id, bot=True))
+        self.bot.http.request = self.rest.request
+    
+    def add_guild(self, guild: FakeGuild) -> discord.Guild:
+        """Create a guild as if it arrived in GUILD_CREATE."""
+        self.guilds.append(guild)
+        created = self.state._add_guild_from_data(guild.payload(self.bot_user_id))
+        self.bot.dispatch('guild_available', created)
+        return created
+    
+    def feed(self, event: str, payload: Dict[str, Any]):
+        """Parse a raw gateway event, dispatching its handlers."""
+        self.state.parsers[event](payload)
+    
+    def message(self, guild: FakeGuild, author_id: int, content: str, channel_index: int = 0) -> Dict[str, Any]:
+        """Build a MESSAGE_CREATE payload."""
+        return {
+            'id': str(next(self.message_ids)),
+            'channel_id': str(guild.channel_ids[channel_index % len(guild.channel_ids)]),
+            'guild_id': str(guild.id),
+            'author': user_payload(author_id),
+            'member': {'roles': [], 'joined_at': _now(), 'deaf': False, 'mute': False, 'flags': 0},
+            'content': content,
+            'timestamp': _now(),
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': [],
+            'pinned': False,
+            'type': 0,
+            'flags': 0
+        }
+    
+    def member_join(self, guild: FakeGuild, user_id: int) -> Dict[str, Any]:
+        """Build a GUILD_MEMBER_ADD payload."""
+        payload = member_payload(user_id)
+        payload['guild_id'] = str(guild.id)
+        return payload
+    
+    def reaction(self, guild: FakeGuild, user_id: int, emoji: str, message_id: Optional[int] = None) -> Dict[str, Any]:
+        """Build a MESSAGE_REACTION_ADD or MESSAGE_REACTION_REMOVE payload."""
+        return {
+            'user_id': str(user_id),
+            'channel_id': str(guild.channel_ids[0]),
+            'message_id': str(message_id or guild.reaction_message_id),
+            'guild_id': str(guild.id),
+            'emoji': {'id': None, 'name': emoji},
+            'type': 0,
+            'burst': False
+        }
+    
+    async def drain(self):
+        """Wait for every dispatched handler to finish."""
+        current = asyncio.current_task()
+        while True:
+            pending = [task for task in asyncio.all_tasks() if task is not current and not task.done()]
+            if not pending:
+                return
+            await asyncio.gather(*pending, return_exceptions=True)
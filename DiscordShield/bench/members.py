@@ -0,0 +1,122 @@
+"""Compare the memory held by the full member cache against the member LRU.
+
+Run from the DiscordShield directory:
+
+    python -m bench.members                                # both modes, 5 guilds of 20,000 members
+    python -m bench.members --guilds 20 --members 50000 --active 0.02
+    python -m bench.members --modes lru --capacity 10000 --json members.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import tempfile
+import tracemalloc
+from typing import Any, Dict, List, Optional
+import logging
+from bot.core import DiscordBot
+from bot.utils.member_cache import MEMBER_CACHE_MODES
+from bench.fake_discord import FakeGateway, FakeGuild
+
+logger = logging.getLogger(__name__)
+
+# Keep the bot's command log segments out of its real data directory
+LOG_DIR = os.path.join(tempfile.gettempdir(), 'discordshield-bench-logs')
+
+async def measure(mode: str, guilds: int, members: int, active: float, capacity: int, seed: int) -> Dict[str, Any]:
+    """Load synthetic guilds into a fresh bot and measure what its member caches hold."""
+    os.environ['MEMBER_CACHE'] = mode
+    os.environ['MEMBER_CACHE_SIZE'] = str(capacity)
+    rng = random.Random(seed)
+    
+    bot = DiscordBot()
+    bot.db.command_logs.directory = LOG_DIR
+    gateway = FakeGateway(bot)
+    await gateway.connect()
+    
+    fake_guilds = [FakeGuild(members) for _ in range(guilds)]
+    # Payloads are built up front so they aren't counted against either cache
+    payloads = [guild.payload(gateway.bot_user_id) for guild in fake_guilds]
+    messages = [
+        gateway.message(guild, author_id, "hello")
+        for guild in fake_guilds
+        for author_id in rng.sample(guild.member_ids, int(len(guild.member_ids) * active))
+    ]
+    
+    gc.collect()
+    tracemalloc.start()
+    
+    # As after GUILD_CREATE and, in full mode, chunking
+    for guild, payload in zip(fake_guilds, payloads):
+        gateway.guilds.append(guild)
+        gateway.state._add_guild_from_data(payload)
+    del payloads
+    gc.collect()
+    after_guilds = tracemalloc.get_traced_memory()[0]
+    
+    # Active members post once each, which is what fills the LRU
+    for payload in messages:
+        gateway.feed('MESSAGE_CREATE', payload)
+        await asyncio.sleep(0)
+    await gateway.drain()
+    del messages
+    gc.collect()
+    after_activity = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    gateway_members = sum(len(guild.members) for guild in bot.guilds)
+    result = {
+        'mode': mode,
+        'guilds': guilds,
+        'members_per_guild': members,
+        'gateway_members': gateway_members,
+        'lru_members': len(bot.members),
+        'after_guilds_mib': round(after_guilds / 1024 / 1024, 2),
+        'after_activity_mib': round(after_activity / 1024 / 1024, 2)
+    }
+    
+    await bot.close()
+    return result
+
+def print_report(results: List[Dict[str, Any]]):
+    """Print each mode's measurements side by side."""
+    print(f"{'mode':<8}{'gateway':>12}{'lru':>10}{'after guilds':>16}{'after activity':>18}")
+    for result in results:
+        print(
+            f"{result['mode']:<8}{result['gateway_members']:>12,}{result['lru_members']:>10,}"
+            f"{result['after_guilds_mib']:>12.1f} MiB{result['after_activity_mib']:>14.1f} MiB"
+        )
+    
+    if len(results) > 1:
+        baseline = results[0]['after_activity_mib']
+        for result in results[1:]:
+            if baseline:
+                print(f"{result['mode']} holds {result['after_activity_mib'] / baseline:.1%} of {results[0]['mode']}")
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark member cache memory in each mode")
+    parser.add_argument('--modes', nargs='+', choices=MEMBER_CACHE_MODES, default=list(MEMBER_CACHE_MODES), help="Modes to measure")
+    parser.add_argument('--guilds', type=int, default=5, help="Synthetic guilds to load")
+    parser.add_argument('--members', type=int, default=20000, help="Members per guild")
+    parser.add_argument('--active', type=float, default=0.05, help="Share of each guild's members who post a message")
+    parser.add_argument('--capacity', type=int, default=50000, help="Member LRU capacity")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for picking active members")
+    parser.add_argument('--json', help="Also write the results to this file")
+    parser.add_argument('--log-level', default='CRITICAL', help="Log level for the bot while benchmarking")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=args.log_level.upper())
+    
+    results = []
+    for mode in args.modes:
+        results.append(await measure(mode, args.guilds, args.members, args.active, args.capacity, args.seed))
+    print_report(results)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,266 @@
+"""Micro-benchmarks for the Database and EconomyUtils hot paths.
+
+Run from the DiscordShield directory:
+
+    python -m bench.micro                              # every benchmark at every size
+    python -m bench.micro get_leaderboard --sizes 1000 100000
+    python -m bench.micro --save main                  # store a baseline in bench/baselines/main.json
+    python -m bench.micro --compare main               # report changes against a stored baseline
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Callable, Optional
+from bot.utils.database import Database
+from bot.utils.economy import EconomyUtils
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+GUILD_ID = 1
+
+# Spilled command logs go somewhere disposable
+LOG_DIR = os.path.join(tempfile.gettempdir(), 'discordshield-bench-logs')
+
+MEMBER_SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+SHOP_SIZES = [10, 50, 250]
+
+class Benchmark:
+    """A function timed against state built for a given size."""
+    
+    def __init__(self, name: str, setup: Callable[[int], Any], make: Callable[[Any], Callable[[], Any]], sizes: List[int], unit: str = 'members'):
+        self.name = name
+        self.setup = setup
+        self.make = make
+        self.sizes = sizes
+        self.unit = unit
+
+def populated_database(members: int) -> Database:
+    """Build a database with one guild holding a balance for every member."""
+    db = Database()
+    db.command_logs.directory = LOG_DIR
+    db.init_guild(GUILD_ID)
+    rng = random.Random(members)
+    now = datetime.utcnow()
+    accounts = db.economy[GUILD_ID]
+    for user_id in range(1, members + 1):
+        accounts[user_id] = {'tokens': rng.randint(0, 1_000_000), 'last_passive': now}
+    return db
+
+def warned_database(members: int) -> Database:
+    """Build a database where every member has one to three warnings."""
+    db = Database()
+    rng = random.Random(members)
+    for user_id in range(1, members + 1):
+        for _ in range(rng.randint(1, 3)):
+            db.add_warning(GUILD_ID, user_id, "benchmark", 0)
+    return db
+
+def _random_users(members: int) -> Callable[[], int]:
+    """Cycle through a fixed list of random member IDs."""
+    rng = random.Random(0)
+    users = [rng.randint(1, members) for _ in range(1024)]
+    index = [0]
+    
+    def next_user() -> int:
+        index[0] = (index[0] + 1) & 1023
+        return users[index[0]]
+    return next_user
+
+def _passive_setup(members: int) -> Database:
+    db = populated_database(members)
+    # Half the accounts are due a payout
+    earlier = datetime.utcnow() - timedelta(hours=10)
+    for user_id, data in db.economy[GUILD_ID].items():
+        if user_id % 2:
+            data['last_passive'] = earlier
+    return db
+
+def _shop_items(count: int) -> Dict[str, Dict[str, Any]]:
+    return {
+        f"Item {i}": {'price': i * 250, 'type': 'role', 'description': f"Description for item number {i}"}
+        for i in range(count)
+    }
+
+def _with_members(build: Callable[[int], Database]) -> Callable[[int], Any]:
+    """Pair a database setup with the member count, for workloads that pick random members."""
+    def setup(members: int):
+        return build(members), members
+    return setup
+
+BENCHMARKS = {
+    benchmark.name: benchmark for benchmark in (
+        Benchmark(
+            'get_balance',
+            _with_members(populated_database),
+            lambda state: (lambda db=state[0], user=_random_users(state[1]): db.get_balance(GUILD_ID, user())),
+            MEMBER_SIZES
+        ),
+        Benchmark(
+            'add_tokens',
+            _with_members(populated_database),
+            lambda state: (lambda db=state[0], user=_random_users(state[1]): db.add_tokens(GUILD_ID, user(), 5)),
+            MEMBER_SIZES
+        ),
+        Benchmark(
+            'get_leaderboard',
+            populated_database,
+            lambda db: (lambda: db.get_leaderboard(GUILD_ID, 10)),
+            MEMBER_SIZES
+        ),
+        Benchmark(
+            'get_warnings',
+            _with_members(warned_database),
+            lambda state: (lambda db=state[0], user=_random_users(state[1]): db.get_warnings(GUILD_ID, user())),
+            MEMBER_SIZES
+        ),
+        Benchmark(
+            'log_command',
+            _with_members(populated_database),
+            lambda state: (lambda db=state[0], user=_random_users(state[1]): db.log_command(GUILD_ID, user(), 'balance', True)),
+            MEMBER_SIZES
+        ),
+        Benchmark(
+            'update_passive_earning',
+            _with_members(_passive_setup),
+            lambda state: (lambda db=state[0], user=_random_users(state[1]): db.update_passive_earning(GUILD_ID, user())),
+            MEMBER_SIZES
+        ),
+        Benchmark(
+            'generate_shop_embed_description',
+            _shop_items,
+            lambda items: (lambda: EconomyUtils.generate_shop_embed_description(items)),
+            SHOP_SIZES,
+            unit='items'
+        )
+    )
+}
+
+def measure(func: Callable[[], Any], repeat: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    """Time a function, returning per-call nanoseconds."""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    
+    gc.collect()
+    runs = [total / number * 1e9 for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'best_ns': round(min(runs), 1),
+        'median_ns': round(statistics.median(runs), 1),
+        'calls': number
+    }
+
+def run(names: List[str], sizes: Optional[List[int]], repeat: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Run benchmarks, returning results keyed by benchmark then size."""
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for name in names:
+        benchmark = BENCHMARKS[name]
+        results[name] = {}
+        for size in sizes or benchmark.sizes:
+            state = benchmark.setup(size)
+            result = measure(benchmark.make(state), repeat=repeat)
+            results[name][str(size)] = result
+            print(f"{name:<34}{size:>10,} {benchmark.unit:<8}{_format_ns(result['best_ns']):>12}{_format_ns(result['median_ns']):>12}")
+            del state
+            gc.collect()
+    return results
+
+def _format_ns(ns: float) -> str:
+    """Format a duration in the most readable unit."""
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+def save_baseline(name: str, results: Dict[str, Any]):
+    """Store results as a named baseline, merging with any earlier runs of other benchmarks."""
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    baseline = load_baseline(name) or {'results': {}}
+    for benchmark, sizes in results.items():
+        baseline['results'].setdefault(benchmark, {}).update(sizes)
+    baseline['python'] = platform.python_version()
+    baseline['machine'] = platform.machine()
+    baseline['saved_at'] = datetime.utcnow().isoformat(timespec='seconds')
+    
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    print(f"\nSaved baseline to {path}")
+
+def load_baseline(name: str) -> Optional[Dict[str, Any]]:
+    """Load a named baseline if it exists."""
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any], threshold: float) -> int:
+    """Print a comparison against a baseline. Returns the number of regressions."""
+    print(f"\nCompared with baseline from {baseline.get('saved_at')} (Python {baseline.get('python')})")
+    print(f"{'benchmark':<34}{'size':>10}{'baseline':>12}{'current':>12}{'change':>10}")
+    
+    regressions = 0
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            old = baseline['results'].get(name, {}).get(size)
+            if not old:
+                print(f"{name:<34}{int(size):>10,}{'-':>12}{_format_ns(result['best_ns']):>12}{'new':>10}")
+                continue
+            
+            change = (result['best_ns'] - old['best_ns']) / old['best_ns']
+            marker = ''
+            if change > threshold:
+                marker = '  slower'
+                regressions += 1
+            elif change < -threshold:
+                marker = '  faster'
+            print(
+                f"{name:<34}{int(size):>10,}{_format_ns(old['best_ns']):>12}"
+                f"{_format_ns(result['best_ns']):>12}{change:>+10.1%}{marker}"
+            )
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark Database and EconomyUtils hot paths")
+    parser.add_argument('benchmarks', nargs='*', help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--sizes', type=int, nargs='+', help="Override the sizes each benchmark runs at")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing repeats per size (best is reported)")
+    parser.add_argument('--save', metavar='NAME', help="Store the results as a baseline")
+    parser.add_argument('--compare', metavar='NAME', help="Compare the results with a stored baseline")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Relative change reported as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit non-zero if anything regressed")
+    args = parser.parse_args(argv)
+    
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    
+    baseline = None
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        if baseline is None:
+            parser.error(f"no baseline named {args.compare} in {BASELINE_DIR}")
+    
+    print(f"{'benchmark':<34}{'size':>10}{'':9}{'best':>12}{'median':>12}")
+    results = run(args.benchmarks or list(BENCHMARKS), args.sizes, args.repeat)
+    
+    regressions = 0
+    if baseline:
+        regressions = compare(baseline, results, args.threshold)
+    if args.save:
+        save_baseline(args.save, results)
+    
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Load test the bot against an in-process fake gateway and REST layer.
+
+Run from the DiscordShield directory:
+
+    python -m bench.run                       # every scenario
+    python -m bench.run spam_burst --events 20000 --rate 2000
+    python -m bench.run --members 50000 --rest-latency 0.05 --trace-allocs --json results.json
+"""
+import argparse
+import asyncio
+import functools
+import gc
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Any, Optional
+import logging
+from bot.core import DiscordBot
+from bench.fake_discord import FakeGateway
+from bench.scenarios import SCENARIOS
+
+logger = logging.getLogger(__name__)
+
+# Keep the bot's command log segments out of its real data directory
+LOG_DIR = os.path.join(tempfile.gettempdir(), 'discordshield-bench-logs')
+
+def memory_kb() -> Dict[str, int]:
+    """Get current and peak resident set size in KiB."""
+    usage = {'rss_kb': 0, 'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    usage['rss_kb'] = int(line.split()[1])
+                elif line.startswith('VmHWM:'):
+                    usage['peak_rss_kb'] = int(line.split()[1])
+    except OSError:
+        pass
+    return usage
+
+def _time_sync(bot: DiscordBot, name: str, func):
+    """Wrap a plain function so every call is timed under a name."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with bot.metrics.timer(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+def instrument_hot_paths(bot: DiscordBot):
+    """Time the checks and database calls that handlers spend their time in."""
+    bot.check_spam = bot.metrics.instrument('check.spam', bot.check_spam)
+    
+    moderation = bot.moderation_events
+    moderation.check_scam = bot.metrics.instrument('check.scam', moderation.check_scam)
+    moderation.check_word_filter = bot.metrics.instrument('check.word_filter', moderation.check_word_filter)
+    moderation.check_raid_detection = bot.metrics.instrument('check.raid_detection', moderation.check_raid_detection)
+    moderation.handle_reaction_role = bot.metrics.instrument('check.reaction_role', moderation.handle_reaction_role)
+    
+    for name in ('get_balance', 'add_tokens', 'get_leaderboard', 'update_passive_earning', 'log_command'):
+        setattr(bot.db, name, _time_sync(bot, f"db.{name}", getattr(bot.db, name)))
+
+async def run_scenario(name: str, events: int, rate: float, members: int, rest_latency: float, trace_allocs: bool) -> Dict[str, Any]:
+    """Run one scenario against a fresh bot and collect its measurements."""
+    scenario = SCENARIOS[name]
+    
+    bot = DiscordBot()
+    bot.db.command_logs.directory = LOG_DIR
+    gateway = FakeGateway(bot, rest_latency)
+    await gateway.connect()
+    instrument_hot_paths(bot)
+    
+    context = await scenario.setup(gateway, members)
+    await gateway.drain()
+    
+    # Only measure the event stream, not guild setup
+    bot.metrics.histograms.clear()
+    stream = list(scenario.events(gateway, context, events))
+    rest_before = sum(gateway.rest.calls.values())
+    
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    if trace_allocs:
+        tracemalloc.start()
+    
+    start = time.perf_counter()
+    for i, feed in enumerate(stream):
+        feed()
+        if rate:
+            # Hold the requested rate, sleeping only when ahead of schedule
+            delay = start + (i + 1) / rate - time.perf_counter()
+            await asyncio.sleep(max(delay, 0))
+        else:
+            await asyncio.sleep(0)
+    await gateway.drain()
+    elapsed = time.perf_counter() - start
+    
+    traced_peak = None
+    if trace_allocs:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+    
+    await bot.close()
+    
+    return {
+        'scenario': name,
+        'events': events,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_per_s': round(events / elapsed, 1) if elapsed else 0,
+        'rest_calls': sum(gateway.rest.calls.values()) - rest_before,
+        'allocated_blocks_delta': blocks_after - blocks_before,
+        'traced_peak_kb': round(traced_peak / 1024, 1) if traced_peak is not None else None,
+        **memory_kb(),
+        'handlers': bot.metrics.snapshot()
+    }
+
+def print_report(result: Dict[str, Any]):
+    """Print one scenario's results as a table."""
+    print(f"\n== {result['scenario']}: {SCENARIOS[result['scenario']].description}")
+    print(
+        f"{result['events']} events in {result['elapsed_s']:.3f}s "
+        f"({result['throughput_per_s']:,.0f}/s), {result['rest_calls']} REST calls"
+    )
+    memory = f"rss {result['rss_kb'] / 1024:.1f} MiB, peak {result['peak_rss_kb'] / 1024:.1f} MiB, "
+    memory += f"{result['allocated_blocks_delta']:+,} live blocks"
+    if result['traced_peak_kb'] is not None:
+        memory += f", traced peak {result['traced_peak_kb'] / 1024:.1f} MiB"
+    print(memory)
+    
+    print(f"{'handler':<34}{'calls':>9}{'calls/s':>11}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for handler, summary in result['handlers'].items():
+        per_second = summary['count'] / result['elapsed_s'] if result['elapsed_s'] else 0
+        print(
+            f"{handler:<34}{summary['count']:>9}{per_second:>11,.0f}"
+            f"{summary['p50_ms']:>10.3f}{summary['p99_ms']:>10.3f}{summary['max_ms']:>10.3f}"
+        )
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test DiscordShield with a fake gateway")
+    parser.add_argument('scenarios', nargs='*', help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--events', type=int, default=5000, help="Events per scenario")
+    parser.add_argument('--rate', type=float, default=0, help="Events per second (0 feeds as fast as possible)")
+    parser.add_argument('--members', type=int, default=1000, help="Members in the synthetic guild")
+    parser.add_argument('--rest-latency', type=float, default=0.0, help="Simulated REST round trip in seconds")
+    parser.add_argument('--trace-allocs', action='store_true', help="Track allocations with tracemalloc (slower)")
+    parser.add_argument('--json', help="Also write the results to this file")
+    parser.add_argument('--log-level', default='CRITICAL', help="Log level for the bot while benchmarking")
+    args = parser.parse_args(argv)
+    
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    
+    logging.basicConfig(level=args.log_level.upper())
+    
+    results = []
+    for name in args.scenarios or list(SCENARIOS):
+        result = await run_scenario(name, args.events, args.rate, args.members, args.rest_latency, args.trace_allocs)
+        print_report(result)
+        results.append(result)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
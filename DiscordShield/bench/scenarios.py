@@ -0,0 +1,145 @@
+import random
+from typing import Dict, List, Any, Callable, Iterator
+import discord
+from bench.fake_discord import FakeGateway, FakeGuild, snowflake
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Emoji used for reaction role storms
+REACTION_EMOJI = ['🔴', '🟢', '🔵', '🟡', '🟣']
+
+class FakeResponse:
+    """Interaction response that records what a command sent."""
+    
+    def __init__(self):
+        self.sent: List[Dict[str, Any]] = []
+        self._done = False
+    
+    def is_done(self) -> bool:
+        return self._done
+    
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.sent.append({'content': content, **kwargs})
+    
+    async def defer(self, **kwargs):
+        self._done = True
+
+class FakeInteraction:
+    """Just enough of an interaction to invoke a slash command callback."""
+    
+    def __init__(self, guild: discord.Guild, user: discord.Member):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = guild.text_channels[0]
+        self.response = FakeResponse()
+        self.followup = self.response
+        self.extras: Dict[str, Any] = {}
+
+class Scenario:
+    """A named stream of synthetic events."""
+    
+    def __init__(self, name: str, description: str, setup: Callable, events: Callable):
+        self.name = name
+        self.description = description
+        self.setup = setup
+        self.events = events
+
+async def _setup_guild(gateway: FakeGateway, members: int) -> FakeGuild:
+    guild = FakeGuild(members=members)
+    gateway.add_guild(guild)
+    return guild
+
+# Spam burst: a handful of users each sending messages far faster than the spam limit,
+# mixed with ordinary chatter and some word filter hits
+
+async def spam_setup(gateway: FakeGateway, members: int) -> Dict[str, Any]:
+    guild = await _setup_guild(gateway, members)
+    gateway.bot.db.word_filters[guild.id] = ['badword', 'scamlink', 'freenitro']
+    return {'guild': guild}
+
+def spam_events(gateway: FakeGateway, context: Dict[str, Any], count: int) -> Iterator[Callable]:
+    guild = context['guild']
+    spammers = guild.member_ids[1:11]
+    for i in range(count):
+        if i % 3 == 0:
+            author = random.choice(guild.member_ids)
+        else:
+            author = spammers[i % len(spammers)]
+        content = "get freenitro here" if i % 50 == 0 else f"message number {i} with some ordinary words"
+        payload = gateway.message(guild, author, content, channel_index=i)
+        yield lambda payload=payload: gateway.feed('MESSAGE_CREATE', payload)
+
+# Raid joins: a wave of new accounts joining within seconds
+
+async def raid_setup(gateway: FakeGateway, members: int) -> Dict[str, Any]:
+    return {'guild': await _setup_guild(gateway, members)}
+
+def raid_events(gateway: FakeGateway, context: Dict[str, Any], count: int) -> Iterator[Callable]:
+    guild = context['guild']
+    for _ in range(count):
+        payload = gateway.member_join(guild, snowflake())
+        yield lambda payload=payload: gateway.feed('GUILD_MEMBER_ADD', payload)
+
+# Reaction role storm: members toggling reaction roles on a single message
+
+async def reaction_setup(gateway: FakeGateway, members: int) -> Dict[str, Any]:
+    guild = await _setup_guild(gateway, members)
+    gateway.bot.db.reaction_roles[guild.id] = {
+        guild.reaction_message_id: {
+            emoji: role_id for emoji, role_id in zip(REACTION_EMOJI, guild.reaction_role_ids)
+        }
+    }
+    return {'guild': guild}
+
+def reaction_events(gateway: FakeGateway, context: Dict[str, Any], count: int) -> Iterator[Callable]:
+    guild = context['guild']
+    for i in range(count):
+        user_id = guild.member_ids[1 + i % (len(guild.member_ids) - 1)]
+        payload = gateway.reaction(guild, user_id, REACTION_EMOJI[i % len(REACTION_EMOJI)])
+        event = 'MESSAGE_REACTION_ADD' if (i // len(REACTION_EMOJI)) % 2 == 0 else 'MESSAGE_REACTION_REMOVE'
+        yield lambda payload=payload, event=event: gateway.feed(event, payload)
+
+# Economy flood: members hammering the economy commands
+
+async def economy_setup(gateway: FakeGateway, members: int) -> Dict[str, Any]:
+    from bot.commands.economy import EconomyCommands
+    
+    guild = await _setup_guild(gateway, members)
+    for member_id in guild.member_ids:
+        gateway.bot.db.set_balance(guild.id, member_id, random.randint(0, 50000))
+    
+    return {'guild': guild, 'cog': EconomyCommands(gateway.bot)}
+
+def economy_events(gateway: FakeGateway, context: Dict[str, Any], count: int) -> Iterator[Callable]:
+    guild = gateway.bot.get_guild(context['guild'].id)
+    cog = context['cog']
+    members = [member for member in guild.members if not member.bot]
+    commands = [
+        (cog.balance, lambda: {}),
+        (cog.leaderboard, lambda: {}),
+        (cog.give, lambda: {'user': random.choice(members), 'amount': 1})
+    ]
+    # Time callbacks the way the command tree would
+    callbacks = [
+        (gateway.bot.metrics.instrument(f"command.{command.name}", command.callback), arguments)
+        for command, arguments in commands
+    ]
+    for i in range(count):
+        callback, arguments = callbacks[i % len(callbacks)]
+        interaction = FakeInteraction(guild, members[i % len(members)])
+        kwargs = arguments()
+        yield lambda callback=callback, interaction=interaction, kwargs=kwargs: gateway.bot.loop.create_task(
+            callback(cog, interaction, **kwargs)
+        )
+
+SCENARIOS = {
+    scenario.name: scenario for scenario in (
+        Scenario('spam_burst', "Message bursts from spammers mixed with normal chatter", spam_setup, spam_events),
+        Scenario('raid_joins', "Waves of member joins", raid_setup, raid_events),
+        Scenario('reaction_storm', "Reaction role adds and removes", reaction_setup, reaction_events),
+        Scenario('economy_flood', "/balance, /leaderboard and /give invoked in a loop", economy_setup, economy_events)
+    )
+}
@@ -0,0 +1,174 @@
+"""Fuzz and benchmark the shared time expression parser.
+
+Run from the DiscordShield directory:
+
+    python -m bench.timeparse                    # fuzz, then benchmark
+    python -m bench.timeparse --iterations 200000 --seed 7
+    python -m bench.timeparse --skip-bench       # fuzz only, exits non-zero on any failure
+"""
+import argparse
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from zoneinfo import ZoneInfo
+from bot.utils import time_parser
+from bot.utils.time_parser import parse_duration, parse_time
+
+NOW = datetime(2025, 6, 15, 12, 0, 0)
+
+UNIT_SPELLINGS = {
+    'w': ['w', 'wk', 'wks', 'week', 'weeks'],
+    'd': ['d', 'day', 'days'],
+    'h': ['h', 'hr', 'hrs', 'hour', 'hours'],
+    'm': ['m', 'min', 'mins', 'minute', 'minutes'],
+    's': ['s', 'sec', 'secs', 'second', 'seconds']
+}
+
+SEPARATORS = ['', ' ', '  ', ', ', ' and ']
+
+ZONES = ['Europe/Berlin', 'America/New_York', 'Asia/Kolkata', 'Australia/Sydney', 'UTC']
+
+# Characters random inputs are drawn from, biased towards ones the grammar cares about
+ALPHABET = "0123456789" * 3 + "wdhms" * 2 + " :-+/TZUCGaenrtuoi,_" + "é\t\n"
+
+def legacy_duration(text: str) -> Optional[timedelta]:
+    """The single-unit parser /lock, /remindme and /giveaway used before the shared one."""
+    for suffix, unit in (('m', 'minutes'), ('h', 'hours'), ('d', 'days')):
+        if text.endswith(suffix):
+            try:
+                return timedelta(**{unit: int(text[:-1])})
+            except ValueError:
+                return None
+    return None
+
+def random_duration(rng: random.Random):
+    """Build a random compound duration and the number of seconds it should parse to."""
+    units = rng.sample(list(UNIT_SPELLINGS), rng.randint(1, 5))
+    terms = []
+    seconds = 0
+    for unit in units:
+        amount = rng.randint(0, 500)
+        spelling = rng.choice(UNIT_SPELLINGS[unit])
+        if rng.random() < 0.3:
+            spelling = spelling.upper()
+        terms.append(f"{amount}{rng.choice(['', ' '])}{spelling}")
+        seconds += amount * time_parser.UNIT_SECONDS[unit]
+    
+    text = terms[0]
+    for term in terms[1:]:
+        text += rng.choice(SEPARATORS) + term
+    return rng.choice(['', ' ']) + text + rng.choice(['', ' ']), seconds
+
+def random_absolute(rng: random.Random):
+    """Build a random absolute time with a timezone and the naive UTC datetime it should parse to."""
+    moment = NOW + timedelta(minutes=rng.randint(1, 2 * 365 * 24 * 60))
+    moment = moment.replace(second=0)
+    offset_minutes = rng.randrange(-12 * 60, 14 * 60 + 1, 15)
+    zone = timezone(timedelta(minutes=offset_minutes))
+    local = moment.replace(tzinfo=timezone.utc).astimezone(zone)
+    
+    sign = '-' if offset_minutes < 0 else '+'
+    hours, minutes = divmod(abs(offset_minutes), 60)
+    suffix = rng.choice([
+        f" UTC{sign}{hours}:{minutes:02d}",
+        f" {sign}{hours:02d}{minutes:02d}",
+        f"{sign}{hours:02d}:{minutes:02d}"
+    ])
+    return f"{local:%Y-%m-%d %H:%M}{suffix}", moment
+
+def fuzz(iterations: int, seed: int) -> List[str]:
+    """Check the parser's invariants on generated inputs. Returns failure descriptions."""
+    rng = random.Random(seed)
+    failures = []
+    
+    def check(condition: bool, message: str):
+        if not condition and len(failures) < 50:
+            failures.append(message)
+    
+    for _ in range(iterations):
+        # Arbitrary input never raises and only yields None or a datetime
+        text = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 24)))
+        try:
+            result = parse_time(text, NOW)
+            check(result is None or isinstance(result, datetime), f"{text!r} returned {result!r}")
+        except Exception as e:
+            check(False, f"{text!r} raised {e!r}")
+        
+        # Well-formed compound durations parse to their exact length
+        text, seconds = random_duration(rng)
+        result = parse_duration(text)
+        check(result == timedelta(seconds=seconds), f"{text!r} parsed to {result!r}, expected {seconds}s")
+        
+        # Absolute times with an offset land on the right UTC instant
+        text, expected = random_absolute(rng)
+        result = parse_time(text, NOW)
+        check(result == expected, f"{text!r} parsed to {result!r}, expected {expected!r}")
+        
+        # Anything the old parser accepted still means the same thing
+        text = f"{rng.randint(0, 10_000)}{rng.choice('mhd')}"
+        check(parse_duration(text) == legacy_duration(text), f"{text!r} differs from the old parser")
+    
+    # Named zones follow their DST rules
+    for zone in ZONES:
+        for month in (1, 7):
+            text = f"2026-{month:02d}-01 09:00 {zone}"
+            expected = datetime(2026, month, 1, 9, 0, tzinfo=ZoneInfo(zone)).astimezone(timezone.utc).replace(tzinfo=None)
+            result = parse_time(text, NOW)
+            check(result == expected, f"{text!r} parsed to {result!r}, expected {expected!r}")
+    return failures
+
+def benchmark(number: int = 20000):
+    """Time the parser on a realistic mix of inputs, with and without the memo cache."""
+    inputs = ['30m', '2h', '1d', '1h30m', '2 hours', '45 minutes', '1d 12h', '14:30', '12-25 14:30', '2025-12-25 14:30 UTC+2', 'soon']
+    legacy_inputs = ['30m', '2h', '1d']
+    
+    def cold():
+        time_parser._duration_seconds.cache_clear()
+        time_parser._absolute_parts.cache_clear()
+        for text in inputs:
+            parse_time(text, NOW)
+    
+    def warm():
+        for text in inputs:
+            parse_time(text, NOW)
+    
+    def durations():
+        for text in legacy_inputs:
+            parse_duration(text)
+    
+    def legacy():
+        for text in legacy_inputs:
+            legacy_duration(text)
+    
+    cases = [
+        ('parse_time cold', cold, len(inputs)),
+        ('parse_time warm', warm, len(inputs)),
+        ('parse_duration warm', durations, len(legacy_inputs)),
+        ('old /lock parser', legacy, len(legacy_inputs))
+    ]
+    print(f"\n{'benchmark':<24}{'per input':>12}")
+    for name, func, per_call in cases:
+        calls = number // per_call
+        best = min(timeit.repeat(func, number=calls, repeat=5))
+        print(f"{name:<24}{best / calls / per_call * 1e9:>9.0f} ns")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fuzz and benchmark the time expression parser")
+    parser.add_argument('--iterations', type=int, default=20000, help="Fuzz rounds (each checks four inputs)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the fuzzer")
+    parser.add_argument('--skip-bench', action='store_true', help="Only run the fuzzer")
+    args = parser.parse_args(argv)
+    
+    failures = fuzz(args.iterations, args.seed)
+    print(f"fuzzed {args.iterations * 4:,} inputs, {len(failures)} failures")
+    for failure in failures:
+        print(f"  {failure}")
+    
+    if not args.skip_bench:
+        benchmark()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
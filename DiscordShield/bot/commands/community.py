@@ -2,9 +2,13 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from datetime import datetime, timedelta
-import random
 import logging
 from ..utils.permissions import moderator_only, admin_only, Permissions
+from ..utils.time_parser import parse_duration, parse_timezone, timezone_name, DURATION_EXAMPLES
+from ..utils.database import BIRTHDAY_HOUR
+from ..utils.question_bank import MAX_QUESTION_LENGTH, MAX_QUESTIONS
+from ..utils.scheduler import QOTD_TEMPLATE, qotd_offset
+from ..utils.giveaways import GiveawayEntries, GIVEAWAY_EMOJI, WEIGHT_MODES, TOKENS_PER_ENTRY, MAX_BALANCE_ENTRIES, ROLE_BONUS_ENTRIES
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +37,7 @@ class CommunityCommands(commands.Cog):
             # Get the message
             try:
                 message_id_int = int(message_id)
-                message = await interaction.channel.fetch_message(message_id_int)
+                message = await self.bot.rest.response(interaction.channel, lambda: interaction.channel.fetch_message(message_id_int))
             except (ValueError, discord.NotFound):
                 await interaction.response.send_message(
                     "❌ Invalid message ID or message not found in this channel!",
@@ -58,7 +62,7 @@ class CommunityCommands(commands.Cog):
             
             # Add reaction to message
             try:
-                await message.add_reaction(emoji)
+                await self.bot.rest.response(message, lambda: message.add_reaction(emoji))
             except discord.HTTPException:
                 await interaction.response.send_message(
                     f"❌ Failed to add reaction {emoji}! Make sure it's a valid emoji.",
@@ -97,13 +101,16 @@ class CommunityCommands(commands.Cog):
             )
     
     @app_commands.command(name="birthday", description="Set your birthday")
-    @app_commands.describe(date="Your birthday in MM-DD format (e.g., 03-15)")
-    async def birthday(self, interaction: discord.Interaction, date: str):
+    @app_commands.describe(
+        date="Your birthday in MM-DD format (e.g., 03-15)",
+        timezone="Your timezone, e.g. UTC, UTC+2, -05:00 or Europe/Berlin (default UTC)"
+    )
+    async def birthday(self, interaction: discord.Interaction, date: str, timezone: str = "UTC"):
         """Set user's birthday."""
         try:
-            # Validate date format
+            # Validate date format (against a leap year so 02-29 is accepted)
             try:
-                datetime.strptime(date, "%m-%d")
+                date = datetime.strptime(f"2000-{date.strip()}", "%Y-%m-%d").strftime("%m-%d")
             except ValueError:
                 await interaction.response.send_message(
                     "❌ Invalid date format! Use MM-DD format (e.g., 03-15 for March 15th).",
@@ -111,18 +118,26 @@ class CommunityCommands(commands.Cog):
                 )
                 return
             
-            # Store birthday
-            self.bot.db.birthdays[interaction.guild.id][interaction.user.id] = {
-                'date': date,
-                'year': None,  # Don't store year for privacy
-                'set_at': datetime.utcnow()
-            }
+            # Named zones are stored by name so the announcement follows their DST changes
+            zone = parse_timezone(timezone)
+            utc_offset = zone.utcoffset(datetime.utcnow()) if zone else None
+            if utc_offset is None or not timedelta(hours=-12) <= utc_offset <= timedelta(hours=14):
+                await interaction.response.send_message(
+                    "❌ Invalid timezone! Use formats like `UTC`, `UTC+2`, `-05:00` or `Europe/Berlin`.",
+                    ephemeral=True
+                )
+                return
+            
+            # Store birthday and re-arm the birthday timer in case it's due sooner
+            self.bot.db.set_birthday(interaction.guild.id, interaction.user.id, date, timezone_name(zone))
+            await self.bot.scheduler.schedule_birthdays()
             
             embed = discord.Embed(
                 title="🎂 Birthday Set",
                 description=(
                     f"Your birthday has been set to **{date}**!\n\n"
-                    "You'll receive a special birthday message and bonus tokens on your birthday."
+                    f"You'll receive a special birthday message and bonus tokens at "
+                    f"{BIRTHDAY_HOUR:02d}:00 ({timezone}) on your birthday."
                 ),
                 color=discord.Color.purple(),
                 timestamp=datetime.utcnow()
@@ -143,7 +158,7 @@ class CommunityCommands(commands.Cog):
     @app_commands.command(name="qotd", description="Manage question of the day")
     @app_commands.describe(
         action="Action to perform",
-        question="Question for manual QOTD"
+        question="Question to post, add to or remove from this server's question bank"
     )
     @moderator_only()
     async def qotd(
@@ -154,13 +169,17 @@ class CommunityCommands(commands.Cog):
     ):
         """Manage question of the day."""
         try:
-            if action.lower() not in ['post', 'schedule', 'status']:
+            if action.lower() not in ['post', 'schedule', 'status', 'add', 'remove', 'list']:
                 await interaction.response.send_message(
-                    "❌ Invalid action! Use: `post`, `schedule`, or `status`",
+                    "❌ Invalid action! Use: `post`, `schedule`, `status`, `add`, `remove`, or `list`",
                     ephemeral=True
                 )
                 return
             
+            if action.lower() in ['add', 'remove', 'list']:
+                await self.manage_question_bank(interaction, action.lower(), question)
+                return
+            
             qotd_channel_id = self.bot.db.get_guild_config(interaction.guild.id, 'qotd_channel')
             
             if action.lower() == 'status':
@@ -171,13 +190,19 @@ class CommunityCommands(commands.Cog):
                 else:
                     channel_text = "Not set"
                 
-                qotd_hour = self.bot.db.get_guild_config(interaction.guild.id, 'qotd_hour') or 9
+                qotd_hour = self.bot.db.get_guild_config(interaction.guild.id, 'qotd_hour')
+                if qotd_hour is None:
+                    qotd_hour = 9
+                qotd_minute = qotd_offset(interaction.guild.id) // 60
+                bank = self.bot.db.get_question_bank(interaction.guild.id)
+                bank_text = f"{len(bank.questions)} custom" if bank.questions else f"{len(bank.pool())} built-in"
                 
                 embed = discord.Embed(
                     title="📝 Question of the Day Status",
                     description=(
                         f"**Channel:** {channel_text}\n"
-                        f"**Scheduled Time:** {qotd_hour:02d}:00 UTC daily\n"
+                        f"**Scheduled Time:** {qotd_hour:02d}:{qotd_minute:02d} UTC daily\n"
+                        f"**Questions:** {bank_text}\n"
                         f"**Status:** {'Enabled' if qotd_channel_id else 'Disabled'}"
                     ),
                     color=discord.Color.blue(),
@@ -205,31 +230,16 @@ class CommunityCommands(commands.Cog):
             if action.lower() == 'post':
                 # Post question now
                 if not question:
-                    # Use random question
-                    questions = [
-                        "What's your favorite hobby and why?",
-                        "If you could travel anywhere, where would you go?",
-                        "What's the best advice you've ever received?",
-                        "What's your favorite season and why?",
-                        "If you could have dinner with anyone, who would it be?",
-                        "What's a skill you'd like to learn?",
-                        "What's your favorite book or movie?",
-                        "If you could change one thing about the world, what would it be?",
-                        "What's the most interesting place you've visited?",
-                        "What's your dream job?"
-                    ]
-                    question = random.choice(questions)
+                    # Next question from this server's rotation
+                    question = self.bot.db.next_qotd_question(interaction.guild.id)
                 
-                qotd_embed = discord.Embed(
-                    title="📝 Question of the Day",
+                qotd_embed = QOTD_TEMPLATE.render(
                     description=question,
-                    color=discord.Color.purple(),
-                    timestamp=datetime.utcnow()
+                    footer={'text': f"Posted by {interaction.user.display_name}"}
                 )
-                qotd_embed.set_footer(text=f"Posted by {interaction.user.display_name}")
                 
-                message = await channel.send(embed=qotd_embed)
-                await message.add_reaction("💭")
+                message = await self.bot.rest.response(channel, lambda: channel.send(embed=qotd_embed))
+                await self.bot.rest.response(message, lambda: message.add_reaction("💭"))
                 
                 await interaction.response.send_message(
                     f"✅ QOTD posted in {channel.mention}!",
@@ -246,6 +256,68 @@ class CommunityCommands(commands.Cog):
                 ephemeral=True
             )
     
+    async def manage_question_bank(self, interaction: discord.Interaction, action: str, question: str = None):
+        """Add, remove or list the questions in this server's QOTD rotation."""
+        bank = self.bot.db.get_question_bank(interaction.guild.id)
+        
+        if action == 'list':
+            questions = bank.questions or bank.pool()
+            lines = [f"**{i}.** {q}" for i, q in enumerate(questions[:25], 1)]
+            if len(questions) > 25:
+                lines.append(f"...and {len(questions) - 25} more")
+            
+            embed = discord.Embed(
+                title="📝 QOTD Questions",
+                description="\n".join(lines),
+                color=discord.Color.blue()
+            )
+            embed.set_footer(text="Custom questions" if bank.questions else "Built-in questions • use /qotd add to add your own")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        if not question:
+            await interaction.response.send_message(
+                f"❌ Please provide a question to {action}!",
+                ephemeral=True
+            )
+            return
+        
+        question = question.strip()
+        if action == 'add':
+            if len(question) > MAX_QUESTION_LENGTH:
+                await interaction.response.send_message(
+                    f"❌ Questions can be at most {MAX_QUESTION_LENGTH} characters!",
+                    ephemeral=True
+                )
+                return
+            
+            if not bank.add(question):
+                await interaction.response.send_message(
+                    f"❌ That question is already in the bank, or the bank is full ({MAX_QUESTIONS} questions)!",
+                    ephemeral=True
+                )
+                return
+            
+            await interaction.response.send_message(
+                f"✅ Added to the QOTD rotation ({len(bank.questions)} custom questions).",
+                ephemeral=True
+            )
+        else:
+            if not bank.remove(question):
+                await interaction.response.send_message(
+                    "❌ That question isn't in this server's question bank!",
+                    ephemeral=True
+                )
+                return
+            
+            remaining = f"{len(bank.questions)} custom questions left" if bank.questions else "using the built-in questions again"
+            await interaction.response.send_message(
+                f"✅ Removed from the QOTD rotation ({remaining}).",
+                ephemeral=True
+            )
+        
+        self.bot.db.log_command(interaction.guild.id, interaction.user.id, f"qotd {action}", True)
+    
     @app_commands.command(name="ticket", description="Create a support ticket")
     @app_commands.describe(topic="Brief description of your issue")
     async def ticket(self, interaction: discord.Interaction, topic: str):
@@ -283,17 +355,18 @@ class CommunityCommands(commands.Cog):
             }
             
             # Add moderators to ticket
-            for role in interaction.guild.roles:
-                if (role.permissions.administrator or 
-                    role.permissions.manage_channels or 
-                    role.permissions.manage_messages):
-                    overwrites[role] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
-            
-            ticket_channel = await interaction.guild.create_text_channel(
-                name=f"ticket-{interaction.user.name}",
-                category=category,
-                overwrites=overwrites,
-                topic=f"Support ticket by {interaction.user} - {topic}"
+            for role in self.bot.permission_cache.ticket_roles_for(interaction.guild):
+                overwrites[role] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+            
+            ticket_channel = await self.bot.rest.response(
+                interaction.guild,
+                lambda: interaction.guild.create_text_channel(
+                    name=f"ticket-{interaction.user.name}",
+                    category=category,
+                    overwrites=overwrites,
+                    topic=f"Support ticket by {interaction.user} - {topic}"
+                ),
+                key=f"ticket:{interaction.guild.id}:{interaction.user.id}"
             )
             
             # Store ticket info
@@ -332,11 +405,11 @@ class CommunityCommands(commands.Cog):
                 inline=False
             )
             
-            message = await ticket_channel.send(
-                f"{interaction.user.mention} Welcome to your support ticket!",
-                embed=ticket_embed
+            message = await self.bot.rest.response(
+                ticket_channel,
+                lambda: ticket_channel.send(f"{interaction.user.mention} Welcome to your support ticket!", embed=ticket_embed)
             )
-            await message.add_reaction("🔒")
+            await self.bot.rest.response(message, lambda: message.add_reaction("🔒"))
             
             await interaction.response.send_message(
                 f"✅ Ticket created! Please check {ticket_channel.mention}",
@@ -355,9 +428,11 @@ class CommunityCommands(commands.Cog):
     
     @app_commands.command(name="giveaway", description="Create a giveaway")
     @app_commands.describe(
-        duration="Duration (e.g., 1h, 30m, 2d)",
+        duration="Duration (e.g., 1h, 30m, 1h30m, 2d)",
         winners="Number of winners",
-        prize="What you're giving away"
+        prize="What you're giving away",
+        weighting="Extra entries by token balance or bonus role: none, balance, or role",
+        bonus_role=f"Role whose members get {ROLE_BONUS_ENTRIES} entries when weighting by role"
     )
     @moderator_only()
     async def giveaway(
@@ -365,35 +440,19 @@ class CommunityCommands(commands.Cog):
         interaction: discord.Interaction,
         duration: str,
         winners: int,
-        prize: str
+        prize: str,
+        weighting: str = "none",
+        bonus_role: discord.Role = None
     ):
         """Create a giveaway."""
         try:
             # Parse duration
-            end_time = None
-            
-            if duration.endswith('m'):
-                try:
-                    minutes = int(duration[:-1])
-                    end_time = datetime.utcnow() + timedelta(minutes=minutes)
-                except ValueError:
-                    pass
-            elif duration.endswith('h'):
-                try:
-                    hours = int(duration[:-1])
-                    end_time = datetime.utcnow() + timedelta(hours=hours)
-                except ValueError:
-                    pass
-            elif duration.endswith('d'):
-                try:
-                    days = int(duration[:-1])
-                    end_time = datetime.utcnow() + timedelta(days=days)
-                except ValueError:
-                    pass
+            giveaway_duration = parse_duration(duration)
+            end_time = datetime.utcnow() + giveaway_duration if giveaway_duration else None
             
             if not end_time:
                 await interaction.response.send_message(
-                    "❌ Invalid duration format! Use formats like: `30m`, `2h`, `1d`",
+                    f"❌ Invalid duration format! Use formats like: {DURATION_EXAMPLES}",
                     ephemeral=True
                 )
                 return
@@ -428,6 +487,28 @@ class CommunityCommands(commands.Cog):
                 )
                 return
             
+            weighting = weighting.lower()
+            if weighting not in WEIGHT_MODES:
+                await interaction.response.send_message(
+                    "❌ Weighting must be `none`, `balance`, or `role`!",
+                    ephemeral=True
+                )
+                return
+            
+            if weighting == 'role' and not bonus_role:
+                await interaction.response.send_message(
+                    "❌ Please choose a bonus role when weighting by role!",
+                    ephemeral=True
+                )
+                return
+            
+            if weighting == 'balance':
+                weighting_text = f"**Bonus Entries:** +1 per {TOKENS_PER_ENTRY:,} tokens (up to {MAX_BALANCE_ENTRIES} entries)\n"
+            elif weighting == 'role':
+                weighting_text = f"**Bonus Entries:** {bonus_role.mention} members get {ROLE_BONUS_ENTRIES} entries\n"
+            else:
+                weighting_text = ""
+            
             # Create giveaway embed
             embed = discord.Embed(
                 title="🎉 GIVEAWAY 🎉",
@@ -435,8 +516,9 @@ class CommunityCommands(commands.Cog):
                     f"**Prize:** {prize}\n"
                     f"**Winners:** {winners}\n"
                     f"**Ends:** <t:{int(end_time.timestamp())}:F>\n"
-                    f"**Time Left:** <t:{int(end_time.timestamp())}:R>\n\n"
-                    "React with 🎉 to enter!"
+                    f"**Time Left:** <t:{int(end_time.timestamp())}:R>\n"
+                    f"{weighting_text}\n"
+                    f"React with {GIVEAWAY_EMOJI} to enter!"
                 ),
                 color=discord.Color.gold(),
                 timestamp=end_time
@@ -445,7 +527,6 @@ class CommunityCommands(commands.Cog):
             
             await interaction.response.send_message(embed=embed)
             message = await interaction.original_response()
-            await message.add_reaction("🎉")
             
             # Store giveaway
             giveaway_id = f"{interaction.guild.id}-{message.id}"
@@ -457,9 +538,15 @@ class CommunityCommands(commands.Cog):
                 'prize': prize,
                 'winners': winners,
                 'end_time': end_time,
+                'weighting': weighting,
+                'bonus_role_id': bonus_role.id if weighting == 'role' else None,
                 'created_at': datetime.utcnow()
             }
             
+            # Entries are recorded from reaction events from here on
+            self.bot.db.giveaway_entries[message.id] = GiveawayEntries()
+            await self.bot.rest.response(message, lambda: message.add_reaction(GIVEAWAY_EMOJI))
+            
             # Schedule giveaway end
             await self.bot.scheduler.schedule_giveaway_end(
                 interaction.guild.id,
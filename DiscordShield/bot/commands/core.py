@@ -4,6 +4,7 @@ from discord import app_commands
 from datetime import datetime, timedelta
 import logging
 from ..utils.permissions import admin_only, moderator_only, owner_only, Permissions
+from ..utils.time_parser import parse_time, parse_duration, DURATION_EXAMPLES
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +18,7 @@ class CoreCommands(commands.Cog):
     @app_commands.describe(
         message="The message to announce",
         channel="The channel to send the announcement to",
-        time="Time in format: YYYY-MM-DD HH:MM or in X minutes/hours/days",
+        time="When to post: a duration like 1h30m or a time like 2024-12-25 14:30 UTC+2",
         repeat="Repeat frequency (once, daily, weekly)"
     )
     @moderator_only()
@@ -31,45 +32,16 @@ class CoreCommands(commands.Cog):
     ):
         """Schedule an announcement."""
         try:
-            # Parse time
-            scheduled_time = None
-            
-            # Check if it's a relative time (e.g., "30 minutes", "2 hours", "1 day")
-            if any(unit in time.lower() for unit in ["minute", "hour", "day"]):
-                parts = time.lower().split()
-                if len(parts) >= 2:
-                    try:
-                        amount = int(parts[0])
-                        unit = parts[1]
-                        
-                        if "minute" in unit:
-                            scheduled_time = datetime.utcnow() + timedelta(minutes=amount)
-                        elif "hour" in unit:
-                            scheduled_time = datetime.utcnow() + timedelta(hours=amount)
-                        elif "day" in unit:
-                            scheduled_time = datetime.utcnow() + timedelta(days=amount)
-                    except ValueError:
-                        pass
-            else:
-                # Try to parse absolute time
-                try:
-                    scheduled_time = datetime.strptime(time, "%Y-%m-%d %H:%M")
-                except ValueError:
-                    try:
-                        scheduled_time = datetime.strptime(time, "%m-%d %H:%M")
-                        # Assume current year
-                        scheduled_time = scheduled_time.replace(year=datetime.utcnow().year)
-                    except ValueError:
-                        pass
+            # Parse time (a duration from now or an absolute date and time)
+            scheduled_time = parse_time(time)
             
             if not scheduled_time:
                 await interaction.response.send_message(
                     "❌ Invalid time format. Use formats like:\n"
-                    "• `30 minutes`\n"
-                    "• `2 hours`\n"
-                    "• `1 day`\n"
-                    "• `2024-12-25 14:30`\n"
-                    "• `12-25 14:30`",
+                    "• `30 minutes`, `2h`, `1h30m`, `1 day`\n"
+                    "• `14:30`, `12-25 14:30`, `2024-12-25 14:30`\n"
+                    "• `2024-12-25 14:30 UTC+2`, `2024-12-25 09:00 Europe/Berlin`\n"
+                    "Times without a timezone are UTC.",
                     ephemeral=True
                 )
                 return
@@ -162,7 +134,7 @@ class CoreCommands(commands.Cog):
                 color=discord.Color.blue(),
                 timestamp=datetime.utcnow()
             )
-            await channel.send(embed=test_embed)
+            await self.bot.rest.background(channel, lambda: channel.send(embed=test_embed))
             
             # Log the action
             self.bot.db.log_command(interaction.guild.id, interaction.user.id, "logset", True)
@@ -177,37 +149,19 @@ class CoreCommands(commands.Cog):
     @app_commands.command(name="lock", description="Lock a single channel for a set duration")
     @app_commands.describe(
         channel="The channel to lock",
-        duration="Duration in format: Xm (minutes), Xh (hours), Xd (days)"
+        duration="Duration, e.g. 30m, 2h, 1h30m, 1d"
     )
     @moderator_only()
     async def lock(self, interaction: discord.Interaction, channel: discord.TextChannel, duration: str):
         """Lock a channel for a specified duration."""
         try:
             # Parse duration
-            duration_seconds = None
-            
-            if duration.endswith('m'):
-                try:
-                    minutes = int(duration[:-1])
-                    duration_seconds = minutes * 60
-                except ValueError:
-                    pass
-            elif duration.endswith('h'):
-                try:
-                    hours = int(duration[:-1])
-                    duration_seconds = hours * 3600
-                except ValueError:
-                    pass
-            elif duration.endswith('d'):
-                try:
-                    days = int(duration[:-1])
-                    duration_seconds = days * 86400
-                except ValueError:
-                    pass
+            lock_duration = parse_duration(duration)
+            duration_seconds = int(lock_duration.total_seconds()) if lock_duration else None
             
             if not duration_seconds or duration_seconds <= 0:
                 await interaction.response.send_message(
-                    "❌ Invalid duration format. Use formats like: `30m`, `2h`, `1d`",
+                    f"❌ Invalid duration format. Use formats like: {DURATION_EXAMPLES}",
                     ephemeral=True
                 )
                 return
@@ -231,7 +185,11 @@ class CoreCommands(commands.Cog):
             
             overwrites[everyone_role].send_messages = False
             
-            await channel.edit(overwrites=overwrites, reason=f"Channel locked by {interaction.user}")
+            await self.bot.rest.safety(
+                channel,
+                lambda: channel.edit(overwrites=overwrites, reason=f"Channel locked by {interaction.user}"),
+                key=f"lock:{channel.id}"
+            )
             
             # Store lock info
             unlock_time = datetime.utcnow() + timedelta(seconds=duration_seconds)
@@ -263,7 +221,7 @@ class CoreCommands(commands.Cog):
                 color=discord.Color.orange(),
                 timestamp=datetime.utcnow()
             )
-            await channel.send(embed=lock_embed)
+            await self.bot.rest.response(channel, lambda: channel.send(embed=lock_embed))
             
             # Schedule unlock
             await self._schedule_unlock(channel.id, duration_seconds)
@@ -300,9 +258,10 @@ class CoreCommands(commands.Cog):
                         
                         overwrites[everyone_role].send_messages = False
                         
-                        await channel.edit(
-                            overwrites=overwrites, 
-                            reason=f"Server lockdown by {interaction.user}"
+                        await self.bot.rest.safety(
+                            channel,
+                            lambda: channel.edit(overwrites=overwrites, reason=f"Server lockdown by {interaction.user}"),
+                            key=f"lock:{channel.id}"
                         )
                         locked_channels.append(channel.mention)
                         
@@ -360,9 +319,10 @@ class CoreCommands(commands.Cog):
                         if everyone_role in overwrites:
                             overwrites[everyone_role].send_messages = None
                             
-                            await channel.edit(
-                                overwrites=overwrites,
-                                reason="Automatic unlock after duration expired"
+                            await self.bot.rest.response(
+                                channel,
+                                lambda: channel.edit(overwrites=overwrites, reason="Automatic unlock after duration expired"),
+                                key=f"unlock:{channel.id}"
                             )
                             
                             # Send unlock notification
@@ -372,7 +332,7 @@ class CoreCommands(commands.Cog):
                                 color=discord.Color.green(),
                                 timestamp=datetime.utcnow()
                             )
-                            await channel.send(embed=unlock_embed)
+                            await self.bot.rest.background(channel, lambda: channel.send(embed=unlock_embed))
                             
                     except Exception as e:
                         logger.error(f"Failed to auto-unlock channel {channel_id}: {e}")
@@ -5,9 +5,14 @@ from datetime import datetime
 import random
 import logging
 from ..utils.economy import EconomyUtils
+from ..utils.embeds import EmbedTemplate
+from ..utils.leaderboard import LeaderboardView
 
 logger = logging.getLogger(__name__)
 
+SHOP_TEMPLATE = EmbedTemplate(title="🛒 Server Shop", color=discord.Color.purple())
+SHOP_FOOTER = {'text': "Use /buy <item_name> to purchase items"}
+
 class EconomyCommands(commands.Cog):
     """Economy commands for the bot."""
     
@@ -188,7 +193,7 @@ class EconomyCommands(commands.Cog):
                         color=discord.Color.red(),
                         timestamp=datetime.utcnow()
                     )
-                    await user.send(embed=dm_embed)
+                    await self.bot.rest.response(self.bot.rest.dm_bucket(user), lambda: user.send(embed=dm_embed))
                 except discord.Forbidden:
                     pass  # User has DMs disabled
             
@@ -269,7 +274,7 @@ class EconomyCommands(commands.Cog):
                     color=discord.Color.green(),
                     timestamp=datetime.utcnow()
                 )
-                await user.send(embed=dm_embed)
+                await self.bot.rest.response(self.bot.rest.dm_bucket(user), lambda: user.send(embed=dm_embed))
             except discord.Forbidden:
                 pass  # User has DMs disabled
             
@@ -287,9 +292,10 @@ class EconomyCommands(commands.Cog):
     async def leaderboard(self, interaction: discord.Interaction):
         """View economy leaderboard."""
         try:
-            leaderboard = self.bot.db.get_leaderboard(interaction.guild.id, 10)
+            # Shared snapshot, rebuilt at most once per TTL
+            snapshot = self.bot.leaderboards.get(interaction.guild)
             
-            if not leaderboard:
+            if not snapshot.entries:
                 embed = discord.Embed(
                     title="📊 Token Leaderboard",
                     description="No users with tokens found!",
@@ -298,34 +304,9 @@ class EconomyCommands(commands.Cog):
                 await interaction.response.send_message(embed=embed)
                 return
             
-            embed = discord.Embed(
-                title="📊 Token Leaderboard",
-                description="Top 10 richest users in the server",
-                color=discord.Color.gold(),
-                timestamp=datetime.utcnow()
-            )
-            
-            for i, (user_id, tokens) in enumerate(leaderboard, 1):
-                user = interaction.guild.get_member(user_id)
-                if user:
-                    rank_name, rank_emoji = EconomyUtils.get_balance_rank(tokens)
-                    
-                    if i == 1:
-                        medal = "🥇"
-                    elif i == 2:
-                        medal = "🥈"
-                    elif i == 3:
-                        medal = "🥉"
-                    else:
-                        medal = f"#{i}"
-                    
-                    embed.add_field(
-                        name=f"{medal} {user.display_name}",
-                        value=f"{rank_emoji} {EconomyUtils.format_balance(tokens)} tokens",
-                        inline=False
-                    )
-            
-            await interaction.response.send_message(embed=embed)
+            view = LeaderboardView(self.bot.leaderboards, interaction)
+            content, embed = view.render()
+            await interaction.response.send_message(content=content, embed=embed, view=view)
             
             # Log the action
             self.bot.db.log_command(interaction.guild.id, interaction.user.id, "leaderboard", True)
@@ -341,17 +322,12 @@ class EconomyCommands(commands.Cog):
     async def shop(self, interaction: discord.Interaction):
         """View the server shop."""
         try:
-            shop_items = self.bot.db.get_shop_items(interaction.guild.id)
-            
-            embed = discord.Embed(
-                title="🛒 Server Shop",
-                description=EconomyUtils.generate_shop_embed_description(shop_items),
-                color=discord.Color.purple(),
-                timestamp=datetime.utcnow()
-            )
+            # Rendered once per guild, until an item is added or removed
+            description = self.bot.embeds.get(interaction.guild, 'shop', self.build_shop_description)
             
-            if shop_items:
-                embed.set_footer(text="Use /buy <item_name> to purchase items")
+            embed = SHOP_TEMPLATE.render(description=description)
+            if self.bot.db.get_shop_items(interaction.guild.id):
+                embed.set_footer(**SHOP_FOOTER)
             
             await interaction.response.send_message(embed=embed)
             
@@ -365,6 +341,10 @@ class EconomyCommands(commands.Cog):
                 ephemeral=True
             )
     
+    def build_shop_description(self, guild) -> str:
+        """Build a guild's shop listing."""
+        return EconomyUtils.generate_shop_embed_description(self.bot.db.get_shop_items(guild.id))
+    
     @app_commands.command(name="buy", description="Buy an item from the shop")
     @app_commands.describe(item="The name of the item to buy")
     async def buy(self, interaction: discord.Interaction, item: str):
@@ -467,7 +447,8 @@ class EconomyCommands(commands.Cog):
             average_tokens = total_tokens // total_users if total_users > 0 else 0
             
             richest_user_id, max_tokens = leaderboard[0] if leaderboard else (None, 0)
-            richest_user = interaction.guild.get_member(richest_user_id) if richest_user_id else None
+            # A mention resolves client-side, so showing the richest user needs no member lookup
+            richest_is_member = richest_user_id and self.bot.members.in_guild(interaction.guild, richest_user_id)
             
             embed = discord.Embed(
                 title="📈 Server Economy Statistics",
@@ -493,10 +474,10 @@ class EconomyCommands(commands.Cog):
                 inline=True
             )
             
-            if richest_user:
+            if richest_is_member:
                 embed.add_field(
                     name="👑 Richest User",
-                    value=f"{richest_user.display_name}\n{EconomyUtils.format_balance(max_tokens)}",
+                    value=f"<@{richest_user_id}>\n{EconomyUtils.format_balance(max_tokens)}",
                     inline=True
                 )
             
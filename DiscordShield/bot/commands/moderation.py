@@ -2,11 +2,15 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from datetime import datetime, timedelta
+import re
 import logging
 from ..utils.permissions import moderator_only, admin_only, Permissions
+from ..utils.denylist import ID_LIMIT, REASON_NAMES
 
 logger = logging.getLogger(__name__)
 
+MESSAGE_LINK_PATTERN = re.compile(r'^(?:https?://(?:\w+\.)?discord(?:app)?\.com/channels/(\d+)/(\d+)/)?(\d+)/?$')
+
 class ModerationCommands(commands.Cog):
     """Moderation commands for the bot."""
     
@@ -52,9 +56,10 @@ class ModerationCommands(commands.Cog):
                 interaction.user.id
             )
             
+            await self.bot.scheduler.schedule_warning_expiry()
+            
             # Get current warnings count
-            warnings = self.bot.db.get_warnings(interaction.guild.id, user.id)
-            warnings_count = len(warnings)
+            warnings_count = self.bot.db.count_warnings(interaction.guild.id, user.id)
             
             embed = discord.Embed(
                 title="⚠️ User Warned",
@@ -84,14 +89,18 @@ class ModerationCommands(commands.Cog):
                     color=discord.Color.yellow(),
                     timestamp=datetime.utcnow()
                 )
-                await user.send(embed=dm_embed)
+                await self.bot.rest.response(self.bot.rest.dm_bucket(user), lambda: user.send(embed=dm_embed))
             except discord.Forbidden:
                 pass  # User has DMs disabled
             
             # Auto-kick on 3 warnings
             if warnings_count >= 3:
                 try:
-                    await user.kick(reason="Auto-kick: 3 active warnings")
+                    await self.bot.rest.safety(
+                        user,
+                        lambda: user.kick(reason="Auto-kick: 3 active warnings"),
+                        key=f"kick:{interaction.guild.id}:{user.id}"
+                    )
                     
                     kick_embed = discord.Embed(
                         title="🦶 Auto-Kick Executed",
@@ -147,15 +156,12 @@ class ModerationCommands(commands.Cog):
             )
             
             for i, warning in enumerate(warnings, 1):
-                moderator = interaction.guild.get_member(warning['moderator'])
-                moderator_name = moderator.display_name if moderator else "Unknown"
-                
                 embed.add_field(
                     name=f"Warning #{i}",
                     value=(
                         f"**ID:** {warning['id']}\n"
                         f"**Reason:** {warning['reason']}\n"
-                        f"**Moderator:** {moderator_name}\n"
+                        f"**Moderator:** <@{warning['moderator']}>\n"
                         f"**Date:** <t:{int(warning['timestamp'].timestamp())}:R>"
                     ),
                     inline=False
@@ -243,7 +249,10 @@ class ModerationCommands(commands.Cog):
                     return message.author == user
                 return True
             
-            deleted = await interaction.channel.purge(limit=amount, check=check)
+            deleted = await self.bot.rest.response(
+                interaction.channel,
+                lambda: interaction.channel.purge(limit=amount, check=check)
+            )
             
             embed = discord.Embed(
                 title="🧹 Messages Cleared",
@@ -269,6 +278,174 @@ class ModerationCommands(commands.Cog):
                 ephemeral=True
             )
     
+    @app_commands.command(name="unlist", description="Remove a user from the shared denylist")
+    @app_commands.describe(user_id="ID of the user to remove, e.g. an innocent account caught in a raid")
+    # Unlisting affects every participating server, so it takes more than moderation rights
+    @admin_only()
+    async def unlist(self, interaction: discord.Interaction, user_id: str):
+        """Remove a wrongly reported user from the shared denylist."""
+        try:
+            if self.bot.db.get_guild_config(interaction.guild.id, 'denylist') in (None, 'off'):
+                await interaction.response.send_message(
+                    "❌ This server doesn't take part in the shared denylist!",
+                    ephemeral=True
+                )
+                return
+            
+            user_id = user_id.strip()
+            if not (user_id.isascii() and user_id.isdigit() and 0 < int(user_id) < ID_LIMIT):
+                await interaction.response.send_message("❌ That isn't a valid user ID!", ephemeral=True)
+                return
+            
+            target_id = int(user_id)
+            reason = self.bot.denylist.reason(target_id)
+            if reason is None:
+                await interaction.response.send_message(
+                    f"❌ <@{target_id}> isn't on the shared denylist.",
+                    ephemeral=True
+                )
+                return
+            self.bot.denylist.remove(target_id)
+            
+            embed = discord.Embed(
+                title="✅ User Unlisted",
+                description=(
+                    f"**User:** <@{target_id}> ({target_id})\n"
+                    f"**Listed for:** {REASON_NAMES.get(reason, 'unknown')}\n"
+                    f"Bans made while they were listed stay in place in each server."
+                ),
+                color=discord.Color.green(),
+                timestamp=datetime.utcnow()
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            await self.bot.logging_events.log_action(
+                interaction.guild,
+                "Denylist Entry Removed",
+                (
+                    f"**Moderator:** {interaction.user.mention}\n"
+                    f"**User:** <@{target_id}> ({target_id})\n"
+                    f"**Listed for:** {REASON_NAMES.get(reason, 'unknown')}"
+                ),
+                discord.Color.green()
+            )
+            
+            # Log the action
+            self.bot.db.log_command(interaction.guild.id, interaction.user.id, "unlist", True)
+            
+        except Exception as e:
+            logger.error(f"Error in unlist command: {e}")
+            await interaction.response.send_message(
+                "❌ An error occurred while unlisting the user.",
+                ephemeral=True
+            )
+    
+    @app_commands.command(name="flagscam", description="Flag a scam message so copies are removed in every server")
+    @app_commands.describe(
+        message="Link to the message, or its ID if it's in this channel",
+        include_links="Also flag the domains the message links to (default: yes)"
+    )
+    @moderator_only()
+    async def flagscam(self, interaction: discord.Interaction, message: str, include_links: bool = True):
+        """Flag a message in the shared scam cache and delete it."""
+        try:
+            if self.bot.db.get_guild_config(interaction.guild.id, 'scam_filter') != 'on':
+                await interaction.response.send_message(
+                    "❌ This server doesn't take part in the shared scam filter! An admin can enable it with `/serverconfig scam_filter on`.",
+                    ephemeral=True
+                )
+                return
+            
+            match = MESSAGE_LINK_PATTERN.match(message.strip())
+            if not match or (match.group(1) and int(match.group(1)) != interaction.guild.id):
+                await interaction.response.send_message(
+                    "❌ Give a link to a message in this server, or a message ID from this channel!",
+                    ephemeral=True
+                )
+                return
+            
+            channel = interaction.guild.get_channel_or_thread(int(match.group(2))) if match.group(2) else interaction.channel
+            message_id = int(match.group(3))
+            if channel is None:
+                await interaction.response.send_message("❌ I can't see that channel!", ephemeral=True)
+                return
+            
+            await interaction.response.defer(ephemeral=True)
+            
+            # Logged guilds usually still hold the message, which saves a fetch
+            target = None
+            cached = await self.bot.message_cache.get(interaction.guild.id, message_id)
+            if cached is not None:
+                content = cached.content
+            else:
+                try:
+                    target = await self.bot.rest.response(channel, lambda: channel.fetch_message(message_id))
+                except discord.NotFound:
+                    await interaction.followup.send("❌ That message doesn't exist!", ephemeral=True)
+                    return
+                content = target.content
+            
+            if not content:
+                await interaction.followup.send("❌ That message has no text to flag!", ephemeral=True)
+                return
+            
+            fingerprinted, domains = self.bot.scam_cache.flag(content, include_domains=include_links)
+            if not fingerprinted and not domains:
+                await interaction.followup.send(
+                    "❌ That message is too short to flag safely and has no links to flag!",
+                    ephemeral=True
+                )
+                return
+            
+            try:
+                if target is not None:
+                    await self.bot.rest.safety(target, target.delete, key=f"delete:{message_id}")
+                else:
+                    await self.bot.rest.safety(
+                        channel,
+                        lambda: channel.get_partial_message(message_id).delete(),
+                        key=f"delete:{message_id}"
+                    )
+            except (discord.NotFound, discord.Forbidden):
+                pass  # Already deleted, or flagged without permission to delete
+            
+            flagged = []
+            if fingerprinted:
+                flagged.append("this message")
+            flagged.extend(f"`{domain}`" for domain in domains)
+            embed = discord.Embed(
+                title="🎣 Scam Flagged",
+                description=(
+                    f"**Flagged:** {', '.join(flagged)}\n"
+                    f"Copies posted in any participating server are removed for the next "
+                    f"{self.bot.scam_cache.ttl / 3600:g} hours."
+                ),
+                color=discord.Color.red(),
+                timestamp=datetime.utcnow()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            
+            await self.bot.logging_events.log_action(
+                interaction.guild,
+                "Scam Flagged",
+                (
+                    f"**Moderator:** {interaction.user.mention}\n"
+                    f"**Channel:** {channel.mention}\n"
+                    f"**Flagged:** {', '.join(flagged)}"
+                ),
+                discord.Color.red()
+            )
+            
+            # Log the action
+            self.bot.db.log_command(interaction.guild.id, interaction.user.id, "flagscam", True)
+        
+        except Exception as e:
+            logger.error(f"Error in flagscam command: {e}")
+            await interaction.followup.send(
+                "❌ An error occurred while flagging the message.",
+                ephemeral=True
+            )
+    
     @app_commands.command(name="slowmode", description="Set slowmode for a channel")
     @app_commands.describe(
         channel="The channel to set slowmode for",
@@ -293,7 +470,7 @@ class ModerationCommands(commands.Cog):
                 )
                 return
             
-            await channel.edit(slowmode_delay=duration)
+            await self.bot.rest.response(channel, lambda: channel.edit(slowmode_delay=duration))
             
             if duration == 0:
                 description = f"Slowmode disabled for {channel.mention}"
@@ -341,7 +518,7 @@ class ModerationCommands(commands.Cog):
             old_nick = user.display_name
             
             try:
-                await user.edit(nick=nickname)
+                await self.bot.rest.response(user, lambda: user.edit(nick=nickname))
                 
                 if nickname:
                     description = f"Changed {user.mention}'s nickname from `{old_nick}` to `{nickname}`"
@@ -446,9 +623,10 @@ class ModerationCommands(commands.Cog):
             if everyone_role in overwrites:
                 overwrites[everyone_role].send_messages = None
                 
-                await channel.edit(
-                    overwrites=overwrites,
-                    reason="Manual unlock"
+                await self.bot.rest.response(
+                    channel,
+                    lambda: channel.edit(overwrites=overwrites, reason="Manual unlock"),
+                    key=f"unlock:{channel.id}"
                 )
                 
                 # Send unlock notification
@@ -458,7 +636,7 @@ class ModerationCommands(commands.Cog):
                     color=discord.Color.green(),
                     timestamp=datetime.utcnow()
                 )
-                await channel.send(embed=unlock_embed)
+                await self.bot.rest.background(channel, lambda: channel.send(embed=unlock_embed))
         
         except Exception as e:
             logger.error(f"Failed to unlock channel {channel.id}: {e}")
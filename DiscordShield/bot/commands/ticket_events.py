@@ -35,8 +35,12 @@ class TicketEvents(commands.Cog):
 
                     # Remove everyone's permission to send messages except mods (optional)
                     overwrite = discord.PermissionOverwrite(send_messages=False)
-                    await channel.set_permissions(guild.default_role, overwrite=overwrite)
-                    await channel.send("🔒 This ticket has been closed. Thank you!")
+                    await self.bot.rest.response(
+                        channel,
+                        lambda: channel.set_permissions(guild.default_role, overwrite=overwrite),
+                        key=f"close_ticket:{channel.id}"
+                    )
+                    await self.bot.rest.response(channel, lambda: channel.send("🔒 This ticket has been closed. Thank you!"))
 
                     # Log the closure
                     self.bot.db.log_command(guild.id, payload.user_id, "ticket_close", True)
@@ -3,11 +3,114 @@ from discord.ext import commands
 from discord import app_commands
 from datetime import datetime, timedelta
 import time
+import io
+import asyncio
 import logging
-from ..utils.permissions import moderator_only, admin_only
+from ..utils.permissions import moderator_only, admin_only, Permissions
+from ..utils.denylist import DENYLIST_ACTIONS
+from ..utils.scam_cache import SCAM_FILTER_MODES
+from ..utils.embeds import EmbedTemplate
+from ..utils.time_parser import parse_time, parse_duration, TIME_EXAMPLES, DURATION_EXAMPLES
+from ..utils.polls import POLL_EMOJIS, DEFAULT_POLL_DURATION, MAX_POLL_DURATION, poll_id, render_poll
 
 logger = logging.getLogger(__name__)
 
+# The command list never changes at runtime, so its fields are built once
+COMMANDS_TEMPLATE = EmbedTemplate(
+    title="📚 Bot Commands",
+    description="Here are all available commands organized by category:",
+    color=discord.Color.purple(),
+    fields=[
+        # Core Commands
+        (
+            "🔧 Core Commands (4)",
+            (
+                "`/announce` - Schedule messages\n"
+                "`/logset` - Set logging channel\n"
+                "`/lock` - Lock channel temporarily\n"
+                "`/lockall` - Emergency server lockdown"
+            ),
+            False
+        ),
+        # Moderation Commands
+        (
+            "🛡️ Moderation Commands (9)",
+            (
+                "`/warn` - Warn a user\n"
+                "`/warnings` - View user warnings\n"
+                "`/removewarning` - Remove specific warning\n"
+                "`/clear` - Delete messages\n"
+                "`/flagscam` - Flag a scam message for participating servers\n"
+                "`/slowmode` - Set channel slowmode\n"
+                "`/nick` - Change user nickname\n"
+                "`/unlock` - Unlock channels\n"
+                "`/unlist` - Remove a user from the shared denylist"
+            ),
+            False
+        ),
+        # Economy Commands
+        (
+            "💰 Economy Commands (9)",
+            (
+                "`/balance` - Check token balance\n"
+                "`/gamble` - Risk tokens for rewards\n"
+                "`/steal` - Attempt to steal tokens\n"
+                "`/give` - Transfer tokens\n"
+                "`/leaderboard` - View top users\n"
+                "`/shop` - Browse shop items\n"
+                "`/buy` - Purchase items\n"
+                "`/sell` - Sell items back\n"
+                "`/economy` - Toggle economy system"
+            ),
+            False
+        ),
+        # Utility Commands
+        (
+            "🔧 Utility Commands (9)",
+            (
+                "`/ping` - Check bot latency\n"
+                "`/commands` - Show this list\n"
+                "`/remindme` - Set reminders\n"
+                "`/poll` - Create polls\n"
+                "`/suggest` - Make suggestions\n"
+                "`/serverstats` - Server statistics\n"
+                "`/stats` - Command usage statistics\n"
+                "`/userinfo` - User information\n"
+                "`/serverconfig` - Configure settings"
+            ),
+            False
+        ),
+        # Community Commands
+        (
+            "👥 Community Commands (9)",
+            (
+                "`/reactionroles` - Set up reaction roles\n"
+                "`/birthday` - Set your birthday\n"
+                "`/qotd` - Question of the day\n"
+                "`/ticket` - Create support ticket\n"
+                "`/giveaway` - Host giveaways\n"
+                "`/boostconfig` - Configure boost rewards"
+            ),
+            False
+        ),
+        # Automated Features
+        (
+            "🤖 Automated Features",
+            (
+                "• Anti-spam detection & timeouts\n"
+                "• Raid detection & auto-lockdown\n"
+                "• Word filtering system\n"
+                "• Passive economy earnings\n"
+                "• Birthday celebrations\n"
+                "• Server boost rewards\n"
+                "• Comprehensive logging\n"
+                "• Reaction role management"
+            ),
+            False
+        )
+    ]
+)
+
 class UtilityCommands(commands.Cog):
     """Utility commands for the bot."""
     
@@ -16,14 +119,21 @@ class UtilityCommands(commands.Cog):
     
     @app_commands.command(name="ping", description="Check bot latency and response time")
     async def ping(self, interaction: discord.Interaction):
-        """Check bot latency and response time."""
+        """Check bot latency with a breakdown of where the time goes."""
         try:
-            # Record start time
-            start_time = time.time()
+            handler_start = time.perf_counter()
+            
+            # Time from Discord creating the interaction to this handler running
+            dispatch_latency = round((discord.utils.utcnow() - interaction.created_at).total_seconds() * 1000, 2)
             
-            # Get API latency
+            # Gateway heartbeat latency
             api_latency = round(self.bot.latency * 1000, 2)
             
+            # Event loop lag: how long a zero-length sleep takes to come back
+            lag_start = time.perf_counter()
+            await asyncio.sleep(0)
+            loop_lag = round((time.perf_counter() - lag_start) * 1000, 2)
+            
             # Create initial embed
             embed = discord.Embed(
                 title="🏓 Pong!",
@@ -32,17 +142,20 @@ class UtilityCommands(commands.Cog):
                 timestamp=datetime.utcnow()
             )
             
-            # Send initial response
-            await interaction.response.send_message(embed=embed)
+            handler_time = round((time.perf_counter() - handler_start) * 1000, 2)
             
-            # Calculate response time
-            end_time = time.time()
-            response_time = round((end_time - start_time) * 1000, 2)
+            # Send initial response, timing the REST round trip
+            rest_start = time.perf_counter()
+            await interaction.response.send_message(embed=embed)
+            rest_latency = round((time.perf_counter() - rest_start) * 1000, 2)
             
             # Update embed with actual times
             embed.description = (
-                f"**API Latency:** {api_latency}ms\n"
-                f"**Response Time:** {response_time}ms\n"
+                f"**Gateway Heartbeat:** {api_latency}ms\n"
+                f"**REST Round Trip:** {rest_latency}ms\n"
+                f"**Event Loop Lag:** {loop_lag}ms\n"
+                f"**Handler Time:** {handler_time}ms\n"
+                f"**Interaction Dispatch:** {dispatch_latency}ms\n"
                 f"**Status:** {'🟢 Excellent' if api_latency < 100 else '🟡 Good' if api_latency < 300 else '🔴 Poor'}"
             )
             
@@ -51,7 +164,7 @@ class UtilityCommands(commands.Cog):
                 name="📊 Bot Info",
                 value=(
                     f"**Guilds:** {len(self.bot.guilds)}\n"
-                    f"**Users:** {len(set(self.bot.get_all_members()))}\n"
+                    f"**Users:** {self.bot.member_stats.unique_users:,}\n"
                     f"**Commands:** 35+"
                 ),
                 inline=True
@@ -88,105 +201,10 @@ class UtilityCommands(commands.Cog):
     async def commands(self, interaction: discord.Interaction):
         """Display all available bot commands organized by category."""
         try:
-            embed = discord.Embed(
-                title="📚 Bot Commands",
-                description="Here are all available commands organized by category:",
-                color=discord.Color.purple(),
-                timestamp=datetime.utcnow()
-            )
-            
-            # Core Commands
-            embed.add_field(
-                name="🔧 Core Commands (4)",
-                value=(
-                    "`/announce` - Schedule messages\n"
-                    "`/logset` - Set logging channel\n"
-                    "`/lock` - Lock channel temporarily\n"
-                    "`/lockall` - Emergency server lockdown"
-                ),
-                inline=False
-            )
-            
-            # Moderation Commands
-            embed.add_field(
-                name="🛡️ Moderation Commands (7)",
-                value=(
-                    "`/warn` - Warn a user\n"
-                    "`/warnings` - View user warnings\n"
-                    "`/removewarning` - Remove specific warning\n"
-                    "`/clear` - Delete messages\n"
-                    "`/slowmode` - Set channel slowmode\n"
-                    "`/nick` - Change user nickname\n"
-                    "`/unlock` - Unlock channels"
-                ),
-                inline=False
-            )
-            
-            # Economy Commands
-            embed.add_field(
-                name="💰 Economy Commands (9)",
-                value=(
-                    "`/balance` - Check token balance\n"
-                    "`/gamble` - Risk tokens for rewards\n"
-                    "`/steal` - Attempt to steal tokens\n"
-                    "`/give` - Transfer tokens\n"
-                    "`/leaderboard` - View top users\n"
-                    "`/shop` - Browse shop items\n"
-                    "`/buy` - Purchase items\n"
-                    "`/sell` - Sell items back\n"
-                    "`/economy` - Toggle economy system"
-                ),
-                inline=False
-            )
-            
-            # Utility Commands
-            embed.add_field(
-                name="🔧 Utility Commands (8)",
-                value=(
-                    "`/ping` - Check bot latency\n"
-                    "`/commands` - Show this list\n"
-                    "`/remindme` - Set reminders\n"
-                    "`/poll` - Create polls\n"
-                    "`/suggest` - Make suggestions\n"
-                    "`/serverstats` - Server statistics\n"
-                    "`/userinfo` - User information\n"
-                    "`/serverconfig` - Configure settings"
-                ),
-                inline=False
-            )
-            
-            # Community Commands
-            embed.add_field(
-                name="👥 Community Commands (9)",
-                value=(
-                    "`/reactionroles` - Set up reaction roles\n"
-                    "`/birthday` - Set your birthday\n"
-                    "`/qotd` - Question of the day\n"
-                    "`/ticket` - Create support ticket\n"
-                    "`/giveaway` - Host giveaways\n"
-                    "`/boostconfig` - Configure boost rewards"
-                ),
-                inline=False
-            )
-            
-            # Automated Features
-            embed.add_field(
-                name="🤖 Automated Features",
-                value=(
-                    "• Anti-spam detection & timeouts\n"
-                    "• Raid detection & auto-lockdown\n"
-                    "• Word filtering system\n"
-                    "• Passive economy earnings\n"
-                    "• Birthday celebrations\n"
-                    "• Server boost rewards\n"
-                    "• Comprehensive logging\n"
-                    "• Reaction role management"
-                ),
-                inline=False
-            )
+            embed = COMMANDS_TEMPLATE.render()
             
             embed.set_footer(
-                text=f"Total: 37 commands | Requested by {interaction.user.display_name}",
+                text=f"Total: 40 commands | Requested by {interaction.user.display_name}",
                 icon_url=interaction.user.display_avatar.url
             )
             
@@ -204,37 +222,18 @@ class UtilityCommands(commands.Cog):
 
     @app_commands.command(name="remindme", description="Set a reminder")
     @app_commands.describe(
-        time="Time format: Xm (minutes), Xh (hours), Xd (days)",
+        time="A duration like 30m or 1h30m, or a time like 14:30 UTC+2",
         message="What to remind you about"
     )
     async def remindme(self, interaction: discord.Interaction, time: str, message: str):
         """Set a reminder."""
         try:
-            # Parse time
-            reminder_time = None
-            
-            if time.endswith('m'):
-                try:
-                    minutes = int(time[:-1])
-                    reminder_time = datetime.utcnow() + timedelta(minutes=minutes)
-                except ValueError:
-                    pass
-            elif time.endswith('h'):
-                try:
-                    hours = int(time[:-1])
-                    reminder_time = datetime.utcnow() + timedelta(hours=hours)
-                except ValueError:
-                    pass
-            elif time.endswith('d'):
-                try:
-                    days = int(time[:-1])
-                    reminder_time = datetime.utcnow() + timedelta(days=days)
-                except ValueError:
-                    pass
+            # Parse time (a duration from now or an absolute date and time)
+            reminder_time = parse_time(time)
             
-            if not reminder_time:
+            if not reminder_time or reminder_time <= datetime.utcnow():
                 await interaction.response.send_message(
-                    "❌ Invalid time format! Use formats like: `30m`, `2h`, `1d`",
+                    f"❌ Invalid time format! Use formats like: {TIME_EXAMPLES}",
                     ephemeral=True
                 )
                 return
@@ -284,7 +283,8 @@ class UtilityCommands(commands.Cog):
         option2="Second option",
         option3="Third option (optional)",
         option4="Fourth option (optional)",
-        option5="Fifth option (optional)"
+        option5="Fifth option (optional)",
+        duration="How long the poll stays open (e.g., 30m, 2h, 1d; default 1d)"
     )
     async def poll(
         self, 
@@ -294,7 +294,8 @@ class UtilityCommands(commands.Cog):
         option2: str,
         option3: str = None,
         option4: str = None,
-        option5: str = None
+        option5: str = None,
+        duration: str = None
     ):
         """Create a poll."""
         try:
@@ -306,41 +307,51 @@ class UtilityCommands(commands.Cog):
             if option5:
                 options.append(option5)
             
-            # Reaction emojis
-            emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
-            
-            embed = discord.Embed(
-                title="📊 Poll",
-                description=f"**{question}**",
-                color=discord.Color.purple(),
-                timestamp=datetime.utcnow()
-            )
+            poll_duration = parse_duration(duration) if duration else DEFAULT_POLL_DURATION
+            if not poll_duration:
+                await interaction.response.send_message(
+                    f"❌ Invalid duration format! Use formats like: {DURATION_EXAMPLES}",
+                    ephemeral=True
+                )
+                return
             
-            poll_text = ""
-            for i, option in enumerate(options):
-                poll_text += f"{emojis[i]} {option}\n"
+            if poll_duration < timedelta(minutes=1) or poll_duration > MAX_POLL_DURATION:
+                await interaction.response.send_message(
+                    "❌ Poll duration must be between 1 minute and 1 week!",
+                    ephemeral=True
+                )
+                return
             
-            embed.add_field(name="Options", value=poll_text, inline=False)
-            embed.set_footer(text=f"Poll created by {interaction.user.display_name}")
+            poll = {
+                'guild_id': interaction.guild.id,
+                'question': question,
+                'options': options,
+                'creator': interaction.user.id,
+                'creator_name': interaction.user.display_name,
+                'channel': interaction.channel.id,
+                'created_at': datetime.utcnow(),
+                'closes_at': datetime.utcnow() + poll_duration,
+                # Running tallies, and each voter's current option
+                'counts': [0] * len(options),
+                'voters': {},
+                'closed': False
+            }
             
-            await interaction.response.send_message(embed=embed)
+            await interaction.response.send_message(embed=render_poll(poll))
             
             # Get the message to add reactions
             message = await interaction.original_response()
             
+            # Store poll data before the reactions go on, so early votes are counted
+            poll['message_id'] = message.id
+            key = poll_id(interaction.guild.id, message.id)
+            self.bot.db.polls[key] = poll
+            
             # Add reactions
-            for i in range(len(options)):
-                await message.add_reaction(emojis[i])
+            for emoji in POLL_EMOJIS[:len(options)]:
+                await self.bot.rest.response(message, lambda: message.add_reaction(emoji))
             
-            # Store poll data
-            poll_id = f"{interaction.guild.id}-{message.id}"
-            self.bot.db.polls[poll_id] = {
-                'question': question,
-                'options': options,
-                'creator': interaction.user.id,
-                'channel': interaction.channel.id,
-                'created_at': datetime.utcnow()
-            }
+            await self.bot.scheduler.schedule_poll_close(key, poll['closes_at'])
             
             # Log the action
             self.bot.db.log_command(interaction.guild.id, interaction.user.id, "poll", True)
@@ -392,15 +403,15 @@ class UtilityCommands(commands.Cog):
                 await interaction.response.send_message(embed=embed)
                 message = await interaction.original_response()
             else:
-                message = await suggestion_channel.send(embed=embed)
+                message = await self.bot.rest.response(suggestion_channel, lambda: suggestion_channel.send(embed=embed))
                 await interaction.response.send_message(
                     f"✅ Your suggestion has been posted in {suggestion_channel.mention}!",
                     ephemeral=True
                 )
             
             # Add voting reactions
-            await message.add_reaction("👍")
-            await message.add_reaction("👎")
+            await self.bot.rest.response(message, lambda: message.add_reaction("👍"))
+            await self.bot.rest.response(message, lambda: message.add_reaction("👎"))
             
             # Store suggestion
             if interaction.guild.id not in self.bot.db.suggestions:
@@ -431,15 +442,15 @@ class UtilityCommands(commands.Cog):
         try:
             guild = interaction.guild
             
-            # Count members by status
-            online = sum(1 for member in guild.members if member.status == discord.Status.online)
-            idle = sum(1 for member in guild.members if member.status == discord.Status.idle)
-            dnd = sum(1 for member in guild.members if member.status == discord.Status.dnd)
-            offline = sum(1 for member in guild.members if member.status == discord.Status.offline)
+            # Count members by status from the incrementally maintained counters
+            counts = self.bot.member_stats.get(guild)
+            online = counts['online']
+            idle = counts['idle']
+            dnd = counts['dnd']
+            offline = counts['offline']
             
-            # Count bots
-            bots = sum(1 for member in guild.members if member.bot)
-            humans = guild.member_count - bots
+            # Bots are only counted reliably when every member is cached
+            bots = counts['bots'] if self.bot.members.full else None
             
             # Channel counts
             text_channels = len(guild.text_channels)
@@ -459,27 +470,23 @@ class UtilityCommands(commands.Cog):
                 embed.set_thumbnail(url=guild.icon.url)
             
             # Member stats
-            embed.add_field(
-                name="👥 Members",
-                value=(
-                    f"**Total:** {guild.member_count:,}\n"
-                    f"**Humans:** {humans:,}\n"
-                    f"**Bots:** {bots:,}"
-                ),
-                inline=True
-            )
+            members = f"**Total:** {guild.member_count:,}"
+            if bots is not None:
+                members += f"\n**Humans:** {guild.member_count - bots:,}\n**Bots:** {bots:,}"
+            embed.add_field(name="👥 Members", value=members, inline=True)
             
-            # Status stats
-            embed.add_field(
-                name="🟢 Status",
-                value=(
-                    f"**Online:** {online:,}\n"
-                    f"**Idle:** {idle:,}\n"
-                    f"**DND:** {dnd:,}\n"
-                    f"**Offline:** {offline:,}"
-                ),
-                inline=True
-            )
+            # Status stats, which are only tracked with the presence intent and the full member cache
+            if self.bot.intents.presences and self.bot.members.full:
+                embed.add_field(
+                    name="🟢 Status",
+                    value=(
+                        f"**Online:** {online:,}\n"
+                        f"**Idle:** {idle:,}\n"
+                        f"**DND:** {dnd:,}\n"
+                        f"**Offline:** {offline:,}"
+                    ),
+                    inline=True
+                )
             
             # Channel stats
             embed.add_field(
@@ -517,6 +524,75 @@ class UtilityCommands(commands.Cog):
                 ephemeral=True
             )
     
+    @app_commands.command(name="stats", description="View command usage statistics")
+    @app_commands.describe(export="Attach the daily usage history as a CSV file")
+    @moderator_only()
+    async def stats(self, interaction: discord.Interaction, export: bool = False):
+        """View command usage statistics from the pre-aggregated counters."""
+        try:
+            usage_stats = self.bot.db.usage_stats
+            last_day = usage_stats.last_hours(interaction.guild.id, 24)
+            daily_rows = usage_stats.daily_rows(interaction.guild.id)
+            
+            embed = discord.Embed(
+                title="📊 Command Usage Statistics",
+                color=discord.Color.blue(),
+                timestamp=datetime.utcnow()
+            )
+            
+            success_rate = (last_day.successes / last_day.commands * 100) if last_day.commands else 0
+            embed.add_field(
+                name="⏱️ Last 24 Hours",
+                value=(
+                    f"**Commands:** {last_day.commands:,}\n"
+                    f"**Successful:** {last_day.successes:,}\n"
+                    f"**Success Rate:** {success_rate:.1f}%\n"
+                    f"**Unique Users:** ~{last_day.users.count():,}"
+                ),
+                inline=True
+            )
+            
+            top_commands = last_day.top_commands(5)
+            if top_commands:
+                embed.add_field(
+                    name="🔥 Top Commands",
+                    value="\n".join(f"**/{cmd}:** {count:,}" for cmd, count in top_commands),
+                    inline=True
+                )
+            
+            if daily_rows:
+                embed.add_field(
+                    name="📅 Recent Days",
+                    value="\n".join(
+                        f"**{row['date']}:** {row['commands']:,} commands, ~{row['unique_users']:,} users"
+                        for row in daily_rows[-7:]
+                    ),
+                    inline=False
+                )
+            
+            if export and daily_rows:
+                csv_text = "date,commands,successes,unique_users\n" + "".join(
+                    f"{row['date']},{row['commands']},{row['successes']},{row['unique_users']}\n"
+                    for row in daily_rows
+                )
+                stats_file = discord.File(
+                    io.BytesIO(csv_text.encode('utf-8')),
+                    filename=f"stats-{interaction.guild.id}.csv"
+                )
+                await interaction.response.send_message(embed=embed, file=stats_file, ephemeral=True)
+            else:
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+            # Log the action
+            self.bot.db.log_command(interaction.guild.id, interaction.user.id, "stats", True)
+            
+        except Exception as e:
+            logger.error(f"Error in stats command: {e}")
+            await interaction.response.send_message(
+                "❌ An error occurred while fetching usage statistics.",
+                ephemeral=True
+            )
+    
     @app_commands.command(name="userinfo", description="View information about a user")
     @app_commands.describe(user="The user to get information about")
     async def userinfo(self, interaction: discord.Interaction, user: discord.Member = None):
@@ -574,17 +650,18 @@ class UtilityCommands(commands.Cog):
             
             # Permissions (if user has notable perms)
             key_perms = []
-            if target_user.guild_permissions.administrator:
+            permissions = Permissions.guild_permissions(target_user)
+            if permissions.administrator:
                 key_perms.append("Administrator")
-            elif target_user.guild_permissions.manage_guild:
+            elif permissions.manage_guild:
                 key_perms.append("Manage Server")
-            elif target_user.guild_permissions.manage_channels:
+            elif permissions.manage_channels:
                 key_perms.append("Manage Channels")
-            elif target_user.guild_permissions.manage_messages:
+            elif permissions.manage_messages:
                 key_perms.append("Manage Messages")
-            elif target_user.guild_permissions.kick_members:
+            elif permissions.kick_members:
                 key_perms.append("Kick Members")
-            elif target_user.guild_permissions.ban_members:
+            elif permissions.ban_members:
                 key_perms.append("Ban Members")
             
             if key_perms:
@@ -630,6 +707,8 @@ class UtilityCommands(commands.Cog):
                 'qotd_channel': 'Channel for question of the day',
                 'suggestion_channel': 'Channel for suggestions',
                 'qotd_hour': 'Hour to post question of the day (0-23)',
+                'denylist': f"Shared denylist: {', '.join(DENYLIST_ACTIONS)} (anything but off also reports bans and raids)",
+                'scam_filter': f"Shared scam filter: {', '.join(SCAM_FILTER_MODES)} (on removes scams flagged in other servers and shares this server's flags)",
                 'prefix': 'Bot command prefix'
             }
             
@@ -731,6 +810,28 @@ class UtilityCommands(commands.Cog):
                     )
                     return
             
+            elif setting == 'denylist':
+                # Participation in the shared denylist
+                if value.lower() not in DENYLIST_ACTIONS:
+                    await interaction.response.send_message(
+                        f"❌ Denylist mode must be one of: {', '.join(DENYLIST_ACTIONS)}",
+                        ephemeral=True
+                    )
+                    return
+                new_value = value.lower()
+                display_value = new_value
+            
+            elif setting == 'scam_filter':
+                # Participation in the shared scam filter
+                if value.lower() not in SCAM_FILTER_MODES:
+                    await interaction.response.send_message(
+                        f"❌ Scam filter mode must be one of: {', '.join(SCAM_FILTER_MODES)}",
+                        ephemeral=True
+                    )
+                    return
+                new_value = value.lower()
+                display_value = new_value
+            
             else:
                 # String setting
                 new_value = value
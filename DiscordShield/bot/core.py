@@ -1,42 +1,130 @@
 import discord
 from discord.ext import commands, tasks
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
+from time import perf_counter
 import asyncio
+import hashlib
+import importlib
+import json
+import os
+from typing import Optional
 
 from .utils.database import Database
 from .utils.scheduler import Scheduler
+from .utils.rest_scheduler import RestScheduler, LANE_NAMES
+from .utils.member_stats import MemberStats
+from .utils.embeds import GuildEmbedCache
+from .utils.leaderboard import LeaderboardCache
+from .utils.polls import PollEditor
+from .utils.message_cache import MessageCache
+from .utils.member_cache import MemberCache
+from .utils.permissions import permission_cache
+from .utils.denylist import Denylist
+from .utils.scam_cache import ScamCache
+from .utils.metrics import Metrics, LoopMonitor, InstrumentedCommandTree
 from .commands.core import CoreCommands
 from .commands.moderation import ModerationCommands
 from .commands.economy import EconomyCommands
-from .commands.utility import UtilityCommands
-from .commands.community import CommunityCommands
 from .events.moderation import ModerationEvents
 from .events.economy import EconomyEvents
 from .events.logging import LoggingEvents
+from .events.member_stats import MemberStatsEvents
+from .events.giveaways import GiveawayEvents
+from .events.polls import PollEvents
+from .events.member_cache import MemberCacheEvents
+from .events.permissions import PermissionEvents
 
 logger = logging.getLogger(__name__)
 
+# Rarely used cogs, imported and registered after the bot is ready
+DEFERRED_COGS = [
+    ('.commands.utility', 'UtilityCommands'),
+    ('.commands.community', 'CommunityCommands')
+]
+
+# Hash of the last command tree pushed to Discord
+COMMAND_HASH_FILE = 'data/command_tree.sha256'
+
 class DiscordBot(commands.Bot):
     """Main Discord bot class with comprehensive features."""
     
     def __init__(self):
+        # Latency histograms for every event handler, command and task loop
+        self.metrics = Metrics()
+        self.loop_monitor = LoopMonitor(self.metrics, stall_threshold_ms=float(os.getenv('LOOP_STALL_MS', 250)))
+        self._instrumented_listeners = {}
+        self.deferred_cogs_task: Optional[asyncio.Task] = None
+        
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
         intents.guilds = True
         intents.reactions = True
+        # Privileged and heavy on gateway traffic; only the /serverstats status counters need it
+        intents.presences = os.getenv('PRESENCE_INTENT', '').lower() in ('1', 'true', 'yes')
+        
+        # MEMBER_CACHE=lru skips chunking and holds only recently active members, fetching others on demand
+        self.members = MemberCache(
+            os.getenv('MEMBER_CACHE', 'full').lower(),
+            capacity=int(os.getenv('MEMBER_CACHE_SIZE', 50000))
+        )
+        member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+        if not self.members.full:
+            member_cache_flags.joined = False
         
         super().__init__(
             command_prefix='!',
             intents=intents,
-            description="Comprehensive Discord bot with 35+ commands"
+            description="Comprehensive Discord bot with 35+ commands",
+            tree_cls=InstrumentedCommandTree,
+            # Edit and delete logs read from the compact message cache instead of full Message objects
+            max_messages=None,
+            member_cache_flags=member_cache_flags,
+            chunk_guilds_at_startup=self.members.full,
+            http_trace=self.metrics.http_trace()
         )
         
+        self.members.install(self._connection)
+        
         # Initialize database and scheduler
         self.db = Database()
         self.scheduler = Scheduler(self)
         
+        # Outbound actions, ordered by priority lane (safety, responses, background)
+        self.rest = RestScheduler(self)
+        
+        # Embed parts built once per guild, dropped whenever the guild or its settings change
+        self.embeds = GuildEmbedCache()
+        self.db.add_change_listener(lambda guild_id, key: self.embeds.invalidate(guild_id))
+        
+        # Leaderboard snapshots shared by every /leaderboard viewer in a guild
+        self.leaderboards = LeaderboardCache(self.db, self.members)
+        
+        # Poll embeds refreshed from running tallies, at most once per interval each
+        self.poll_editor = PollEditor(self)
+        
+        # Packed content of recent messages in logged guilds, for edit and delete logs
+        self.message_cache = MessageCache(
+            budget_bytes=int(os.getenv('MESSAGE_CACHE_BYTES', 32 * 1024 * 1024)),
+            guild_bytes=int(os.getenv('MESSAGE_CACHE_GUILD_BYTES', 1024 * 1024)),
+            spill_directory=os.getenv('MESSAGE_CACHE_SPILL_DIR') or None
+        )
+        
+        # Permission bitfields and ticket roles behind every permission check
+        self.permission_cache = permission_cache
+        
+        # Users reported by guilds that opted into the shared denylist, screened on join
+        self.denylist = Denylist(os.getenv('DENYLIST_PATH', 'data/denylist.bin'))
+        
+        # Scam messages and link domains flagged in one guild, removed on sight in every guild
+        self.scam_cache = ScamCache(ttl=float(os.getenv('SCAM_CACHE_TTL', 24 * 3600)))
+        
+        # Member status counters shared by /serverstats and other features
+        self.member_stats = MemberStats()
+        # Unchunked guilds only index the members the LRU learns about
+        self.members.on_remember = self.member_stats.member_seen
+        
         # Rate limiting
         self.command_usage = {}
         
@@ -49,35 +137,220 @@ class DiscordBot(commands.Bot):
         # Setup event handlers
         self.setup_events()
         
+        # Counters and scrape-time gauges for the /metrics endpoint
+        self.setup_metrics()
+        
     async def setup_hook(self):
         """Called when the bot is starting up."""
         logger.info("Setting up bot...")
+        setup_start = perf_counter()
+        self.loop_monitor.start()
+        
+        # Saved denylist, then any lists shared by other deployments
+        phase_start = perf_counter()
+        self.load_denylist()
+        logger.info(f"Startup: loaded denylist in {(perf_counter() - phase_start) * 1000:.1f}ms")
         
-        # Load command cogs
+        # Load command cogs needed immediately
+        phase_start = perf_counter()
         await self.add_cog(CoreCommands(self))
         await self.add_cog(ModerationCommands(self))
         await self.add_cog(EconomyCommands(self))
-        await self.add_cog(UtilityCommands(self))
-        await self.add_cog(CommunityCommands(self))
+        logger.info(f"Startup: loaded core cogs in {(perf_counter() - phase_start) * 1000:.1f}ms")
         
         # Start background tasks
+        phase_start = perf_counter()
         self.passive_economy.start()
         self.cleanup_tasks.start()
-        self.birthday_checker.start()
         self.qotd_scheduler.start()
+        self.daily_reports.start()
+        await self.scheduler.schedule_warning_expiry()
+        await self.scheduler.schedule_birthdays()
+        logger.info(f"Startup: started background tasks in {(perf_counter() - phase_start) * 1000:.1f}ms")
         
-        # Sync slash commands
+        # Remaining cogs and the command sync happen once connected; keep a
+        # reference so the task is not garbage collected while it waits
+        self.deferred_cogs_task = asyncio.create_task(self.load_deferred_cogs())
+        
+        logger.info(f"Startup: setup hook finished in {(perf_counter() - setup_start) * 1000:.1f}ms")
+    
+    async def load_deferred_cogs(self):
+        """Load rarely used cogs after the bot is ready, then sync commands if needed."""
+        try:
+            await self.wait_until_ready()
+            
+            phase_start = perf_counter()
+            for module_name, class_name in DEFERRED_COGS:
+                module = importlib.import_module(module_name, __package__)
+                await self.add_cog(getattr(module, class_name)(self))
+            logger.info(f"Startup: loaded deferred cogs in {(perf_counter() - phase_start) * 1000:.1f}ms")
+            
+            phase_start = perf_counter()
+            await self.sync_commands()
+            logger.info(f"Startup: command sync phase took {(perf_counter() - phase_start) * 1000:.1f}ms")
+        except Exception as e:
+            logger.error(f"Failed to load deferred cogs: {e}")
+    
+    def load_denylist(self):
+        """Load the saved denylist and merge the files listed in DENYLIST_IMPORT."""
+        self.denylist.load()
+        for path in filter(None, os.getenv('DENYLIST_IMPORT', '').split(',')):
+            try:
+                added = self.denylist.import_file(path.strip())
+                logger.info(f"Imported {added:,} new denylist entries from {path}")
+            except (OSError, ValueError, OverflowError) as e:
+                logger.error(f"Failed to import denylist {path}: {e}")
+    
+    def save_denylist(self):
+        """Save the denylist if it changed, exporting a copy to DENYLIST_EXPORT for other deployments."""
+        if not self.denylist.dirty:
+            return
+        self.denylist.save()
+        export_path = os.getenv('DENYLIST_EXPORT')
+        if export_path:
+            try:
+                self.denylist.export(export_path)
+            except (OSError, OverflowError) as e:
+                logger.error(f"Failed to export denylist to {export_path}: {e}")
+    
+    def command_tree_hash(self) -> str:
+        """Hash the payload that a command sync would send to Discord."""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands()),
+            key=lambda command: command['name']
+        )
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    async def sync_commands(self):
+        """Sync slash commands, skipping the round trip when nothing changed since the last deploy."""
         try:
+            tree_hash = self.command_tree_hash()
+            
+            previous_hash = None
+            if os.path.exists(COMMAND_HASH_FILE):
+                with open(COMMAND_HASH_FILE, 'r') as f:
+                    previous_hash = f.read().strip()
+            
+            if tree_hash == previous_hash and not os.getenv('FORCE_COMMAND_SYNC'):
+                logger.info("Command tree unchanged since last deploy, skipping sync")
+                return
+            
             synced = await self.tree.sync()
             logger.info(f"Synced {len(synced)} slash commands")
+            
+            os.makedirs(os.path.dirname(COMMAND_HASH_FILE), exist_ok=True)
+            with open(COMMAND_HASH_FILE, 'w') as f:
+                f.write(tree_hash)
         except Exception as e:
             logger.error(f"Failed to sync commands: {e}")
     
+    async def close(self):
+        """Flush buffered data before shutting down."""
+        self.db.command_logs.close()
+        self.message_cache.close()
+        self.save_denylist()
+        self.loop_monitor.stop()
+        if self.deferred_cogs_task and not self.deferred_cogs_task.done():
+            self.deferred_cogs_task.cancel()
+        await super().close()
+    
+    def event(self, coro):
+        """Register an event handler, timing every call."""
+        return super().event(self.metrics.instrument(f"event.{coro.__name__}", coro))
+    
+    def dispatch(self, event_name, /, *args, **kwargs):
+        """Dispatch an event, counting each message once however many handlers it has."""
+        if event_name == 'message':
+            self.metrics.counter('messages_processed_total').inc()
+        super().dispatch(event_name, *args, **kwargs)
+    
+    def add_listener(self, func, name=discord.utils.MISSING):
+        """Register a listener, timing every call."""
+        name = func.__name__ if name is discord.utils.MISSING else name
+        # Several listeners share an event, so each gets a histogram named after its owner
+        owner = getattr(func, '__qualname__', type(func).__name__).split('.', 1)[0]
+        wrapper = self.metrics.instrument(f"event.{name}.{owner}", func)
+        self._instrumented_listeners[(func, name)] = wrapper
+        super().add_listener(wrapper, name)
+    
+    def remove_listener(self, func, name=discord.utils.MISSING):
+        """Remove a listener registered through add_listener."""
+        name = func.__name__ if name is discord.utils.MISSING else name
+        wrapper = self._instrumented_listeners.pop((func, name), func)
+        super().remove_listener(wrapper, name)
+    
+    async def on_app_command_completion(self, interaction, command):
+        """Record slash command latency."""
+        started = interaction.extras.get('started')
+        if started is not None:
+            self.metrics.observe(f"command.{command.qualified_name}", perf_counter() - started)
+    
     def setup_events(self):
-        """Setup event handlers for moderation, economy, and logging."""
+        """Setup event handlers for moderation, economy, logging, member stats, giveaways, polls, permissions, and the member LRU."""
         self.moderation_events = ModerationEvents(self)
         self.economy_events = EconomyEvents(self)
         self.logging_events = LoggingEvents(self)
+        self.member_stats_events = MemberStatsEvents(self)
+        self.giveaway_events = GiveawayEvents(self)
+        self.poll_events = PollEvents(self)
+        self.permission_events = PermissionEvents(self)
+        if not self.members.full:
+            self.member_cache_events = MemberCacheEvents(self)
+        
+        # Cached embed parts include guild names, icons and role mentions
+        for event in ('on_guild_update', 'on_guild_role_update', 'on_guild_role_delete', 'on_guild_remove'):
+            self.add_listener(self.invalidate_guild_embeds, event)
+    
+    async def invalidate_guild_embeds(self, *args):
+        """Drop a guild's cached embed parts after it, or one of its roles, changes."""
+        target = args[-1]
+        guild = target.guild if isinstance(target, discord.Role) else target
+        self.embeds.invalidate(guild.id)
+    
+    def setup_metrics(self):
+        """Declare counters and register gauges read at scrape time."""
+        self.metrics.counter('spam_timeouts_total', "Members timed out by the spam check")
+        self.metrics.counter('word_filter_hits_total', "Messages removed by the word filter")
+        self.metrics.counter('raid_lockdowns_total', "Automatic raid lockdowns triggered")
+        self.metrics.counter('scam_messages_total', "Messages removed as flagged scams")
+        
+        self.metrics.counter('messages_processed_total', "Messages received from the gateway")
+        self.metrics.gauge(
+            'scheduler_queue_depth',
+            "Scheduled tasks waiting to run",
+            lambda: len(self.scheduler.scheduled_tasks)
+        )
+        self.metrics.gauge(
+            'database_records',
+            "Records held per database collection",
+            lambda: {(('collection', name),): size for name, size in self.db.collection_sizes().items()}
+        )
+        self.metrics.gauge(
+            'rest_queue_depth',
+            "Outbound actions waiting per priority lane",
+            lambda: {(('lane', LANE_NAMES[lane]),): depth for lane, depth in self.rest.queued.items()}
+        )
+        self.metrics.gauge('rest_in_flight', "Outbound actions in flight", lambda: self.rest.total_in_flight)
+        self.metrics.gauge('embed_cache_hits_total', "Embed parts served from the per-guild cache", lambda: self.embeds.hits, kind='counter')
+        self.metrics.gauge('embed_cache_misses_total', "Embed parts built on a cache miss", lambda: self.embeds.misses, kind='counter')
+        self.metrics.gauge('leaderboard_snapshot_builds_total', "Leaderboard snapshots rebuilt from balances", lambda: self.leaderboards.builds, kind='counter')
+        self.metrics.gauge('poll_embed_edits_total', "Poll embeds refreshed with new tallies", lambda: self.poll_editor.edits, kind='counter')
+        self.metrics.gauge('message_cache_bytes', "Estimated memory held by the message cache", lambda: self.message_cache.size)
+        self.metrics.gauge('message_cache_hits_total', "Edit and delete lookups found in the message cache", lambda: self.message_cache.hits, kind='counter')
+        self.metrics.gauge('message_cache_misses_total', "Edit and delete lookups missing from the message cache", lambda: self.message_cache.misses, kind='counter')
+        self.metrics.gauge('member_cache_size', "Members held in the member LRU", lambda: len(self.members))
+        self.metrics.gauge('member_cache_hits_total', "Member lookups served from the member LRU", lambda: self.members.hits, kind='counter')
+        self.metrics.gauge('member_cache_misses_total', "Member lookups missing from the member LRU", lambda: self.members.misses, kind='counter')
+        self.metrics.gauge('member_queries_total', "Batched member requests sent over the gateway", lambda: self.members.queries, kind='counter')
+        self.metrics.gauge('permission_cache_hits_total', "Permission checks served from cached bitfields", lambda: self.permission_cache.hits, kind='counter')
+        self.metrics.gauge('permission_cache_misses_total', "Permission checks that folded roles or overwrites", lambda: self.permission_cache.misses, kind='counter')
+        self.metrics.gauge('denylist_entries', "Users on the shared denylist", lambda: len(self.denylist))
+        self.metrics.gauge('denylist_matches_total', "Joins by users on the shared denylist", lambda: self.denylist.matches, kind='counter')
+        self.metrics.gauge('scam_fingerprints', "Scam message fingerprints currently flagged", lambda: len(self.scam_cache.fingerprints))
+        self.metrics.gauge('scam_domains', "Scam link domains currently flagged", lambda: len(self.scam_cache.domains))
+        self.metrics.gauge('scam_cache_matches_total', "Messages matching a flagged fingerprint or domain", lambda: self.scam_cache.matches, kind='counter')
+        self.metrics.gauge('guilds', "Guilds the bot is in", lambda: len(self.guilds))
+        self.metrics.gauge('loop_stalls_total', "Event loop stalls detected", lambda: self.loop_monitor.stalls, kind='counter')
     
     async def on_ready(self):
         """Called when the bot is ready."""
@@ -117,118 +390,70 @@ class DiscordBot(commands.Bot):
                 ),
                 color=discord.Color.blue()
             )
-            await guild.system_channel.send(embed=embed)
+            await self.rest.background(guild.system_channel, lambda: guild.system_channel.send(embed=embed))
     
     @tasks.loop(hours=1)
     async def passive_economy(self):
         """Passive economy earning task."""
-        try:
-            await self.economy_events.process_passive_earnings()
-        except Exception as e:
-            logger.error(f"Error in passive economy task: {e}")
+        with self.metrics.timer("task.passive_economy"):
+            try:
+                await self.economy_events.process_passive_earnings()
+            except Exception as e:
+                logger.error(f"Error in passive economy task: {e}")
     
     @tasks.loop(hours=6)
     async def cleanup_tasks(self):
-        """Cleanup expired data."""
-        try:
-            # Clean up expired warnings
-            current_time = datetime.utcnow()
-            for guild_id in self.db.warnings:
-                guild_warnings = self.db.warnings[guild_id]
-                for user_id in list(guild_warnings.keys()):
-                    user_warnings = guild_warnings[user_id]
-                    # Remove warnings older than 7 days
-                    guild_warnings[user_id] = [
-                        w for w in user_warnings 
-                        if (current_time - w['timestamp']).days < 7
+        """Cleanup expired data. Warnings expire on their own timer in the scheduler."""
+        with self.metrics.timer("task.cleanup_tasks"):
+            try:
+                current_time = datetime.utcnow()
+                
+                # Clean up message tracking
+                cutoff_time = current_time - timedelta(minutes=5)
+                for user_id in list(self.message_tracking.keys()):
+                    self.message_tracking[user_id] = [
+                        msg_time for msg_time in self.message_tracking[user_id]
+                        if msg_time > cutoff_time
                     ]
-                    if not guild_warnings[user_id]:
-                        del guild_warnings[user_id]
-            
-            # Clean up message tracking
-            cutoff_time = current_time - timedelta(minutes=5)
-            for user_id in list(self.message_tracking.keys()):
-                self.message_tracking[user_id] = [
-                    msg_time for msg_time in self.message_tracking[user_id]
-                    if msg_time > cutoff_time
-                ]
-                if not self.message_tracking[user_id]:
-                    del self.message_tracking[user_id]
-            
-            logger.info("Completed cleanup tasks")
-        except Exception as e:
-            logger.error(f"Error in cleanup tasks: {e}")
+                    if not self.message_tracking[user_id]:
+                        del self.message_tracking[user_id]
+                
+                # Drop leaderboard snapshots nobody has viewed recently
+                self.leaderboards.prune()
+                
+                # Delete spilled message and command log segments past their retention
+                await asyncio.to_thread(self.message_cache.prune)
+                await asyncio.to_thread(self.db.command_logs.prune)
+                
+                # Persist new denylist reports
+                self.save_denylist()
+                
+                logger.info("Completed cleanup tasks")
+            except Exception as e:
+                logger.error(f"Error in cleanup tasks: {e}")
     
-    @tasks.loop(hours=1)
-    async def birthday_checker(self):
-        """Check for birthdays and send announcements."""
-        try:
-            current_date = datetime.utcnow().strftime("%m-%d")
-            
-            for guild_id, birthdays in self.db.birthdays.items():
-                guild = self.get_guild(guild_id)
-                if not guild:
-                    continue
+    @tasks.loop(time=time(hour=0, minute=5))
+    async def daily_reports(self):
+        """Post yesterday's activity report for every guild that used commands."""
+        with self.metrics.timer("task.daily_reports"):
+            try:
+                report_date = (datetime.utcnow() - timedelta(days=1)).date()
                 
-                for user_id, birthday_data in birthdays.items():
-                    if birthday_data['date'] == current_date:
-                        user = guild.get_member(user_id)
-                        if user:
-                            # Send birthday message
-                            channel_id = self.db.get_guild_config(guild_id, 'birthday_channel')
-                            if channel_id:
-                                channel = guild.get_channel(channel_id)
-                                if channel:
-                                    embed = discord.Embed(
-                                        title="🎉 Happy Birthday! 🎉",
-                                        description=f"Wishing {user.mention} a very happy birthday!",
-                                        color=discord.Color.gold()
-                                    )
-                                    await channel.send(embed=embed)
-                                    
-                                    # Give birthday tokens
-                                    self.db.add_tokens(guild_id, user_id, 100)
-        except Exception as e:
-            logger.error(f"Error in birthday checker: {e}")
+                for guild_id in list(self.db.usage_stats.daily):
+                    guild = self.get_guild(guild_id)
+                    if guild:
+                        await self.logging_events.generate_activity_report(guild, report_date)
+            except Exception as e:
+                logger.error(f"Error in daily reports: {e}")
     
-    @tasks.loop(hours=1)
+    @tasks.loop(time=[time(hour=hour) for hour in range(24)])
     async def qotd_scheduler(self):
-        """Schedule question of the day."""
-        try:
-            current_hour = datetime.utcnow().hour
-            
-            for guild_id in self.db.guild_configs:
-                config = self.db.guild_configs[guild_id]
-                qotd_hour = config.get('qotd_hour', 9)
-                
-                if current_hour == qotd_hour:
-                    qotd_channel_id = config.get('qotd_channel')
-                    if qotd_channel_id:
-                        guild = self.get_guild(guild_id)
-                        if guild:
-                            channel = guild.get_channel(qotd_channel_id)
-                            if channel:
-                                # Get random question or use default
-                                questions = [
-                                    "What's your favorite hobby and why?",
-                                    "If you could travel anywhere, where would you go?",
-                                    "What's the best advice you've ever received?",
-                                    "What's your favorite season and why?",
-                                    "If you could have dinner with anyone, who would it be?"
-                                ]
-                                import random
-                                question = random.choice(questions)
-                                
-                                embed = discord.Embed(
-                                    title="📝 Question of the Day",
-                                    description=question,
-                                    color=discord.Color.purple(),
-                                    timestamp=datetime.utcnow()
-                                )
-                                message = await channel.send(embed=embed)
-                                await message.add_reaction("💭")
-        except Exception as e:
-            logger.error(f"Error in QOTD scheduler: {e}")
+        """Post the question of the day for the guilds scheduled this hour."""
+        with self.metrics.timer("task.qotd_scheduler"):
+            try:
+                await self.scheduler.post_qotd_hour(datetime.utcnow().hour)
+            except Exception as e:
+                logger.error(f"Error in QOTD scheduler: {e}")
     
     async def is_rate_limited(self, user_id: int) -> bool:
         """Check if user is rate limited."""
@@ -265,10 +490,12 @@ class DiscordBot(commands.Bot):
         if len(self.message_tracking[user_id]) > 10:  # 10 messages per minute
             try:
                 # Timeout user for 5 minutes
-                await message.author.timeout(
-                    timedelta(minutes=5),
-                    reason="Automatic spam detection"
+                await self.rest.safety(
+                    message.author,
+                    lambda: message.author.timeout(timedelta(minutes=5), reason="Automatic spam detection"),
+                    key=f"timeout:{message.guild.id}:{user_id}"
                 )
+                self.metrics.counter('spam_timeouts_total').inc()
                 
                 # Log the action
                 await self.logging_events.log_action(
@@ -38,8 +38,7 @@ class EconomyEvents:
                     continue
                 
                 for user_id, user_data in users.items():
-                    member = guild.get_member(user_id)
-                    if not member:
+                    if not self.bot.members.in_guild(guild, user_id):
                         continue
                     
                     current_time = datetime.utcnow()
@@ -60,7 +59,7 @@ class EconomyEvents:
                             total_processed += 1
                             total_earned += tokens_earned
                             
-                            logger.debug(f"User {user_id} earned {tokens_earned} passive tokens")
+                            logger.debug("User %s earned %s passive tokens", user_id, tokens_earned)
             
             logger.info(f"Passive earnings complete: {total_processed} users processed, {total_earned} total tokens earned")
             
@@ -74,7 +73,7 @@ class EconomyEvents:
             if not guild:
                 return
             
-            member = guild.get_member(user_id)
+            member = await self.bot.members.fetch(guild, user_id)
             if not member:
                 return
             
@@ -114,7 +113,7 @@ class EconomyEvents:
                     
                     if channel:
                         try:
-                            await channel.send(embed=embed)
+                            await self.bot.rest.background(channel, lambda: channel.send(embed=embed))
                         except discord.Forbidden:
                             pass
                     
@@ -134,7 +133,7 @@ class EconomyEvents:
                                 color=discord.Color.green(),
                                 timestamp=datetime.utcnow()
                             )
-                            await member.send(embed=bonus_embed)
+                            await self.bot.rest.response(self.bot.rest.dm_bucket(member), lambda: member.send(embed=bonus_embed))
                         except discord.Forbidden:
                             pass  # User has DMs disabled
                     
@@ -180,7 +179,7 @@ class EconomyEvents:
                 if streak >= 7 and streak % 7 == 0:  # Weekly streaks
                     guild = self.bot.get_guild(guild_id)
                     if guild:
-                        member = guild.get_member(user_id)
+                        member = await self.bot.members.fetch(guild, user_id)
                         if member:
                             try:
                                 streak_embed = discord.Embed(
@@ -193,7 +192,7 @@ class EconomyEvents:
                                     color=discord.Color.orange(),
                                     timestamp=datetime.utcnow()
                                 )
-                                await member.send(embed=streak_embed)
+                                await self.bot.rest.response(self.bot.rest.dm_bucket(member), lambda: member.send(embed=streak_embed))
                             except discord.Forbidden:
                                 pass
             
@@ -227,8 +226,10 @@ class EconomyEvents:
             
             medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"]
             
+            # Only the five ranked members are requested, in one batch
+            members = await self.bot.members.fetch_many(guild, [user_id for user_id, _ in leaderboard])
             for i, (user_id, tokens) in enumerate(leaderboard):
-                member = guild.get_member(user_id)
+                member = members.get(user_id)
                 if member:
                     embed.add_field(
                         name=f"{medals[i]} {member.display_name}",
@@ -244,7 +245,7 @@ class EconomyEvents:
                     channel = guild.get_channel(log_channel_id)
             
             if channel:
-                await channel.send(embed=embed)
+                await self.bot.rest.background(channel, lambda: channel.send(embed=embed))
             
         except Exception as e:
             logger.error(f"Error handling leaderboard update: {e}")
@@ -256,8 +257,9 @@ class EconomyEvents:
             if not guild:
                 return False
             
-            from_member = guild.get_member(from_user_id)
-            to_member = guild.get_member(to_user_id)
+            members = await self.bot.members.fetch_many(guild, [from_user_id, to_user_id])
+            from_member = members.get(from_user_id)
+            to_member = members.get(to_user_id)
             
             if not from_member or not to_member:
                 return False
@@ -280,7 +282,7 @@ class EconomyEvents:
                                 color=discord.Color.orange(),
                                 timestamp=datetime.utcnow()
                             )
-                            await log_channel.send(embed=embed)
+                            await self.bot.rest.background(log_channel, lambda: log_channel.send(embed=embed))
             
             return True
             
@@ -0,0 +1,86 @@
+import asyncio
+import discord
+import logging
+from ..utils.giveaways import GIVEAWAY_EMOJI
+
+logger = logging.getLogger(__name__)
+
+class GiveawayEvents:
+    """Event handlers that record giveaway entries as members react, so drawing never pages the reaction list."""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.setup_events()
+    
+    def setup_events(self):
+        """Set up giveaway entry event handlers."""
+        # Registered as listeners so they run alongside the reaction role handlers
+        
+        async def on_raw_reaction_add(payload):
+            """Enter a member who reacted to a giveaway."""
+            entries = self.bot.db.giveaway_entries.get(payload.message_id)
+            if entries is None or str(payload.emoji) != GIVEAWAY_EMOJI:
+                return
+            if payload.member is None or payload.member.bot:
+                return
+            
+            giveaway = self.bot.db.giveaways.get(f"{payload.guild_id}-{payload.message_id}", {})
+            bonus_role_id = giveaway.get('bonus_role_id')
+            entries.add(payload.user_id, bool(bonus_role_id) and payload.member.get_role(bonus_role_id) is not None)
+        
+        async def on_raw_reaction_remove(payload):
+            """Withdraw a member who removed their giveaway reaction."""
+            entries = self.bot.db.giveaway_entries.get(payload.message_id)
+            if entries is not None and str(payload.emoji) == GIVEAWAY_EMOJI:
+                entries.remove(payload.user_id)
+        
+        async def on_raw_reaction_clear(payload):
+            """Withdraw everyone when a giveaway's reactions are cleared."""
+            entries = self.bot.db.giveaway_entries.get(payload.message_id)
+            if entries is not None:
+                entries.clear()
+        
+        async def on_raw_reaction_clear_emoji(payload):
+            """Withdraw everyone when the giveaway emoji is cleared."""
+            entries = self.bot.db.giveaway_entries.get(payload.message_id)
+            if entries is not None and str(payload.emoji) == GIVEAWAY_EMOJI:
+                entries.clear()
+        
+        async def on_raw_message_delete(payload):
+            """Cancel a giveaway whose message was deleted."""
+            if self.bot.db.giveaway_entries.pop(payload.message_id, None) is not None:
+                self.bot.scheduler.cancel_task(f"giveaway_{payload.guild_id}_{payload.message_id}")
+        
+        async def on_ready():
+            """Reconcile running giveaways after a new gateway session, since missed reactions aren't replayed."""
+            # Resumed sessions replay missed events and fire on_resumed instead
+            for entries in self.bot.db.giveaway_entries.values():
+                entries.stale = True
+            if self.bot.db.giveaway_entries:
+                asyncio.create_task(self.reconcile_all())
+        
+        for handler in (
+            on_raw_reaction_add,
+            on_raw_reaction_remove,
+            on_raw_reaction_clear,
+            on_raw_reaction_clear_emoji,
+            on_raw_message_delete,
+            on_ready
+        ):
+            self.bot.add_listener(handler)
+    
+    async def reconcile_all(self):
+        """Rebuild every stale giveaway's entrants one at a time, in the background lane."""
+        for giveaway in list(self.bot.db.giveaways.values()):
+            entries = self.bot.db.giveaway_entries.get(giveaway['message_id'])
+            if entries is None or not entries.stale:
+                continue
+            
+            channel = self.bot.get_channel(giveaway['channel_id'])
+            if not channel:
+                continue
+            
+            try:
+                await self.bot.scheduler.reconcile_giveaway(channel, giveaway['message_id'], giveaway.get('bonus_role_id'))
+            except discord.HTTPException as e:
+                logger.warning(f"Failed to reconcile giveaway {giveaway['message_id']}: {e}")
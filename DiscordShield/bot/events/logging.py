@@ -1,10 +1,15 @@
 import discord
 from discord.ext import commands
 from datetime import datetime
+from typing import Dict
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Authors and cached messages quoted in a bulk delete summary
+BULK_DELETE_AUTHORS = 5
+BULK_DELETE_EXCERPT = 10
+
 class LoggingEvents:
     """Event handlers for comprehensive server logging."""
     
@@ -15,46 +20,126 @@ class LoggingEvents:
     def setup_events(self):
         """Set up logging event handlers."""
         
+        async def on_message(message):
+            """Keep a compact copy of messages in logged guilds for edit and delete logs."""
+            if message.guild and self.get_log_channel(message.guild):
+                self.bot.message_cache.add(message)
+        
+        async def on_guild_remove(guild):
+            """Drop cached messages for a guild the bot left."""
+            self.bot.message_cache.forget_guild(guild.id)
+        
+        # Listeners, so they run alongside the spam, economy and member stats handlers
+        self.bot.add_listener(on_message)
+        self.bot.add_listener(on_guild_remove)
+        
         @self.bot.event
-        async def on_message_edit(before, after):
-            """Log message edits."""
-            if before.author.bot or not before.guild or before.content == after.content:
+        async def on_raw_message_edit(payload):
+            """Log message edits, including messages sent before the last restart if they were spilled."""
+            # Embed unfurls and other updates carry the whole message but no edit time
+            if not payload.guild_id or not payload.data.get('edited_timestamp'):
+                return
+            author = payload.data.get('author')
+            if author and author.get('bot'):
+                return
+            
+            guild = self.bot.get_guild(payload.guild_id)
+            if not guild or not self.get_log_channel(guild):
                 return
             
+            content = payload.data.get('content', '')
+            cached = await self.bot.message_cache.get(payload.guild_id, payload.message_id)
+            if cached and cached.content == content:
+                return
+            self.bot.message_cache.update(payload.guild_id, payload.message_id, content, cached)
+            
+            user_id = cached.author_id if cached else int(author['id']) if author else None
             await self.log_action(
-                before.guild,
+                guild,
                 "Message Edit",
                 (
-                    f"**User:** {before.author.mention}\n"
-                    f"**Channel:** {before.channel.mention}\n"
-                    f"**Before:** {before.content[:500]}\n"
-                    f"**After:** {after.content[:500]}\n"
-                    f"**Message ID:** {before.id}"
+                    f"**User:** {f'<@{user_id}>' if user_id else 'Unknown'}\n"
+                    f"**Channel:** <#{payload.channel_id}>\n"
+                    f"**Before:** {cached.content[:500] if cached else '*Not cached*'}\n"
+                    f"**After:** {content[:500]}\n"
+                    f"**Message ID:** {payload.message_id}"
                 ),
                 discord.Color.yellow()
             )
         
         @self.bot.event
-        async def on_message_delete(message):
-            """Log message deletions."""
-            if message.author.bot or not message.guild:
+        async def on_raw_message_delete(payload):
+            """Log message deletions from the message cache."""
+            if not payload.guild_id:
+                return
+            cached = await self.bot.message_cache.pop(payload.guild_id, payload.message_id)
+            if cached and cached.bot:
+                return
+            
+            guild = self.bot.get_guild(payload.guild_id)
+            if not guild or not self.get_log_channel(guild):
                 return
             
+            if cached:
+                content = cached.content[:500] if cached.content else '*No content*'
+                if cached.attachments:
+                    content += f" (+{cached.attachments} attachment{'s' if cached.attachments != 1 else ''})"
+            else:
+                content = '*Not cached*'
+            
             await self.log_action(
-                message.guild,
+                guild,
                 "Message Delete",
                 (
-                    f"**User:** {message.author.mention}\n"
-                    f"**Channel:** {message.channel.mention}\n"
-                    f"**Content:** {message.content[:500] if message.content else '*No content*'}\n"
-                    f"**Message ID:** {message.id}"
+                    f"**User:** {f'<@{cached.author_id}>' if cached else 'Unknown'}\n"
+                    f"**Channel:** <#{payload.channel_id}>\n"
+                    f"**Content:** {content}\n"
+                    f"**Message ID:** {payload.message_id}"
                 ),
                 discord.Color.red()
             )
         
+        @self.bot.event
+        async def on_raw_bulk_message_delete(payload):
+            """Log a purge as one summary entry instead of one per message."""
+            if not payload.guild_id:
+                return
+            cached = await self.bot.message_cache.pop_many(payload.guild_id, sorted(payload.message_ids))
+            
+            guild = self.bot.get_guild(payload.guild_id)
+            if not guild or not self.get_log_channel(guild):
+                return
+            
+            known = [message for message in cached if message and not message.bot]
+            authors: Dict[int, int] = {}
+            for message in known:
+                authors[message.author_id] = authors.get(message.author_id, 0) + 1
+            top_authors = sorted(authors.items(), key=lambda item: item[1], reverse=True)[:BULK_DELETE_AUTHORS]
+            
+            lines = [
+                f"**Channel:** <#{payload.channel_id}>",
+                f"**Messages:** {len(payload.message_ids):,} ({len(known):,} cached)"
+            ]
+            if top_authors:
+                lines.append("**Authors:** " + ", ".join(f"<@{user_id}> ×{count}" for user_id, count in top_authors))
+            
+            # The last few cached messages, oldest first, within the embed's description limit
+            excerpt = []
+            for message in known[-BULK_DELETE_EXCERPT:]:
+                if message.content:
+                    excerpt.append(f"<@{message.author_id}>: {message.content[:100]}")
+            if excerpt:
+                lines.append("**Last messages:**\n" + "\n".join(excerpt))
+            
+            await self.log_action(guild, "Bulk Message Delete", "\n".join(lines), discord.Color.dark_red())
+        
         @self.bot.event
         async def on_member_join(member):
             """Log member joins."""
+            # Skip the formatting below during join floods in guilds without logging
+            if not self.get_log_channel(member.guild):
+                return
+            
             account_age = (datetime.utcnow() - member.created_at).days
             
             embed_color = discord.Color.green()
@@ -76,6 +161,9 @@ class LoggingEvents:
         @self.bot.event
         async def on_member_remove(member):
             """Log member leaves/kicks."""
+            if not self.get_log_channel(member.guild):
+                return
+            
             await self.log_action(
                 member.guild,
                 "Member Leave",
@@ -113,6 +201,9 @@ class LoggingEvents:
         @self.bot.event
         async def on_member_update(before, after):
             """Log member updates (roles, nickname, etc.)."""
+            if not self.get_log_channel(after.guild):
+                return
+            
             changes = []
             
             # Check nickname change
@@ -256,6 +347,9 @@ class LoggingEvents:
         @self.bot.event
         async def on_voice_state_update(member, before, after):
             """Log voice channel activity."""
+            if not self.get_log_channel(member.guild):
+                return
+            
             if before.channel != after.channel:
                 if before.channel and after.channel:
                     # Channel switch
@@ -344,29 +438,44 @@ class LoggingEvents:
     
     async def log_action(self, guild, action, description, color):
         """Log an action to the guild's log channel."""
+        # Most guilds never set a log channel, so skip building the embed for them
+        if not self.get_log_channel(guild):
+            return
+        
+        embed = discord.Embed(
+            title=f"📋 {action}",
+            description=description,
+            color=color,
+            timestamp=datetime.utcnow()
+        )
+        
+        await self.send_log_embed(guild, embed)
+    
+    def get_log_channel(self, guild):
+        """Get the guild's log channel, if one is set and still exists."""
+        log_channel_id = self.bot.db.get_guild_config(guild.id, 'log_channel')
+        if not log_channel_id:
+            return None
+        return guild.get_channel(log_channel_id)
+    
+    def build_log_footer(self, guild) -> Dict[str, str]:
+        """Build the server info footer shared by a guild's log embeds."""
+        footer = {'text': f"{guild.name}"}
+        if guild.icon:
+            footer['icon_url'] = guild.icon.url
+        return footer
+    
+    async def send_log_embed(self, guild, embed):
+        """Send a prepared embed to the guild's log channel."""
         try:
-            log_channel_id = self.bot.db.get_guild_config(guild.id, 'log_channel')
-            if not log_channel_id:
-                return
-            
-            log_channel = guild.get_channel(log_channel_id)
+            log_channel = self.get_log_channel(guild)
             if not log_channel:
                 return
             
-            embed = discord.Embed(
-                title=f"📋 {action}",
-                description=description,
-                color=color,
-                timestamp=datetime.utcnow()
-            )
-            
             # Add server info in footer
-            embed.set_footer(
-                text=f"{guild.name}",
-                icon_url=guild.icon.url if guild.icon else None
-            )
+            embed.set_footer(**self.bot.embeds.get(guild, 'log_footer', self.build_log_footer))
             
-            await log_channel.send(embed=embed)
+            await self.bot.rest.background(log_channel, lambda: log_channel.send(embed=embed))
             
         except discord.Forbidden:
             logger.warning(f"No permission to send logs in {guild.name}")
@@ -433,41 +542,19 @@ class LoggingEvents:
         except Exception as e:
             logger.error(f"Error logging economy transaction: {e}")
     
-    async def generate_activity_report(self, guild):
-        """Generate a daily activity report."""
+    async def generate_activity_report(self, guild, day=None):
+        """Generate a daily activity report from the pre-aggregated usage counters."""
         try:
-            current_date = datetime.utcnow().date()
+            report_date = day or datetime.utcnow().date()
             
-            # Get command usage for today
-            command_logs = self.bot.db.command_logs.get(guild.id, [])
-            today_commands = [
-                log for log in command_logs
-                if log['timestamp'].date() == current_date
-            ]
-            
-            if not today_commands:
+            usage = self.bot.db.usage_stats.day(guild.id, report_date)
+            if not usage or not usage.commands:
                 return
             
-            # Count command usage
-            command_counts = {}
-            user_counts = {}
-            success_count = 0
-            
-            for log in today_commands:
-                command = log['command']
-                user_id = log['user_id']
-                success = log['success']
-                
-                command_counts[command] = command_counts.get(command, 0) + 1
-                user_counts[user_id] = user_counts.get(user_id, 0) + 1
-                
-                if success:
-                    success_count += 1
-            
             # Create report
             embed = discord.Embed(
                 title="📊 Daily Activity Report",
-                description=f"Activity summary for {current_date}",
+                description=f"Activity summary for {report_date}",
                 color=discord.Color.blue(),
                 timestamp=datetime.utcnow()
             )
@@ -475,15 +562,15 @@ class LoggingEvents:
             embed.add_field(
                 name="📈 Command Usage",
                 value=(
-                    f"**Total Commands:** {len(today_commands)}\n"
-                    f"**Successful:** {success_count}\n"
-                    f"**Success Rate:** {(success_count/len(today_commands)*100):.1f}%"
+                    f"**Total Commands:** {usage.commands}\n"
+                    f"**Successful:** {usage.successes}\n"
+                    f"**Success Rate:** {(usage.successes/usage.commands*100):.1f}%"
                 ),
                 inline=True
             )
             
             # Top commands
-            top_commands = sorted(command_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+            top_commands = usage.top_commands(5)
             if top_commands:
                 embed.add_field(
                     name="🔥 Top Commands",
@@ -494,11 +581,11 @@ class LoggingEvents:
             # Active users
             embed.add_field(
                 name="👥 Active Users",
-                value=f"{len(user_counts)} unique users",
+                value=f"~{usage.users.count()} unique users",
                 inline=True
             )
             
-            await self.log_action(guild, "Daily Report", "", discord.Color.blue())
+            await self.send_log_embed(guild, embed)
             
         except Exception as e:
             logger.error(f"Error generating activity report: {e}")
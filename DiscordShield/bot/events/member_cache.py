@@ -0,0 +1,46 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+class MemberCacheEvents:
+    """Event handlers that keep recently active members in the member LRU."""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.setup_events()
+    
+    def setup_events(self):
+        """Set up member LRU event handlers."""
+        # Registered as listeners so they run alongside every other handler of these events
+        
+        async def on_message(message):
+            """Hold the author of a guild message."""
+            if message.guild:
+                self.bot.members.remember(message.author)
+        
+        async def on_raw_reaction_add(payload):
+            """Hold a member who reacted."""
+            if payload.member is not None:
+                self.bot.members.remember(payload.member)
+        
+        async def on_interaction(interaction):
+            """Hold a member who used a command or component."""
+            if interaction.guild_id:
+                self.bot.members.remember(interaction.user)
+        
+        async def on_member_join(member):
+            """Hold a member who just joined."""
+            self.bot.members.remember(member)
+        
+        async def on_guild_remove(guild):
+            """Drop the members of a guild the bot left."""
+            self.bot.members.forget_guild(guild.id)
+        
+        for handler in (
+            on_message,
+            on_raw_reaction_add,
+            on_interaction,
+            on_member_join,
+            on_guild_remove
+        ):
+            self.bot.add_listener(handler)
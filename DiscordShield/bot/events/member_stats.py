@@ -0,0 +1,53 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+class MemberStatsEvents:
+    """Event handlers that keep the per-guild member counters current."""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.setup_events()
+    
+    def setup_events(self):
+        """Set up member counter event handlers."""
+        # Registered as listeners so they run alongside the other on_member_* handlers
+        
+        async def on_guild_available(guild):
+            """Count members once a guild is available."""
+            self.bot.member_stats.rebuild(guild)
+        
+        async def on_guild_join(guild):
+            """Count members of a newly joined guild."""
+            self.bot.member_stats.rebuild(guild)
+        
+        async def on_guild_remove(guild):
+            """Drop counters for a guild the bot left."""
+            self.bot.member_stats.forget(guild)
+        
+        async def on_member_join(member):
+            """Count a joining member."""
+            self.bot.member_stats.member_added(member)
+        
+        async def on_member_remove(member):
+            """Uncount a leaving member."""
+            self.bot.member_stats.member_removed(member)
+        
+        async def on_raw_member_remove(payload):
+            """Unindex a leaving member, including ones outside the member cache."""
+            self.bot.member_stats.member_left(payload.guild_id, payload.user.id)
+        
+        async def on_presence_update(before, after):
+            """Track status changes."""
+            self.bot.member_stats.status_changed(before, after)
+        
+        for handler in (
+            on_guild_available,
+            on_guild_join,
+            on_guild_remove,
+            on_member_join,
+            on_member_remove,
+            on_raw_member_remove,
+            on_presence_update
+        ):
+            self.bot.add_listener(handler)
@@ -1,11 +1,32 @@
+import asyncio
 import discord
 from discord.ext import commands
 from datetime import datetime, timedelta
 import re
 import logging
+from typing import List, Optional, Tuple
+from ..utils.embeds import EmbedTemplate
+from ..utils.denylist import REASON_BAN, REASON_RAID, REASON_NAMES
+from ..utils.permissions import Permissions
 
 logger = logging.getLogger(__name__)
 
+WELCOME_TEMPLATE = EmbedTemplate(
+    title="👋 Welcome!",
+    color=discord.Color.green(),
+    fields=[(
+        "📋 Getting Started",
+        (
+            "• Check out the rules\n"
+            "• Introduce yourself\n"
+            "• Have fun!"
+        ),
+        False
+    )]
+)
+
+BOOST_TEMPLATE = EmbedTemplate(title="🚀 Thank You for Boosting!", color=discord.Color.purple())
+
 class ModerationEvents:
     """Event handlers for automated moderation features."""
     
@@ -22,12 +43,15 @@ class ModerationEvents:
     def setup_events(self):
         """Set up event handlers."""
         
-        @self.bot.event
         async def on_message(message):
-            """Handle message events for spam detection and word filtering."""
+            """Handle message events for scam matching, spam detection and word filtering."""
             if message.author.bot or not message.guild:
                 return
             
+            # Known scams are dropped before the per-guild checks run
+            if await self.check_scam(message):
+                return
+            
             # Check for spam
             is_spam = await self.bot.check_spam(message)
             if is_spam:
@@ -39,9 +63,15 @@ class ModerationEvents:
             # Process commands (this ensures commands still work)
             await self.bot.process_commands(message)
         
-        @self.bot.event
+        # Registered as a listener since the economy handler of the same name uses @bot.event
+        self.bot.add_listener(on_message)
+        
         async def on_member_join(member):
-            """Handle member join events for raid detection."""
+            """Handle member join events for denylist screening and raid detection."""
+            # Listed users are removed before any welcome or auto-role work is queued
+            if await self.screen_denylisted(member):
+                return
+            
             await self.check_raid_detection(member)
             
             # Auto-role assignment
@@ -50,7 +80,11 @@ class ModerationEvents:
                 auto_role = member.guild.get_role(auto_role_id)
                 if auto_role and auto_role < member.guild.me.top_role:
                     try:
-                        await member.add_roles(auto_role, reason="Auto-role assignment")
+                        await self.bot.rest.response(
+                            member,
+                            lambda: member.add_roles(auto_role, reason="Auto-role assignment"),
+                            key=f"add_role:{member.guild.id}:{member.id}:{auto_role.id}"
+                        )
                     except discord.Forbidden:
                         logger.warning(f"Failed to assign auto-role in {member.guild.name}")
             
@@ -59,28 +93,26 @@ class ModerationEvents:
             if welcome_channel_id:
                 welcome_channel = member.guild.get_channel(welcome_channel_id)
                 if welcome_channel:
-                    embed = discord.Embed(
-                        title="👋 Welcome!",
-                        description=f"Welcome to **{member.guild.name}**, {member.mention}!",
-                        color=discord.Color.green(),
-                        timestamp=datetime.utcnow()
-                    )
-                    embed.set_thumbnail(url=member.display_avatar.url)
-                    embed.add_field(
-                        name="📋 Getting Started",
-                        value=(
-                            "• Check out the rules\n"
-                            "• Introduce yourself\n"
-                            "• Have fun!"
-                        ),
-                        inline=False
+                    head, tail = self.bot.embeds.get(member.guild, 'welcome', self.build_welcome_description)
+                    embed = WELCOME_TEMPLATE.render(
+                        description=head + member.mention + tail,
+                        thumbnail=member.display_avatar.url
                     )
                     
                     try:
-                        await welcome_channel.send(embed=embed)
+                        await self.bot.rest.background(welcome_channel, lambda: welcome_channel.send(embed=embed))
                     except discord.Forbidden:
                         pass
         
+        async def on_member_ban(guild, user):
+            """Report users banned in a participating guild to the shared denylist."""
+            if self.bot.db.get_guild_config(guild.id, 'denylist') not in (None, 'off'):
+                self.bot.denylist.add(user.id, REASON_BAN)
+        
+        # Registered as listeners since the logging handlers of the same events use @bot.event
+        self.bot.add_listener(on_member_join)
+        self.bot.add_listener(on_member_ban)
+        
         @self.bot.event
         async def on_member_update(before, after):
             """Handle member update events for boost detection."""
@@ -101,6 +133,42 @@ class ModerationEvents:
             """Handle reaction role removals."""
             await self.handle_reaction_role(payload, add=False)
     
+    async def check_scam(self, message) -> bool:
+        """Delete a message matching a scam flagged in any opted-in guild. Returns True if it was deleted."""
+        if not message.content or self.bot.db.get_guild_config(message.guild.id, 'scam_filter') != 'on':
+            return False
+        if Permissions.is_moderator(message.author):
+            return False
+        
+        scam_cache = self.bot.scam_cache
+        matched = scam_cache.match(message.content)
+        if matched is None:
+            # The same linked message posted by several authors across guilds is flagged without waiting for a moderator
+            if not scam_cache.observe(message.content, message.guild.id, message.author.id):
+                return False
+            matched = "message posted across servers"
+        
+        try:
+            await self.bot.rest.safety(message, message.delete, key=f"delete:{message.id}")
+            self.bot.metrics.counter('scam_messages_total').inc()
+        except discord.NotFound:
+            pass  # Message already deleted
+        except discord.Forbidden:
+            logger.warning(f"Missing permissions to delete scam message in {message.guild.name}")
+            return False
+        
+        await self.bot.logging_events.log_action(
+            message.guild,
+            "Scam Message Removed",
+            (
+                f"**User:** {message.author.mention}\n"
+                f"**Channel:** {message.channel.mention}\n"
+                f"**Matched:** {matched}"
+            ),
+            discord.Color.red()
+        )
+        return True
+    
     async def check_word_filter(self, message):
         """Check message against word filter."""
         try:
@@ -114,7 +182,8 @@ class ModerationEvents:
             for word in banned_words:
                 if re.search(r'\b' + re.escape(word.lower()) + r'\b', content_lower):
                     try:
-                        await message.delete()
+                        await self.bot.rest.safety(message, message.delete, key=f"delete:{message.id}")
+                        self.bot.metrics.counter('word_filter_hits_total').inc()
                         
                         # Send warning to user
                         embed = discord.Embed(
@@ -125,7 +194,10 @@ class ModerationEvents:
                         )
                         
                         try:
-                            await message.author.send(embed=embed)
+                            await self.bot.rest.response(
+                                self.bot.rest.dm_bucket(message.author),
+                                lambda: message.author.send(embed=embed)
+                            )
                         except discord.Forbidden:
                             pass  # User has DMs disabled
                         
@@ -144,7 +216,7 @@ class ModerationEvents:
                                     color=discord.Color.red(),
                                     timestamp=datetime.utcnow()
                                 )
-                                await log_channel.send(embed=log_embed)
+                                await self.bot.rest.background(log_channel, lambda: log_channel.send(embed=log_embed))
                         
                         return True
                     
@@ -158,6 +230,44 @@ class ModerationEvents:
         except Exception as e:
             logger.error(f"Error in word filter: {e}")
     
+    async def screen_denylisted(self, member) -> bool:
+        """Act on a listed user joining a participating guild. Returns True if they were removed."""
+        action = self.bot.db.get_guild_config(member.guild.id, 'denylist')
+        if action in (None, 'off') or member.bot or member.id not in self.bot.denylist:
+            return False
+        
+        reason = REASON_NAMES.get(self.bot.denylist.reason(member.id), 'listed')
+        removed = False
+        try:
+            if action == 'ban':
+                await self.bot.rest.safety(
+                    member,
+                    lambda: member.ban(reason=f"Shared denylist ({reason})"),
+                    key=f"ban:{member.guild.id}:{member.id}"
+                )
+                removed = True
+            elif action == 'kick':
+                await self.bot.rest.safety(
+                    member,
+                    lambda: member.kick(reason=f"Shared denylist ({reason})"),
+                    key=f"kick:{member.guild.id}:{member.id}"
+                )
+                removed = True
+        except discord.Forbidden:
+            logger.warning(f"Missing permissions to {action} denylisted user in {member.guild.name}")
+        
+        await self.bot.logging_events.log_action(
+            member.guild,
+            "Denylisted User Joined",
+            (
+                f"**User:** {member.mention} ({member.id})\n"
+                f"**Listed for:** {reason}\n"
+                f"**Action:** {action if removed else 'alert only'}"
+            ),
+            discord.Color.dark_red()
+        )
+        return removed
+    
     async def check_raid_detection(self, member):
         """Check for potential raid and trigger lockdown if needed."""
         try:
@@ -169,12 +279,12 @@ class ModerationEvents:
                 self.recent_joins[guild_id] = []
             
             # Add current join
-            self.recent_joins[guild_id].append(current_time)
+            self.recent_joins[guild_id].append((current_time, member.id))
             
             # Clean old joins (older than 60 seconds)
             cutoff_time = current_time - timedelta(seconds=60)
             self.recent_joins[guild_id] = [
-                join_time for join_time in self.recent_joins[guild_id]
+                (join_time, user_id) for join_time, user_id in self.recent_joins[guild_id]
                 if join_time > cutoff_time
             ]
             
@@ -183,7 +293,8 @@ class ModerationEvents:
                 logger.warning(f"Raid detected in {member.guild.name}! Triggering lockdown.")
                 
                 # Trigger automatic lockdown
-                await self.trigger_raid_lockdown(member.guild)
+                cohort = [user_id for _, user_id in self.recent_joins[guild_id]]
+                await self.trigger_raid_lockdown(member.guild, cohort)
                 
                 # Reset counter
                 self.recent_joins[guild_id] = []
@@ -191,9 +302,15 @@ class ModerationEvents:
         except Exception as e:
             logger.error(f"Error in raid detection: {e}")
     
-    async def trigger_raid_lockdown(self, guild):
+    async def trigger_raid_lockdown(self, guild, cohort: Optional[List[int]] = None):
         """Trigger automatic server lockdown due to raid detection."""
         try:
+            self.bot.metrics.counter('raid_lockdowns_total').inc()
+            
+            # Participating guilds share the accounts that joined in the raid window
+            if cohort and self.bot.db.get_guild_config(guild.id, 'denylist') not in (None, 'off'):
+                listed = self.bot.denylist.add_many(cohort, REASON_RAID)
+                logger.info(f"Added {listed} raid accounts from {guild.name} to the denylist")
             locked_channels = []
             everyone_role = guild.default_role
             
@@ -209,9 +326,10 @@ class ModerationEvents:
                         
                         overwrites[everyone_role].send_messages = False
                         
-                        await channel.edit(
-                            overwrites=overwrites,
-                            reason="Automatic raid detection lockdown"
+                        await self.bot.rest.safety(
+                            channel,
+                            lambda: channel.edit(overwrites=overwrites, reason="Automatic raid detection lockdown"),
+                            key=f"lock:{channel.id}"
                         )
                         locked_channels.append(channel.mention)
                         
@@ -243,7 +361,7 @@ class ModerationEvents:
                         color=discord.Color.red(),
                         timestamp=datetime.utcnow()
                     )
-                    await log_channel.send(embed=embed)
+                    await self.bot.rest.background(log_channel, lambda: log_channel.send(embed=embed))
             
             # Try to notify owner
             if guild.owner:
@@ -258,7 +376,7 @@ class ModerationEvents:
                         color=discord.Color.red(),
                         timestamp=datetime.utcnow()
                     )
-                    await guild.owner.send(embed=dm_embed)
+                    await self.bot.rest.response(self.bot.rest.dm_bucket(guild.owner), lambda: guild.owner.send(embed=dm_embed))
                 except discord.Forbidden:
                     pass  # Owner has DMs disabled
             
@@ -274,7 +392,11 @@ class ModerationEvents:
                 boost_role = member.guild.get_role(boost_role_id)
                 if boost_role and boost_role < member.guild.me.top_role:
                     try:
-                        await member.add_roles(boost_role, reason="Server boost reward")
+                        await self.bot.rest.response(
+                            member,
+                            lambda: member.add_roles(boost_role, reason="Server boost reward"),
+                            key=f"add_role:{member.guild.id}:{member.id}:{boost_role.id}"
+                        )
                     except discord.Forbidden:
                         pass
             
@@ -284,17 +406,8 @@ class ModerationEvents:
                 self.bot.db.add_tokens(member.guild.id, member.id, boost_tokens)
             
             # Send thank you message
-            embed = discord.Embed(
-                title="🚀 Thank You for Boosting!",
-                description=(
-                    f"Thanks for boosting **{member.guild.name}**, {member.mention}!\n\n"
-                    f"**Rewards:**\n"
-                    f"• Role: {boost_role.mention if boost_role_id and member.guild.get_role(boost_role_id) else 'None'}\n"
-                    f"• Bonus tokens: {boost_tokens:,}"
-                ),
-                color=discord.Color.purple(),
-                timestamp=datetime.utcnow()
-            )
+            head, tail = self.bot.embeds.get(member.guild, 'boost', self.build_boost_description)
+            embed = BOOST_TEMPLATE.render(description=head + member.mention + tail)
             
             # Send in system channel or log channel
             channel = member.guild.system_channel
@@ -304,11 +417,30 @@ class ModerationEvents:
                     channel = member.guild.get_channel(log_channel_id)
             
             if channel:
-                await channel.send(embed=embed)
+                await self.bot.rest.background(channel, lambda: channel.send(embed=embed))
             
         except Exception as e:
             logger.error(f"Error handling boost start: {e}")
     
+    def build_welcome_description(self, guild) -> Tuple[str, str]:
+        """Build a guild's welcome text as the parts before and after the member mention."""
+        return f"Welcome to **{guild.name}**, ", "!"
+    
+    def build_boost_description(self, guild) -> Tuple[str, str]:
+        """Build a guild's boost thank-you text as the parts before and after the member mention."""
+        boost_role_id = self.bot.db.get_guild_config(guild.id, 'boost_role')
+        boost_role = guild.get_role(boost_role_id) if boost_role_id else None
+        boost_tokens = self.bot.db.get_guild_config(guild.id, 'boost_tokens') or 0
+        return (
+            f"Thanks for boosting **{guild.name}**, ",
+            (
+                f"!\n\n"
+                f"**Rewards:**\n"
+                f"• Role: {boost_role.mention if boost_role else 'None'}\n"
+                f"• Bonus tokens: {boost_tokens:,}"
+            )
+        )
+    
     async def handle_boost_end(self, member):
         """Handle when a member stops boosting."""
         try:
@@ -318,7 +450,11 @@ class ModerationEvents:
                 boost_role = member.guild.get_role(boost_role_id)
                 if boost_role and boost_role in member.roles:
                     try:
-                        await member.remove_roles(boost_role, reason="Server boost ended")
+                        await self.bot.rest.response(
+                            member,
+                            lambda: member.remove_roles(boost_role, reason="Server boost ended"),
+                            key=f"remove_role:{member.guild.id}:{member.id}:{boost_role.id}"
+                        )
                     except discord.Forbidden:
                         pass
             
@@ -335,10 +471,6 @@ class ModerationEvents:
             if not guild:
                 return
             
-            member = guild.get_member(payload.user_id)
-            if not member:
-                return
-            
             # Check if this message has reaction roles
             reaction_roles = self.bot.db.reaction_roles.get(guild.id, {})
             message_reactions = reaction_roles.get(payload.message_id, {})
@@ -347,6 +479,11 @@ class ModerationEvents:
             if emoji_str not in message_reactions:
                 return
             
+            # Removal events carry no member, so one may need fetching
+            member = payload.member or await self.bot.members.fetch(guild, payload.user_id)
+            if not member:
+                return
+            
             role_id = message_reactions[emoji_str]
             role = guild.get_role(role_id)
             
@@ -361,9 +498,17 @@ class ModerationEvents:
             
             try:
                 if add and role not in member.roles:
-                    await member.add_roles(role, reason="Reaction role assignment")
+                    await self.bot.rest.response(
+                        member,
+                        lambda: member.add_roles(role, reason="Reaction role assignment"),
+                        key=f"add_role:{guild.id}:{member.id}:{role.id}"
+                    )
                 elif not add and role in member.roles:
-                    await member.remove_roles(role, reason="Reaction role removal")
+                    await self.bot.rest.response(
+                        member,
+                        lambda: member.remove_roles(role, reason="Reaction role removal"),
+                        key=f"remove_role:{guild.id}:{member.id}:{role.id}"
+                    )
             
             except discord.Forbidden:
                 logger.warning(f"Failed to assign reaction role {role.name} in {guild.name}")
@@ -371,6 +516,21 @@ class ModerationEvents:
         except Exception as e:
             logger.error(f"Error in reaction role handler: {e}")
     
+    async def timeout_dm_spammer(self, guild, user_id):
+        """Time out a DM spammer in one of their guilds."""
+        try:
+            member = await self.bot.members.fetch(guild, user_id)
+            if member:
+                await self.bot.rest.safety(
+                    member,
+                    lambda: member.timeout(timedelta(minutes=10), reason="Automatic DM spam detection"),
+                    key=f"timeout:{guild.id}:{user_id}"
+                )
+        except discord.Forbidden:
+            pass
+        except Exception as e:
+            logger.error(f"Error timing out DM spammer {user_id} in {guild.name}: {e}")
+    
     async def check_dm_spam(self, user_id):
         """Check for DM spam attempts."""
         try:
@@ -391,19 +551,9 @@ class ModerationEvents:
             
             # Check if spam threshold exceeded (5 DM attempts in 5 minutes)
             if len(self.dm_tracking[user_id]) >= 5:
-                # Timeout user in all mutual guilds
-                user = self.bot.get_user(user_id)
-                if user:
-                    for guild in self.bot.guilds:
-                        member = guild.get_member(user_id)
-                        if member:
-                            try:
-                                await member.timeout(
-                                    timedelta(minutes=10),
-                                    reason="Automatic DM spam detection"
-                                )
-                            except discord.Forbidden:
-                                pass
+                # Timeout user in all mutual guilds at once, found from the user -> guilds index
+                guilds = [guild for guild in map(self.bot.get_guild, self.bot.member_stats.guilds_of(user_id)) if guild]
+                await asyncio.gather(*(self.timeout_dm_spammer(guild, user_id) for guild in guilds))
                 
                 # Reset counter
                 self.dm_tracking[user_id] = []
@@ -0,0 +1,64 @@
+import logging
+from ..utils.permissions import TICKET_ROLE_PERMISSIONS
+
+logger = logging.getLogger(__name__)
+
+class PermissionEvents:
+    """Event handlers that drop cached permissions when roles, members or overwrites change."""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.setup_events()
+    
+    def setup_events(self):
+        """Set up permission cache event handlers."""
+        # Registered as listeners so they run alongside the logging handlers of the same events
+        cache = self.bot.permission_cache
+        
+        async def on_guild_role_create(role):
+            """Pick up a new role for tickets. Nobody holds it yet, so no member bitfield changes."""
+            if role.permissions.value & TICKET_ROLE_PERMISSIONS:
+                cache.ticket_roles.pop(role.guild.id, None)
+        
+        async def on_guild_role_update(before, after):
+            """Drop a guild's folded permissions after a role's permissions changed."""
+            if before.permissions != after.permissions:
+                cache.roles_changed(after.guild.id)
+        
+        async def on_guild_role_delete(role):
+            """Drop a guild's folded permissions after a role was deleted."""
+            cache.roles_changed(role.guild.id)
+        
+        async def on_member_update(before, after):
+            """Drop a member's bitfield after their roles changed."""
+            if before.roles != after.roles:
+                cache.member_changed(after.guild.id, after.id, after.id == self.bot.user.id)
+        
+        async def on_raw_member_remove(payload):
+            """Drop a leaving member's bitfield."""
+            cache.member_changed(payload.guild_id, payload.user.id)
+        
+        async def on_guild_channel_update(before, after):
+            """Drop the bot's permissions in a channel whose overwrites changed."""
+            if before.overwrites != after.overwrites:
+                cache.channel_changed(after.guild.id, after.id)
+        
+        async def on_guild_channel_delete(channel):
+            """Drop the bot's permissions in a deleted channel."""
+            cache.channel_changed(channel.guild.id, channel.id)
+        
+        async def on_guild_remove(guild):
+            """Drop everything cached for a guild the bot left."""
+            cache.forget_guild(guild.id)
+        
+        for handler in (
+            on_guild_role_create,
+            on_guild_role_update,
+            on_guild_role_delete,
+            on_member_update,
+            on_raw_member_remove,
+            on_guild_channel_update,
+            on_guild_channel_delete,
+            on_guild_remove
+        ):
+            self.bot.add_listener(handler)
@@ -0,0 +1,96 @@
+import discord
+import logging
+from ..utils.polls import POLL_EMOJIS, poll_id, cast_vote, withdraw_vote, clear_votes
+
+logger = logging.getLogger(__name__)
+
+class PollEvents:
+    """Event handlers that keep poll tallies current as members react."""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.setup_events()
+    
+    def get_open_poll(self, payload):
+        """Get the open poll a reaction payload belongs to, if any."""
+        if not payload.guild_id:
+            return None, None
+        key = poll_id(payload.guild_id, payload.message_id)
+        poll = self.bot.db.polls.get(key)
+        if not poll or poll.get('closed') or 'counts' not in poll:
+            return None, None
+        return key, poll
+    
+    def setup_events(self):
+        """Set up poll tally event handlers."""
+        # Registered as listeners so they run alongside the reaction role and giveaway handlers
+        
+        async def on_raw_reaction_add(payload):
+            """Count a vote, moving the member's vote if they had already voted."""
+            key, poll = self.get_open_poll(payload)
+            if poll is None or payload.member is None or payload.member.bot:
+                return
+            
+            emoji = str(payload.emoji)
+            if emoji not in POLL_EMOJIS[:len(poll['options'])]:
+                return
+            
+            previous = cast_vote(poll, payload.user_id, POLL_EMOJIS.index(emoji))
+            self.bot.poll_editor.touch(key)
+            
+            if previous is not None:
+                # One vote per person: take back the reaction for the option they left
+                channel = self.bot.get_channel(payload.channel_id)
+                if channel:
+                    message = channel.get_partial_message(payload.message_id)
+                    try:
+                        await self.bot.rest.background(
+                            channel,
+                            lambda: message.remove_reaction(POLL_EMOJIS[previous], discord.Object(payload.user_id)),
+                            key=f"poll_unvote:{payload.message_id}:{payload.user_id}:{previous}"
+                        )
+                    except discord.HTTPException as e:
+                        logger.warning(f"Failed to remove switched poll vote in {payload.message_id}: {e}")
+        
+        async def on_raw_reaction_remove(payload):
+            """Uncount a vote whose reaction was removed."""
+            key, poll = self.get_open_poll(payload)
+            emoji = str(payload.emoji)
+            if poll is None or emoji not in POLL_EMOJIS[:len(poll['options'])]:
+                return
+            
+            if withdraw_vote(poll, payload.user_id, POLL_EMOJIS.index(emoji)):
+                self.bot.poll_editor.touch(key)
+        
+        async def on_raw_reaction_clear(payload):
+            """Uncount every vote when a poll's reactions are cleared."""
+            key, poll = self.get_open_poll(payload)
+            if poll is not None:
+                clear_votes(poll)
+                self.bot.poll_editor.touch(key)
+        
+        async def on_raw_reaction_clear_emoji(payload):
+            """Uncount an option's votes when its reaction is cleared."""
+            key, poll = self.get_open_poll(payload)
+            emoji = str(payload.emoji)
+            if poll is not None and emoji in POLL_EMOJIS[:len(poll['options'])]:
+                clear_votes(poll, POLL_EMOJIS.index(emoji))
+                self.bot.poll_editor.touch(key)
+        
+        async def on_raw_message_delete(payload):
+            """Drop a poll whose message was deleted."""
+            if not payload.guild_id:
+                return
+            key = poll_id(payload.guild_id, payload.message_id)
+            if self.bot.db.polls.pop(key, None) is not None:
+                self.bot.poll_editor.forget(key)
+                self.bot.scheduler.cancel_task(f"poll_{key}")
+        
+        for handler in (
+            on_raw_reaction_add,
+            on_raw_reaction_remove,
+            on_raw_reaction_clear,
+            on_raw_reaction_clear_emoji,
+            on_raw_message_delete
+        ):
+            self.bot.add_listener(handler)
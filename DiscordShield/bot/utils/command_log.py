@@ -0,0 +1,222 @@
+import asyncio
+import os
+import queue
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (timestamp, user_id, command_id, success)
+RECORD = struct.Struct('<dQHB')
+
+class CommandLog:
+    """Fixed-capacity per-guild command log that can spill old entries to disk."""
+    
+    def __init__(
+        self,
+        capacity: int = 1000,
+        directory: Optional[str] = None,
+        spill_bytes: int = 65536,
+        retention: timedelta = timedelta(days=30)
+    ):
+        self.capacity = capacity
+        # Without a directory, evicted entries are dropped rather than spilled
+        self.directory = directory
+        self.spill_bytes = spill_bytes
+        self.retention = retention
+        
+        # Recent entries per guild, oldest first
+        self.buffers: Dict[int, deque] = {}
+        
+        # Evicted entries waiting to be written, keyed by guild then day
+        self.pending: Dict[int, Dict[date, bytearray]] = {}
+        self.pending_size = 0
+        
+        # Interned command names
+        self.command_ids: Dict[str, int] = {}
+        self.command_names: List[str] = []
+        self._load_command_names()
+        
+        # Appends are handed to a writer thread so disk I/O stays off the event loop
+        self.writes: queue.Queue = queue.Queue()
+        self.writer: Optional[threading.Thread] = None
+    
+    def _load_command_names(self):
+        """Load the command name table written by previous runs."""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, 'commands.txt')
+        if not os.path.exists(path):
+            return
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    name = line.rstrip('\n')
+                    self.command_ids[name] = len(self.command_names)
+                    self.command_names.append(name)
+        except OSError as e:
+            logger.error(f"Failed to load command names: {e}")
+    
+    def intern(self, command: str) -> int:
+        """Get the ID for a command name, assigning one if it is new."""
+        command_id = self.command_ids.get(command)
+        if command_id is not None:
+            return command_id
+        
+        command_id = len(self.command_names)
+        self.command_ids[command] = command_id
+        self.command_names.append(command)
+        if self.directory:
+            self._write(os.path.join(self.directory, 'commands.txt'), (command + '\n').encode('utf-8'))
+        return command_id
+    
+    def append(self, guild_id: int, user_id: int, command: str, success: bool, timestamp: Optional[float] = None):
+        """Record a command. Evicts the oldest entry to disk when the buffer is full."""
+        buffer = self.buffers.get(guild_id)
+        if buffer is None:
+            buffer = self.buffers[guild_id] = deque(maxlen=self.capacity)
+        
+        if len(buffer) == self.capacity:
+            self._spill(guild_id, buffer[0])
+        
+        buffer.append((timestamp or time.time(), user_id, self.intern(command), success))
+    
+    def _spill(self, guild_id: int, record: Tuple[float, int, int, bool]):
+        """Queue an evicted record for the on-disk segment of its day."""
+        if not self.directory:
+            return
+        day = datetime.utcfromtimestamp(record[0]).date()
+        guild_pending = self.pending.setdefault(guild_id, {})
+        guild_pending.setdefault(day, bytearray()).extend(RECORD.pack(*record))
+        self.pending_size += RECORD.size
+        
+        if self.pending_size >= self.spill_bytes:
+            self.flush()
+    
+    def _segment_path(self, guild_id: int, day: date) -> str:
+        """Get the segment file path for a guild and day."""
+        return os.path.join(self.directory, str(guild_id), f"{day.isoformat()}.seg")
+    
+    def flush(self):
+        """Hand all queued evicted records to the writer thread."""
+        for guild_id, days in self.pending.items():
+            for day, data in days.items():
+                self._write(self._segment_path(guild_id, day), bytes(data))
+        
+        self.pending.clear()
+        self.pending_size = 0
+    
+    def _write(self, path: str, data: bytes):
+        """Queue an append, starting the writer thread if it isn't running."""
+        if self.writer is None or not self.writer.is_alive():
+            self.writer = threading.Thread(target=self._run_writer, name='command-log-writer', daemon=True)
+            self.writer.start()
+        self.writes.put((path, data))
+    
+    def _run_writer(self):
+        """Append queued data to its file until told to stop."""
+        while True:
+            item = self.writes.get()
+            try:
+                if item is None:
+                    return
+                path, data = item
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, 'ab') as f:
+                        f.write(data)
+                except OSError as e:
+                    logger.error(f"Failed to write command log file {path}: {e}")
+            finally:
+                self.writes.task_done()
+    
+    def wait(self):
+        """Block until every queued append has reached disk."""
+        if self.writer is not None:
+            self.writes.join()
+    
+    def close(self):
+        """Write everything still pending and stop the writer thread."""
+        self.flush()
+        if self.writer is not None and self.writer.is_alive():
+            self.writes.put(None)
+            self.writer.join()
+        self.writer = None
+    
+    def _read_segment(self, guild_id: int, day: date, pending: bytes) -> List[Tuple[float, int, int, bool]]:
+        """Read the on-disk and queued records for a guild and day. Runs in a thread."""
+        records: List[Tuple[float, int, int, bool]] = []
+        if not self.directory:
+            return records
+        # Appends still queued would otherwise be missing from the file
+        self.wait()
+        path = self._segment_path(guild_id, day)
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                # Ignore a torn trailing record from an interrupted write
+                usable = len(data) - len(data) % RECORD.size
+                records.extend(RECORD.iter_unpack(data[:usable]))
+            except OSError as e:
+                logger.error(f"Failed to read command log segment {path}: {e}")
+        
+        if pending:
+            records.extend(RECORD.iter_unpack(pending))
+        return records
+    
+    def _to_entry(self, record: Tuple[float, int, int, bool]) -> Dict[str, Any]:
+        """Expand a packed record into a log entry."""
+        timestamp, user_id, command_id, success = record
+        return {
+            'user_id': user_id,
+            'command': self.command_names[command_id],
+            'success': bool(success),
+            'timestamp': datetime.utcfromtimestamp(timestamp)
+        }
+    
+    def recent(self, guild_id: int) -> List[Dict[str, Any]]:
+        """Get the in-memory entries for a guild, oldest first."""
+        return [self._to_entry(record) for record in self.buffers.get(guild_id, ())]
+    
+    async def entries_for_day(self, guild_id: int, day: date) -> List[Dict[str, Any]]:
+        """Get every entry for a guild on a given UTC day, reading spilled ones off the event loop."""
+        # Queued records are copied here, since flush may run while the thread reads
+        pending = bytes(self.pending.get(guild_id, {}).get(day, b''))
+        spilled = await asyncio.to_thread(self._read_segment, guild_id, day, pending)
+        entries = [self._to_entry(record) for record in spilled]
+        
+        for record in self.buffers.get(guild_id, ()):
+            if datetime.utcfromtimestamp(record[0]).date() == day:
+                entries.append(self._to_entry(record))
+        
+        return entries
+    
+    def prune(self, today: Optional[date] = None) -> int:
+        """Delete spilled segments older than the retention period. Returns the number removed."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return 0
+        
+        cutoff = ((today or datetime.utcnow().date()) - self.retention).isoformat()
+        removed = 0
+        for guild_dir in os.listdir(self.directory):
+            directory = os.path.join(self.directory, guild_dir)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.endswith('.seg') and name[:-4] < cutoff:
+                    try:
+                        os.remove(os.path.join(directory, name))
+                        removed += 1
+                    except OSError as e:
+                        logger.error(f"Failed to remove command log segment {name}: {e}")
+        return removed
+    
+    def __len__(self) -> int:
+        return sum(len(buffer) for buffer in self.buffers.values())
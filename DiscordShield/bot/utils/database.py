@@ -1,10 +1,33 @@
 import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+import heapq
+import itertools
+import os
+import time
+from datetime import datetime, timedelta, date, timezone, tzinfo
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator, Set
 import logging
+from .command_log import CommandLog
+from .usage_stats import UsageStats
+from .question_bank import QuestionBank
+from .giveaways import GiveawayEntries
+from .time_parser import parse_timezone
 
 logger = logging.getLogger(__name__)
 
+# Local hour birthdays are announced at, in each member's own timezone
+BIRTHDAY_HOUR = 9
+
+def birthday_keys(day: date) -> List[str]:
+    """Index keys celebrated on a date. February 29th birthdays fall on the 28th in other years."""
+    key = day.strftime("%m-%d")
+    if key == "02-28" and not (day.year % 4 == 0 and (day.year % 100 != 0 or day.year % 400 == 0)):
+        return [key, "02-29"]
+    return [key]
+
+def to_utc(local: datetime, zone: tzinfo) -> datetime:
+    """Convert a naive wall-clock time in a zone to naive UTC."""
+    return local.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
 class Database:
     """In-memory database for bot data storage."""
     
@@ -12,8 +35,12 @@ class Database:
         # Guild configurations
         self.guild_configs: Dict[int, Dict[str, Any]] = {}
         
-        # Warnings system
-        self.warnings: Dict[int, Dict[int, List[Dict]]] = {}
+        # Warnings system (guild -> user -> warning ID -> warning)
+        self.warnings: Dict[int, Dict[int, Dict[str, Dict]]] = {}
+        
+        # Min-heap of (expires_at, guild_id, user_id, warning_id)
+        self.warning_expiry: List[Tuple[datetime, int, int, str]] = []
+        self._warning_ids = itertools.count(1)
         
         # Economy system
         self.economy: Dict[int, Dict[int, Dict[str, Any]]] = {}
@@ -39,21 +66,39 @@ class Database:
         # Birthdays
         self.birthdays: Dict[int, Dict[int, Dict[str, Any]]] = {}
         
+        # MM-DD -> (guild_id, user_id) with a birthday that day
+        self.birthday_index: Dict[str, Set[Tuple[int, int]]] = {}
+        
+        # QOTD hour -> guilds with a QOTD channel that post at that hour
+        self.qotd_index: Dict[int, Set[int]] = {}
+        
+        # Per-guild question rotation, created when a guild first needs one
+        self.qotd_banks: Dict[int, QuestionBank] = {}
+        
         # Tickets
         self.tickets: Dict[int, Dict[int, Dict[str, Any]]] = {}
         
         # Giveaways
-        self.giveaways: Dict[int, Dict[str, Any]] = {}
+        self.giveaways: Dict[str, Dict[str, Any]] = {}
+        
+        # Giveaway message ID -> entrants, recorded live from reaction events
+        self.giveaway_entries: Dict[int, GiveawayEntries] = {}
         
         # Shop items
         self.shop_items: Dict[int, Dict[str, Dict[str, Any]]] = {}
         
-        # Command logs
-        self.command_logs: Dict[int, List[Dict[str, Any]]] = {}
+        # Command logs (bounded per guild, older entries spill to COMMAND_LOG_DIR if set)
+        self.command_logs = CommandLog(directory=os.getenv('COMMAND_LOG_DIR') or None)
+        
+        # Command usage aggregates (hourly and daily buckets per guild)
+        self.usage_stats = UsageStats()
         
         # Word filters
         self.word_filters: Dict[int, List[str]] = {}
         
+        # Callbacks run with (guild_id, key) when a guild's settings or shop change
+        self.change_listeners: List[Callable[[int, str], None]] = []
+        
     def init_guild(self, guild_id: int):
         """Initialize data structures for a new guild."""
         if guild_id not in self.guild_configs:
@@ -66,6 +111,8 @@ class Database:
                 'boost_role': None,
                 'qotd_hour': 9,
                 'auto_role': None,
+                'denylist': 'off',
+                'scam_filter': 'off',
                 'prefix': '!'
             }
         
@@ -87,9 +134,6 @@ class Database:
         if guild_id not in self.shop_items:
             self.shop_items[guild_id] = {}
         
-        if guild_id not in self.command_logs:
-            self.command_logs[guild_id] = []
-        
         if guild_id not in self.word_filters:
             self.word_filters[guild_id] = []
     
@@ -103,6 +147,21 @@ class Database:
         """Set guild configuration value."""
         self.init_guild(guild_id)
         self.guild_configs[guild_id][key] = value
+        if key in ('qotd_hour', 'qotd_channel'):
+            self._index_qotd(guild_id)
+        self.notify_change(guild_id, key)
+    
+    def add_change_listener(self, callback: Callable[[int, str], None]):
+        """Register a callback for guild setting changes."""
+        self.change_listeners.append(callback)
+    
+    def notify_change(self, guild_id: int, key: str):
+        """Tell listeners that a guild setting changed."""
+        for callback in self.change_listeners:
+            try:
+                callback(guild_id, key)
+            except Exception as e:
+                logger.error(f"Error in change listener for {key}: {e}")
     
     # Warning System Methods
     def add_warning(self, guild_id: int, user_id: int, reason: str, moderator_id: int) -> str:
@@ -110,51 +169,71 @@ class Database:
         self.init_guild(guild_id)
         
         if user_id not in self.warnings[guild_id]:
-            self.warnings[guild_id][user_id] = []
+            self.warnings[guild_id][user_id] = {}
         
-        warning_id = f"{guild_id}-{user_id}-{len(self.warnings[guild_id][user_id])}"
+        # IDs come from a monotonic counter so they never collide after a removal
+        warning_id = f"{guild_id}-{user_id}-{next(self._warning_ids)}"
+        current_time = datetime.utcnow()
         warning = {
             'id': warning_id,
             'reason': reason,
             'moderator': moderator_id,
-            'timestamp': datetime.utcnow()
+            'timestamp': current_time,
+            'expires_at': current_time + timedelta(days=7)
         }
         
-        self.warnings[guild_id][user_id].append(warning)
+        self.warnings[guild_id][user_id][warning_id] = warning
+        heapq.heappush(self.warning_expiry, (warning['expires_at'], guild_id, user_id, warning_id))
         return warning_id
     
     def get_warnings(self, guild_id: int, user_id: int) -> List[Dict]:
         """Get all active warnings for a user."""
         self.init_guild(guild_id)
+        self.expire_warnings()
         
         if user_id not in self.warnings[guild_id]:
             return []
         
-        # Filter out expired warnings (older than 7 days)
-        current_time = datetime.utcnow()
-        active_warnings = []
-        
-        for warning in self.warnings[guild_id][user_id]:
-            if (current_time - warning['timestamp']).days < 7:
-                active_warnings.append(warning)
-        
-        self.warnings[guild_id][user_id] = active_warnings
-        return active_warnings
+        return list(self.warnings[guild_id][user_id].values())
+    
+    def count_warnings(self, guild_id: int, user_id: int) -> int:
+        """Get the number of active warnings for a user."""
+        self.init_guild(guild_id)
+        self.expire_warnings()
+        return len(self.warnings[guild_id].get(user_id, {}))
     
     def remove_warning(self, guild_id: int, user_id: int, warning_id: str) -> bool:
         """Remove a specific warning."""
         self.init_guild(guild_id)
         
-        if user_id not in self.warnings[guild_id]:
+        user_warnings = self.warnings[guild_id].get(user_id)
+        if not user_warnings or warning_id not in user_warnings:
             return False
         
-        warnings = self.warnings[guild_id][user_id]
-        for i, warning in enumerate(warnings):
-            if warning['id'] == warning_id:
-                warnings.pop(i)
-                return True
-        
-        return False
+        # The heap entry is left behind and skipped when it surfaces
+        del user_warnings[warning_id]
+        if not user_warnings:
+            del self.warnings[guild_id][user_id]
+        return True
+    
+    def expire_warnings(self, current_time: Optional[datetime] = None) -> int:
+        """Drop warnings whose expiry has passed. Returns the number removed."""
+        current_time = current_time or datetime.utcnow()
+        expired = 0
+        
+        while self.warning_expiry and self.warning_expiry[0][0] <= current_time:
+            _, guild_id, user_id, warning_id = heapq.heappop(self.warning_expiry)
+            user_warnings = self.warnings.get(guild_id, {}).get(user_id)
+            if user_warnings and user_warnings.pop(warning_id, None):
+                expired += 1
+                if not user_warnings:
+                    del self.warnings[guild_id][user_id]
+        
+        return expired
+    
+    def next_warning_expiry(self) -> Optional[datetime]:
+        """Get the time the next warning lapses, if any."""
+        return self.warning_expiry[0][0] if self.warning_expiry else None
     
     # Economy System Methods
     def get_balance(self, guild_id: int, user_id: int) -> int:
@@ -195,8 +274,8 @@ class Database:
             return True
         return False
     
-    def get_leaderboard(self, guild_id: int, limit: int = 10) -> List[tuple]:
-        """Get economy leaderboard."""
+    def get_leaderboard(self, guild_id: int, limit: Optional[int] = 10) -> List[tuple]:
+        """Get economy leaderboard. A limit of None returns the full ranking."""
         self.init_guild(guild_id)
         
         leaderboard = []
@@ -231,23 +310,113 @@ class Database:
                 self.add_tokens(guild_id, user_id, tokens_earned)
                 user_data['last_passive'] = current_time
     
+    # QOTD Methods
+    def _index_qotd(self, guild_id: int):
+        """Move a guild to the index bucket for its QOTD hour, or out of the index if it has no channel."""
+        for hour, guild_ids in list(self.qotd_index.items()):
+            if guild_id in guild_ids:
+                guild_ids.discard(guild_id)
+                if not guild_ids:
+                    del self.qotd_index[hour]
+        
+        config = self.guild_configs[guild_id]
+        if config.get('qotd_channel'):
+            hour = config.get('qotd_hour')
+            self.qotd_index.setdefault(9 if hour is None else hour, set()).add(guild_id)
+    
+    def qotd_guilds(self, hour: int) -> Set[int]:
+        """Get the guilds that post their question of the day at an hour (UTC)."""
+        return set(self.qotd_index.get(hour, ()))
+    
+    def get_question_bank(self, guild_id: int) -> QuestionBank:
+        """Get a guild's question bank."""
+        bank = self.qotd_banks.get(guild_id)
+        if bank is None:
+            bank = self.qotd_banks[guild_id] = QuestionBank()
+        return bank
+    
+    def next_qotd_question(self, guild_id: int) -> str:
+        """Deal a guild's next question of the day."""
+        return self.get_question_bank(guild_id).next()
+    
+    # Birthday Methods
+    def set_birthday(self, guild_id: int, user_id: int, birthday: str, zone: str = 'UTC'):
+        """Set a user's birthday (MM-DD) and the name of their timezone, as read by parse_timezone."""
+        self.init_guild(guild_id)
+        previous = self.birthdays[guild_id].get(user_id)
+        if previous:
+            self._unindex_birthday(guild_id, user_id, previous['date'])
+        
+        self.birthdays[guild_id][user_id] = {
+            'date': birthday,
+            'timezone': zone,
+            'year': None,  # Don't store year for privacy
+            'set_at': datetime.utcnow(),
+            # Kept across changes so moving a birthday can't collect the gift twice in a year
+            'last_celebrated': previous.get('last_celebrated') if previous else None
+        }
+        self.birthday_index.setdefault(birthday, set()).add((guild_id, user_id))
+    
+    def remove_birthday(self, guild_id: int, user_id: int) -> bool:
+        """Remove a user's birthday."""
+        self.init_guild(guild_id)
+        entry = self.birthdays[guild_id].pop(user_id, None)
+        if not entry:
+            return False
+        self._unindex_birthday(guild_id, user_id, entry['date'])
+        return True
+    
+    def _unindex_birthday(self, guild_id: int, user_id: int, birthday: str):
+        members = self.birthday_index.get(birthday)
+        if members:
+            members.discard((guild_id, user_id))
+            if not members:
+                del self.birthday_index[birthday]
+    
+    def _birthday_window(self, now: datetime) -> Iterator[Tuple[int, int, Dict[str, Any], int, datetime, datetime]]:
+        """
+        Yield birthdays not yet celebrated this year whose local day overlaps now, as
+        (guild_id, user_id, entry, year, announce_at, day_ends_at) in naive UTC.
+        Offsets run from UTC-12 to UTC+14, so only yesterday, today and tomorrow can qualify.
+        """
+        today = now.date()
+        for day in (today - timedelta(days=1), today, today + timedelta(days=1)):
+            announce_local = datetime(day.year, day.month, day.day, BIRTHDAY_HOUR)
+            end_local = datetime(day.year, day.month, day.day) + timedelta(days=1)
+            for key in birthday_keys(day):
+                for guild_id, user_id in self.birthday_index.get(key, ()):
+                    entry = self.birthdays[guild_id][user_id]
+                    if entry.get('last_celebrated') == day.year:
+                        continue
+                    # Resolved per day so named zones follow their DST changes
+                    zone = parse_timezone(entry.get('timezone', 'UTC')) or timezone.utc
+                    yield guild_id, user_id, entry, day.year, to_utc(announce_local, zone), to_utc(end_local, zone)
+    
+    def next_birthday_due(self, now: datetime) -> Optional[datetime]:
+        """When the next pending birthday in the current window is due, if any."""
+        due_times = [announce_at for _, _, _, _, announce_at, ends_at in self._birthday_window(now) if ends_at > now]
+        return min(due_times) if due_times else None
+    
+    def due_birthdays(self, now: datetime) -> List[Tuple[int, int, int]]:
+        """Birthdays due now and not yet celebrated this year, as (guild_id, user_id, year)."""
+        return [
+            (guild_id, user_id, year)
+            for guild_id, user_id, _, year, announce_at, ends_at in self._birthday_window(now)
+            if announce_at <= now < ends_at
+        ]
+    
+    def mark_birthday_celebrated(self, guild_id: int, user_id: int, year: int):
+        """Record that a birthday was paid and announced, so it isn't due again this year."""
+        entry = self.birthdays.get(guild_id, {}).get(user_id)
+        if entry:
+            entry['last_celebrated'] = year
+    
     # Logging Methods
     def log_command(self, guild_id: int, user_id: int, command: str, success: bool):
         """Log command usage."""
-        self.init_guild(guild_id)
-        
-        log_entry = {
-            'user_id': user_id,
-            'command': command,
-            'success': success,
-            'timestamp': datetime.utcnow()
-        }
-        
-        self.command_logs[guild_id].append(log_entry)
-        
-        # Keep only last 1000 logs per guild
-        if len(self.command_logs[guild_id]) > 1000:
-            self.command_logs[guild_id] = self.command_logs[guild_id][-1000:]
+        timestamp = time.time()
+        self.command_logs.append(guild_id, user_id, command, success, timestamp)
+        self.usage_stats.record(guild_id, user_id, command, success, timestamp)
     
     # Shop Methods
     def add_shop_item(self, guild_id: int, name: str, price: int, item_type: str, description: str):
@@ -258,6 +427,7 @@ class Database:
             'type': item_type,
             'description': description
         }
+        self.notify_change(guild_id, 'shop_items')
     
     def get_shop_items(self, guild_id: int) -> Dict[str, Dict[str, Any]]:
         """Get all shop items for a guild."""
@@ -269,5 +439,30 @@ class Database:
         self.init_guild(guild_id)
         if name in self.shop_items[guild_id]:
             del self.shop_items[guild_id][name]
+            self.notify_change(guild_id, 'shop_items')
             return True
         return False
+    
+    # Metrics Methods
+    def collection_sizes(self) -> Dict[str, int]:
+        """Count the records held in each collection."""
+        return {
+            'guild_configs': len(self.guild_configs),
+            'warnings': sum(len(warnings) for users in self.warnings.values() for warnings in users.values()),
+            'warning_expiry': len(self.warning_expiry),
+            'economy': sum(len(users) for users in self.economy.values()),
+            'scheduled_announcements': len(self.scheduled_announcements),
+            'locked_channels': len(self.locked_channels),
+            'reminders': sum(len(reminders) for reminders in self.reminders.values()),
+            'polls': len(self.polls),
+            'suggestions': sum(len(suggestions) for suggestions in self.suggestions.values()),
+            'reaction_roles': sum(len(messages) for messages in self.reaction_roles.values()),
+            'birthdays': sum(len(users) for users in self.birthdays.values()),
+            'qotd_questions': sum(len(bank.questions) for bank in self.qotd_banks.values()),
+            'tickets': sum(len(tickets) for tickets in self.tickets.values()),
+            'giveaways': len(self.giveaways),
+            'giveaway_entries': sum(len(entries) for entries in self.giveaway_entries.values()),
+            'shop_items': sum(len(items) for items in self.shop_items.values()),
+            'command_logs': len(self.command_logs),
+            'word_filters': sum(len(words) for words in self.word_filters.values())
+        }
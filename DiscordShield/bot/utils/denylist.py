@@ -0,0 +1,290 @@
+import math
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# What participating guilds do when a listed user joins; 'off' guilds neither screen nor report
+DENYLIST_ACTIONS = ('off', 'alert', 'kick', 'ban')
+
+REASON_BAN = 1
+REASON_RAID = 2
+REASON_IMPORT = 3
+REASON_NAMES = {REASON_BAN: 'banned', REASON_RAID: 'raid', REASON_IMPORT: 'imported'}
+
+# (user_id, added at, reason), sorted by user ID after the header
+RECORD = struct.Struct('<QIB')
+MAGIC = b'DSDL\x01'
+
+BLOOM_ERROR_RATE = 0.001
+
+# Additions held unsorted before being merged into the packed arrays
+MERGE_THRESHOLD = 1024
+
+MASK64 = (1 << 64) - 1
+
+# User IDs are stored unsigned 64-bit; anything outside this range is a malformed entry
+ID_LIMIT = 1 << 64
+
+class BloomFilter:
+    """Fixed-size Bloom filter over user IDs: no false negatives, false positives at about the configured rate."""
+    
+    __slots__ = ('size', 'hashes', 'bits', 'count')
+    
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def add(self, user_id: int):
+        bits, size = self.bits, self.size
+        # Double hashing from two 64-bit mixes of the ID
+        position = (user_id * 0x9E3779B97F4A7C15) & MASK64
+        step = (((user_id ^ (user_id >> 31)) * 0xBF58476D1CE4E5B9) & MASK64) | 1
+        for _ in range(self.hashes):
+            index = position % size
+            bits[index >> 3] |= 1 << (index & 7)
+            position += step
+        self.count += 1
+    
+    def __contains__(self, user_id: int) -> bool:
+        bits, size = self.bits, self.size
+        position = (user_id * 0x9E3779B97F4A7C15) & MASK64
+        step = (((user_id ^ (user_id >> 31)) * 0xBF58476D1CE4E5B9) & MASK64) | 1
+        for _ in range(self.hashes):
+            index = position % size
+            if not bits[index >> 3] & (1 << (index & 7)):
+                return False
+            position += step
+        return True
+
+class Denylist:
+    """
+    User IDs reported by participating guilds, shared by every guild that opts in. IDs are packed
+    in sorted arrays and checked through a Bloom filter first, so the usual unlisted joiner is
+    rejected without a search.
+    """
+    
+    def __init__(self, path: Optional[str] = 'data/denylist.bin', capacity: int = 100000):
+        self.path = path
+        self.capacity = capacity
+        
+        # Parallel arrays sorted by user ID
+        self.ids = array('Q')
+        self.added = array('I')
+        self.reasons = array('B')
+        
+        # user ID -> (added at, reason), merged into the arrays in batches
+        self.recent: Dict[int, Tuple[int, int]] = {}
+        
+        # Users unlisted here, kept out of later imports; saved next to the list, never exported
+        self.removed: Set[int] = set()
+        
+        self.bloom = BloomFilter(capacity)
+        self.dirty = False
+        
+        self.checks = 0
+        self.matches = 0
+    
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.recent)
+    
+    def _index(self, user_id: int) -> int:
+        index = bisect_left(self.ids, user_id)
+        return index if index < len(self.ids) and self.ids[index] == user_id else -1
+    
+    def __contains__(self, user_id: int) -> bool:
+        self.checks += 1
+        if user_id not in self.bloom:
+            return False
+        # Exact check, since the filter alone allows false positives
+        if user_id in self.recent or self._index(user_id) >= 0:
+            self.matches += 1
+            return True
+        return False
+    
+    def reason(self, user_id: int) -> Optional[int]:
+        """Why a user was listed, or None if they aren't."""
+        if user_id in self.recent:
+            return self.recent[user_id][1]
+        index = self._index(user_id)
+        return self.reasons[index] if index >= 0 else None
+    
+    def add(self, user_id: int, reason: int, added_at: Optional[int] = None) -> bool:
+        """List a user, even one unlisted before, since this is a new report. Returns False if they already were."""
+        if user_id in self.recent or self._index(user_id) >= 0:
+            return False
+        self.recent[user_id] = (int(added_at or time.time()), reason)
+        self.removed.discard(user_id)
+        self.dirty = True
+        
+        if self.bloom.count >= self.capacity:
+            # Past capacity the error rate climbs, so grow the filter
+            self.capacity *= 2
+            self._rebuild_bloom()
+        else:
+            self.bloom.add(user_id)
+        
+        if len(self.recent) >= MERGE_THRESHOLD:
+            self._merge()
+        return True
+    
+    def add_many(self, user_ids: Iterable[int], reason: int) -> int:
+        """List several users, e.g. a raid cohort. Returns how many were new."""
+        user_ids = list(user_ids)
+        if self.bloom.count + len(user_ids) > self.capacity:
+            # Grow the filter once up front rather than doubling it partway through
+            self.capacity = max(self.capacity * 2, self.bloom.count + len(user_ids))
+            self._rebuild_bloom()
+        return sum(self.add(user_id, reason) for user_id in user_ids)
+    
+    def remove(self, user_id: int) -> bool:
+        """Unlist a user, e.g. after a wrongful report, and keep them out of later imports."""
+        if self.recent.pop(user_id, None) is None:
+            index = self._index(user_id)
+            if index < 0:
+                return False
+            del self.ids[index]
+            del self.added[index]
+            del self.reasons[index]
+        # The filter keeps the user's bits; lookups fall through to the exact check and miss
+        self.removed.add(user_id)
+        self.dirty = True
+        return True
+    
+    def _merge(self):
+        """Fold recent additions into the sorted arrays, copying the runs between them."""
+        if not self.recent:
+            return
+        ids, added, reasons = array('Q'), array('I'), array('B')
+        start = 0
+        for user_id in sorted(self.recent):
+            index = bisect_left(self.ids, user_id, start)
+            ids.extend(self.ids[start:index])
+            added.extend(self.added[start:index])
+            reasons.extend(self.reasons[start:index])
+            added_at, reason = self.recent[user_id]
+            ids.append(user_id)
+            added.append(added_at)
+            reasons.append(reason)
+            start = index
+        ids.extend(self.ids[start:])
+        added.extend(self.added[start:])
+        reasons.extend(self.reasons[start:])
+        
+        self.ids, self.added, self.reasons = ids, added, reasons
+        self.recent.clear()
+    
+    def _rebuild_bloom(self):
+        self.capacity = max(self.capacity, len(self) * 2)
+        self.bloom = BloomFilter(self.capacity)
+        for user_id in self.ids:
+            self.bloom.add(user_id)
+        for user_id in self.recent:
+            self.bloom.add(user_id)
+    
+    # Persistence
+    def export(self, path: str) -> int:
+        """Write every entry to a file in the shared format. Returns the number written."""
+        self._merge()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(MAGIC)
+            for record in zip(self.ids, self.added, self.reasons):
+                f.write(RECORD.pack(*record))
+        os.replace(temporary, path)
+        return len(self.ids)
+    
+    def import_file(self, path: str, reason: Optional[int] = None) -> int:
+        """Merge entries from a shared file, or a text file of one user ID per line. Returns how many were new."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        
+        if data.startswith(MAGIC):
+            body = data[len(MAGIC):]
+            # Ignore a torn trailing record from an interrupted copy
+            usable = len(body) - len(body) % RECORD.size
+            records = RECORD.iter_unpack(body[:usable])
+        else:
+            now = int(time.time())
+            lines = (line.split('#', 1)[0].strip() for line in data.decode('utf-8', 'replace').splitlines())
+            records = ((int(line), now, REASON_IMPORT) for line in lines if line.isascii() and line.isdigit())
+        
+        # Merged once at the end rather than every MERGE_THRESHOLD entries
+        new_ids = []
+        skipped = 0
+        for user_id, added_at, listed_reason in records:
+            if not 0 < user_id < ID_LIMIT:
+                skipped += 1
+                continue
+            if user_id in self.removed:
+                continue
+            if user_id not in self.recent and self._index(user_id) < 0:
+                self.recent[user_id] = (added_at, reason or listed_reason)
+                new_ids.append(user_id)
+        if skipped:
+            logger.warning(f"Skipped {skipped:,} out-of-range user IDs in {path}")
+        if not new_ids:
+            return 0
+        
+        if self.bloom.count + len(new_ids) > self.capacity:
+            self._rebuild_bloom()
+        else:
+            for user_id in new_ids:
+                self.bloom.add(user_id)
+        self._merge()
+        self.dirty = True
+        return len(new_ids)
+    
+    @property
+    def removed_path(self) -> Optional[str]:
+        """File the unlisted users are saved to, one ID per line."""
+        return f"{self.path}.removed" if self.path else None
+    
+    def _load_removed(self):
+        with open(self.removed_path, 'r', encoding='utf-8') as f:
+            lines = (line.split('#', 1)[0].strip() for line in f)
+            self.removed.update(int(line) for line in lines if line.isascii() and line.isdigit())
+    
+    def _save_removed(self):
+        temporary = f"{self.removed_path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write("# Users unlisted here, skipped when importing shared denylists\n")
+            f.writelines(f"{user_id}\n" for user_id in sorted(self.removed))
+        os.replace(temporary, self.removed_path)
+    
+    def load(self):
+        """Load the list and the unlisted users saved by a previous run."""
+        if not self.path:
+            return
+        try:
+            if os.path.exists(self.removed_path):
+                self._load_removed()
+            if not os.path.exists(self.path):
+                return
+            self.import_file(self.path)
+            self._merge()
+            self.dirty = False
+            logger.info(f"Loaded {len(self):,} denylist entries")
+        except (OSError, ValueError, OverflowError, struct.error) as e:
+            logger.error(f"Failed to load denylist {self.path}: {e}")
+    
+    def save(self):
+        """Write the list if it changed since the last save."""
+        if not self.path or not self.dirty:
+            return
+        try:
+            self.export(self.path)
+            if self.removed or os.path.exists(self.removed_path):
+                self._save_removed()
+            self.dirty = False
+        except (OSError, OverflowError) as e:
+            logger.error(f"Failed to save denylist {self.path}: {e}")
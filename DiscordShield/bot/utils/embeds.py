@@ -0,0 +1,81 @@
+import discord
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Iterable, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class EmbedTemplate:
+    """An embed whose invariant parts are built once and shared by every render."""
+    
+    def __init__(
+        self,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        color: Optional[discord.Color] = None,
+        fields: Iterable[Tuple[str, str, bool]] = (),
+        footer: Optional[str] = None,
+        timestamp: bool = True
+    ):
+        self.title = title
+        self.description = description
+        self.color = color
+        self.timestamp = timestamp
+        
+        self.fields = [{'inline': inline, 'name': str(name), 'value': str(value)} for name, value, inline in fields]
+        self.footer = {'text': str(footer)} if footer is not None else None
+    
+    def render(
+        self,
+        description: Optional[str] = None,
+        color: Optional[discord.Color] = None,
+        thumbnail: Optional[str] = None,
+        footer: Optional[Dict[str, str]] = None
+    ) -> discord.Embed:
+        """Build an embed from the static parts, filling in only the dynamic ones."""
+        embed = discord.Embed(
+            title=self.title,
+            description=description if description is not None else self.description,
+            color=color or self.color
+        )
+        if self.timestamp:
+            embed.timestamp = datetime.utcnow()
+        
+        for field in self.fields:
+            embed.add_field(**field)
+        
+        footer = footer or self.footer
+        if footer:
+            embed.set_footer(**footer)
+        
+        if thumbnail:
+            embed.set_thumbnail(url=thumbnail)
+        return embed
+
+class GuildEmbedCache:
+    """Per-guild embed parts, rebuilt lazily after the guild or its settings change."""
+    
+    def __init__(self):
+        # guild -> part name -> built value
+        self.parts: Dict[int, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, guild: discord.Guild, name: str, build: Callable[[discord.Guild], Any]) -> Any:
+        """Get a cached part for a guild, building it on first use."""
+        parts = self.parts.get(guild.id)
+        if parts is None:
+            parts = self.parts[guild.id] = {}
+        
+        try:
+            value = parts[name]
+        except KeyError:
+            self.misses += 1
+            value = parts[name] = build(guild)
+        else:
+            self.hits += 1
+        return value
+    
+    def invalidate(self, guild_id: int):
+        """Drop every cached part for a guild."""
+        self.parts.pop(guild_id, None)
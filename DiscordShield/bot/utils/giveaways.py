@@ -0,0 +1,169 @@
+import heapq
+import random
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+GIVEAWAY_EMOJI = "🎉"
+
+# How entries are weighted when winners are drawn
+WEIGHT_MODES = ('none', 'balance', 'role')
+
+# Balance mode: one extra entry per this many tokens, up to a cap
+TOKENS_PER_ENTRY = 500
+MAX_BALANCE_ENTRIES = 10
+
+# Role mode: entries for members holding the bonus role when they entered
+ROLE_BONUS_ENTRIES = 3
+
+# Alias draws per winner before falling back to an exact pass over every entrant
+WEIGHTED_DRAW_ATTEMPTS = 64
+
+class AliasTable:
+    """Vose's alias method: O(n) to build, then O(1) per weighted draw."""
+    
+    __slots__ = ('probability', 'alias')
+    
+    def __init__(self, weights: List[float]):
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+        self.probability = [1.0] * count
+        self.alias = list(range(count))
+        
+        small = [i for i, weight in enumerate(scaled) if weight < 1.0]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+    
+    def sample(self, rng: random.Random = random) -> int:
+        """Draw an index with probability proportional to its weight."""
+        index = rng.randrange(len(self.probability))
+        return index if rng.random() < self.probability[index] else self.alias[index]
+
+class GiveawayEntries:
+    """A giveaway's entrants, kept current from reaction events. Adding and removing are O(1), drawing k winners O(k)."""
+    
+    __slots__ = ('ids', 'positions', 'bonus', 'stale', 'withdrawn', 'cleared')
+    
+    def __init__(self, user_ids: Iterable[int] = ()):
+        # Entrant IDs packed in an array, with each one's position for swap-removal
+        self.ids = array('Q')
+        self.positions: Dict[int, int] = {}
+        
+        # Entrants holding the bonus role when they entered
+        self.bonus: Set[int] = set()
+        
+        # Set when reaction events may have been missed while the bot was disconnected
+        self.stale = False
+        
+        # While a reconciliation pages the reactors, removals and clears it must apply afterwards
+        self.withdrawn: Optional[Set[int]] = None
+        self.cleared = False
+        
+        for user_id in user_ids:
+            self.add(user_id)
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.positions
+    
+    def add(self, user_id: int, bonus: bool = False) -> bool:
+        """Enter a user. Returns False if they had already entered."""
+        if self.withdrawn is not None:
+            self.withdrawn.discard(user_id)
+        if bonus:
+            self.bonus.add(user_id)
+        if user_id in self.positions:
+            return False
+        self.positions[user_id] = len(self.ids)
+        self.ids.append(user_id)
+        return True
+    
+    def remove(self, user_id: int) -> bool:
+        """Withdraw a user, moving the last entrant into their slot."""
+        if self.withdrawn is not None:
+            self.withdrawn.add(user_id)
+        position = self.positions.pop(user_id, None)
+        if position is None:
+            return False
+        self.bonus.discard(user_id)
+        last = self.ids.pop()
+        if last != user_id:
+            self.ids[position] = last
+            self.positions[last] = position
+        return True
+    
+    def clear(self):
+        """Withdraw everyone, e.g. after the reactions were cleared."""
+        if self.withdrawn is not None:
+            self.withdrawn.clear()
+            self.cleared = True
+        self.ids = array('Q')
+        self.positions.clear()
+        self.bonus.clear()
+    
+    def draw(self, count: int, rng: random.Random = random) -> List[int]:
+        """Draw distinct winners uniformly."""
+        return rng.sample(self.ids, min(count, len(self.ids)))
+    
+    def draw_weighted(self, count: int, weight: Callable[[int], float], rng: random.Random = random) -> List[int]:
+        """Draw distinct winners, each with probability proportional to its weight among those not yet drawn."""
+        return WeightedDraw(self, weight, rng).draw(count)
+
+class WeightedDraw:
+    """One weighted draw batch over a giveaway's entrants. The alias table is built once, however many winners are drawn."""
+    
+    __slots__ = ('ids', 'weights', 'table', 'drawn', 'rng')
+    
+    def __init__(self, entries: GiveawayEntries, weight: Callable[[int], float], rng: random.Random = random):
+        # Snapshot the entrants so later reactions can't shift indexes mid-batch
+        self.ids = array('Q', entries.ids)
+        self.weights = [weight(user_id) for user_id in self.ids]
+        self.table = AliasTable(self.weights) if self.ids else None
+        self.drawn: Set[int] = set()
+        self.rng = rng
+    
+    def draw(self, count: int) -> List[int]:
+        """Draw up to count more winners, never repeating one drawn earlier in the batch."""
+        count = min(count, len(self.ids) - len(self.drawn))
+        if count <= 0:
+            return []
+        
+        winners: List[int] = []
+        
+        # Redrawing an entrant who already won is the same as drawing from those left
+        attempts = count * WEIGHTED_DRAW_ATTEMPTS
+        while len(winners) < count and attempts:
+            attempts -= 1
+            index = self.table.sample(self.rng)
+            if index not in self.drawn:
+                self.drawn.add(index)
+                winners.append(self.ids[index])
+        
+        if len(winners) < count:
+            # A few entrants hold nearly all the weight; finish with exponential keys over the rest
+            remaining = (i for i in range(len(self.ids)) if i not in self.drawn)
+            keys = heapq.nlargest(count - len(winners), remaining, key=lambda i: self.rng.random() ** (1.0 / self.weights[i]))
+            self.drawn.update(keys)
+            winners.extend(self.ids[i] for i in keys)
+        return winners
+
+def entry_weight(db, giveaway: Dict, entries: GiveawayEntries) -> Callable[[int], float]:
+    """Build the weight function for a giveaway's weighting mode."""
+    mode = giveaway.get('weighting', 'none')
+    if mode == 'balance':
+        # Read balances directly so drawing doesn't open accounts for every entrant
+        accounts = db.economy.get(giveaway['guild_id'], {})
+        return lambda user_id: max(1, min(MAX_BALANCE_ENTRIES, 1 + accounts[user_id]['tokens'] // TOKENS_PER_ENTRY)) if user_id in accounts else 1
+    if mode == 'role':
+        return lambda user_id: ROLE_BONUS_ENTRIES if user_id in entries.bonus else 1
+    return lambda user_id: 1
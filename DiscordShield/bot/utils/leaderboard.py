@@ -0,0 +1,139 @@
+import discord
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+from .economy import EconomyUtils
+from .embeds import EmbedTemplate
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 10
+
+# Seconds a ranking is served before it is rebuilt from balances
+SNAPSHOT_TTL = 30.0
+
+# Seconds of inactivity before the page buttons are removed
+VIEW_TIMEOUT = 180
+
+LEADERBOARD_TEMPLATE = EmbedTemplate(title="📊 Token Leaderboard", color=discord.Color.gold())
+MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"}
+
+class LeaderboardSnapshot:
+    """A guild's ranking frozen at one moment, with pages rendered on first view and shared by every viewer."""
+    
+    def __init__(self, entries: List[Tuple[int, int]]):
+        # (user_id, tokens), richest first
+        self.entries = entries
+        self.taken_at = time.monotonic()
+        self.page_count = max(1, -(-len(entries) // PAGE_SIZE))
+        self.pages: Dict[int, discord.Embed] = {}
+        self._ranks: Optional[Dict[int, int]] = None
+    
+    def rank_of(self, user_id: int) -> Optional[int]:
+        """Get a user's 1-based rank, indexing the ranking on first use."""
+        if self._ranks is None:
+            self._ranks = {entry[0]: rank for rank, entry in enumerate(self.entries, 1)}
+        return self._ranks.get(user_id)
+    
+    def page(self, index: int) -> discord.Embed:
+        """Get a rendered page. Callers must not modify the returned embed."""
+        embed = self.pages.get(index)
+        if embed is None:
+            embed = self.pages[index] = self._render(index)
+        return embed
+    
+    def _render(self, index: int) -> discord.Embed:
+        start = index * PAGE_SIZE
+        lines = []
+        # Mentions resolve client-side, so no member lookups are needed
+        for rank, (user_id, tokens) in enumerate(self.entries[start:start + PAGE_SIZE], start + 1):
+            rank_name, rank_emoji = EconomyUtils.get_balance_rank(tokens)
+            lines.append(f"{MEDALS.get(rank, f'**#{rank}**')} <@{user_id}> — {rank_emoji} {EconomyUtils.format_balance(tokens)} tokens")
+        
+        return LEADERBOARD_TEMPLATE.render(
+            description="\n".join(lines),
+            footer={'text': f"Page {index + 1}/{self.page_count} • {len(self.entries):,} users ranked"}
+        )
+
+class LeaderboardCache:
+    """Per-guild leaderboard snapshots, rebuilt at most once per TTL however often /leaderboard is used."""
+    
+    def __init__(self, db, members, ttl: float = SNAPSHOT_TTL):
+        self.db = db
+        self.members = members
+        self.ttl = ttl
+        self.snapshots: Dict[int, LeaderboardSnapshot] = {}
+        self.builds = 0
+    
+    def get(self, guild: discord.Guild) -> LeaderboardSnapshot:
+        """Get a guild's current snapshot, rebuilding it if it has expired."""
+        snapshot = self.snapshots.get(guild.id)
+        if snapshot is None or time.monotonic() - snapshot.taken_at >= self.ttl:
+            # Members who left keep their balance but drop out of the ranking
+            entries = [entry for entry in self.db.get_leaderboard(guild.id, None) if self.members.in_guild(guild, entry[0])]
+            snapshot = self.snapshots[guild.id] = LeaderboardSnapshot(entries)
+            self.builds += 1
+        return snapshot
+    
+    def prune(self):
+        """Drop expired snapshots."""
+        cutoff = time.monotonic() - self.ttl
+        for guild_id in [guild_id for guild_id, snapshot in self.snapshots.items() if snapshot.taken_at < cutoff]:
+            del self.snapshots[guild_id]
+
+class LeaderboardView(discord.ui.View):
+    """Page buttons for one /leaderboard response, usable by the member who ran it."""
+    
+    def __init__(self, cache: LeaderboardCache, interaction: discord.Interaction):
+        super().__init__(timeout=VIEW_TIMEOUT)
+        self.cache = cache
+        self.interaction = interaction
+        self.guild = interaction.guild
+        self.owner_id = interaction.user.id
+        self.page = 0
+    
+    def render(self) -> Tuple[Optional[str], discord.Embed]:
+        """Get the message content and embed for the current page, updating the buttons to match."""
+        snapshot = self.cache.get(self.guild)
+        self.page = max(0, min(self.page, snapshot.page_count - 1))
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= snapshot.page_count - 1
+        
+        rank = snapshot.rank_of(self.owner_id)
+        self.my_rank.disabled = rank is None
+        content = f"Your rank: **#{rank:,}** of {len(snapshot.entries):,}" if rank else None
+        return content, snapshot.page(self.page)
+    
+    async def show(self, interaction: discord.Interaction):
+        content, embed = self.render()
+        await interaction.response.edit_message(content=content, embed=embed, view=self)
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.owner_id:
+            return True
+        await interaction.response.send_message("Run `/leaderboard` to browse the leaderboard yourself.", ephemeral=True)
+        return False
+    
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page -= 1
+        await self.show(interaction)
+    
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await self.show(interaction)
+    
+    @discord.ui.button(label="My rank", emoji="📍", style=discord.ButtonStyle.primary)
+    async def my_rank(self, interaction: discord.Interaction, button: discord.ui.Button):
+        rank = self.cache.get(self.guild).rank_of(self.owner_id)
+        if rank:
+            self.page = (rank - 1) // PAGE_SIZE
+        await self.show(interaction)
+    
+    async def on_timeout(self):
+        """Remove the buttons once nobody is using them."""
+        try:
+            await self.interaction.edit_original_response(view=None)
+        except discord.HTTPException:
+            pass
@@ -0,0 +1,174 @@
+import copy
+import gzip
+import json
+import os
+import queue
+import shutil
+import sys
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional, Tuple
+import logging
+
+# Loggers whose debug records are sampled, and how many records per call site are kept (1 in N)
+SAMPLED_DEBUG = {
+    'bot.events.economy': 100,
+    'bot.utils.database': 100
+}
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class StructuredQueueHandler(QueueHandler):
+    """Queue handler that keeps the exception text separate from the message."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        
+        # Make the record safe to hand to another thread
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+class DebugSampler(logging.Filter):
+    """Keep one in N debug records per call site for noisy loggers."""
+    
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        
+        # (logger name, line number) -> records seen
+        self.seen: Dict[Tuple[str, int], int] = {}
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG:
+            return True
+        
+        rate = self.rates.get(record.name)
+        if not rate or rate <= 1:
+            return True
+        
+        key = (record.name, record.lineno)
+        seen = self.seen.get(key, 0)
+        self.seen[key] = seen + 1
+        if seen % rate:
+            return False
+        
+        record.sampled = rate
+        return True
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """Rotate on size or age, gzipping the rotated files."""
+    
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, interval: float = 86400):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+    
+    @staticmethod
+    def _compress(source: str, dest: str):
+        """Gzip a rotated log file."""
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+    
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval and time.time() >= self.rollover_at:
+            # Don't produce empty archives for quiet periods
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                return True
+            self.rollover_at = time.time() + self.interval
+        return super().shouldRollover(record)
+    
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+class LogSink:
+    """Route all logging through a queue so file and console writes happen on a background thread."""
+    
+    def __init__(
+        self,
+        path: str = 'bot.log',
+        level: int = logging.INFO,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 7,
+        interval: float = 86400
+    ):
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        
+        file_handler = CompressingRotatingFileHandler(path, max_bytes, backup_count, interval)
+        file_handler.setFormatter(JsonFormatter())
+        
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        
+        self.handlers = [file_handler, console_handler]
+        self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        
+        # Sampling runs before enqueueing so dropped records cost nothing downstream
+        self.queue_handler = StructuredQueueHandler(self.queue)
+        self.queue_handler.addFilter(DebugSampler(SAMPLED_DEBUG))
+        self.level = level
+    
+    @property
+    def backlog(self) -> int:
+        """Number of records waiting to be written."""
+        return self.queue.qsize()
+    
+    def start(self):
+        """Install the queue handler on the root logger and start the writer thread."""
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(self.queue_handler)
+        root.setLevel(self.level)
+        self.listener.start()
+    
+    def stop(self):
+        """Drain the queue and close the handlers."""
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+def setup_logging(path: Optional[str] = None) -> LogSink:
+    """Configure queued JSON logging from environment settings."""
+    sink = LogSink(
+        path=path or os.getenv('LOG_FILE', 'bot.log'),
+        level=logging.getLevelName(os.getenv('LOG_LEVEL', 'INFO').upper()),
+        max_bytes=int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+        backup_count=int(os.getenv('LOG_BACKUPS', 7)),
+        interval=float(os.getenv('LOG_ROTATE_SECONDS', 86400))
+    )
+    sink.start()
+    return sink
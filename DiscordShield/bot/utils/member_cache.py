@@ -0,0 +1,179 @@
+import asyncio
+import discord
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 'full' chunks every guild at startup and caches every member; 'lru' keeps only recently active ones
+MEMBER_CACHE_MODES = ('full', 'lru')
+
+DEFAULT_CAPACITY = 50000
+
+# Most user IDs Discord answers in one member request
+QUERY_BATCH = 100
+
+class MemberCache:
+    """
+    Member lookups that work with or without the full gateway member cache. In 'lru' mode
+    guilds aren't chunked; recently active members are held in a bounded LRU and the rest
+    are fetched over the gateway in batches when a feature actually needs them.
+    """
+    
+    def __init__(self, mode: str = 'full', capacity: int = DEFAULT_CAPACITY):
+        if mode not in MEMBER_CACHE_MODES:
+            raise ValueError(f"Unknown member cache mode {mode!r}, expected one of {', '.join(MEMBER_CACHE_MODES)}")
+        self.mode = mode
+        self.full = mode == 'full'
+        self.capacity = capacity
+        
+        # (guild ID, user ID) -> member, least recently seen first
+        self.recent: OrderedDict = OrderedDict()
+        
+        # Users seen leaving, or missing from a member query, per guild
+        self.departed: Dict[int, Set[int]] = {}
+        
+        # Called with each member remembered, so other indexes can learn members without chunking
+        self.on_remember: Optional[Callable[[discord.Member], None]] = None
+        
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+    
+    def get(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        """Get a cached member without any request."""
+        member = guild.get_member(user_id)
+        if member is not None or self.full:
+            return member
+        
+        key = (guild.id, user_id)
+        member = self.recent.get(key)
+        if member is None:
+            self.misses += 1
+            return None
+        self.recent.move_to_end(key)
+        self.hits += 1
+        return member
+    
+    def remember(self, member: discord.Member):
+        """Hold a member seen in an event, evicting the least recently seen past capacity."""
+        if self.full or not isinstance(member, discord.Member):
+            return
+        key = (member.guild.id, member.id)
+        self.recent[key] = member
+        self.recent.move_to_end(key)
+        while len(self.recent) > self.capacity:
+            self.recent.popitem(last=False)
+        
+        departed = self.departed.get(member.guild.id)
+        if departed:
+            departed.discard(member.id)
+        if self.on_remember is not None:
+            self.on_remember(member)
+    
+    def member_left(self, guild_id: int, user_id: int):
+        """Drop a member that left, remembering they're gone."""
+        if self.full:
+            return
+        self.recent.pop((guild_id, user_id), None)
+        self.departed.setdefault(guild_id, set()).add(user_id)
+    
+    def forget_guild(self, guild_id: int):
+        """Drop every member of a guild the bot left."""
+        self.departed.pop(guild_id, None)
+        for key in [key for key in self.recent if key[0] == guild_id]:
+            del self.recent[key]
+    
+    def in_guild(self, guild: discord.Guild, user_id: int) -> bool:
+        """Whether a user is a member, without a request. Without the full cache, anyone not seen leaving counts."""
+        if self.full:
+            return guild.get_member(user_id) is not None
+        return user_id not in self.departed.get(guild.id, ())
+    
+    async def fetch(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        """Get a member, requesting them if they aren't cached."""
+        return (await self.fetch_many(guild, [user_id])).get(user_id)
+    
+    async def fetch_many(self, guild: discord.Guild, user_ids: Iterable[int]) -> Dict[int, discord.Member]:
+        """Get several members, requesting only the uncached ones, a batch per request."""
+        found: Dict[int, discord.Member] = {}
+        missing = []
+        departed = self.departed.get(guild.id, ())
+        for user_id in dict.fromkeys(user_ids):
+            member = self.get(guild, user_id)
+            if member is not None:
+                found[user_id] = member
+            elif not self.full and user_id not in departed:
+                missing.append(user_id)
+        
+        for start in range(0, len(missing), QUERY_BATCH):
+            batch = missing[start:start + QUERY_BATCH]
+            try:
+                members = await guild.query_members(user_ids=batch, limit=len(batch), cache=False)
+            except asyncio.TimeoutError:
+                logger.warning(f"Timed out fetching {len(batch)} members of {guild.name}")
+                continue
+            self.queries += 1
+            
+            for member in members:
+                self.remember(member)
+                found[member.id] = member
+            
+            # Users the query didn't return aren't in the guild
+            absent = set(batch).difference(found)
+            if absent:
+                self.departed.setdefault(guild.id, set()).update(absent)
+        return found
+    
+    def install(self, state):
+        """
+        Deliver member updates and removals for members held here. discord.py drops them for
+        members outside its own cache, so a held member is attached to its guild while the
+        event is parsed.
+        """
+        if self.full:
+            return
+        # These are discord.py internals; without them held members just miss updates and removals
+        parse_update = state.parsers.get('GUILD_MEMBER_UPDATE')
+        parse_remove = state.parsers.get('GUILD_MEMBER_REMOVE')
+        if parse_update is None or parse_remove is None or not all(
+            hasattr(discord.Guild, name) for name in ('_add_member', '_remove_member')
+        ):
+            logger.warning("Member update parsers not found; held members won't receive updates or removals")
+            return
+        
+        def parse_guild_member_update(data):
+            guild = state._get_guild(int(data['guild_id']))
+            user_id = int(data['user']['id'])
+            if guild is None or guild.get_member(user_id) is not None:
+                return parse_update(data)
+            
+            member = self.recent.get((guild.id, user_id))
+            if member is None:
+                # Nothing to compare against yet, so hold the member for its next update
+                self.remember(discord.Member(data=data, guild=guild, state=state))
+                return
+            
+            guild._add_member(member)
+            try:
+                parse_update(data)
+            finally:
+                guild._remove_member(member)
+        
+        def parse_guild_member_remove(data):
+            guild = state._get_guild(int(data['guild_id']))
+            user_id = int(data['user']['id'])
+            if guild is not None:
+                member = self.recent.get((guild.id, user_id))
+                # Removed from the guild again by discord.py's own handler
+                if member is not None and guild.get_member(user_id) is None:
+                    guild._add_member(member)
+                self.member_left(guild.id, user_id)
+            parse_remove(data)
+        
+        state.parsers['GUILD_MEMBER_UPDATE'] = parse_guild_member_update
+        state.parsers['GUILD_MEMBER_REMOVE'] = parse_guild_member_remove
+    
+    def __len__(self) -> int:
+        return len(self.recent)
@@ -0,0 +1,140 @@
+import discord
+from array import array
+from typing import Dict, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Statuses reported by the gateway, folded into the buckets shown to users
+STATUS_KEYS = {
+    discord.Status.online: 'online',
+    discord.Status.idle: 'idle',
+    discord.Status.dnd: 'dnd',
+    discord.Status.offline: 'offline',
+    discord.Status.invisible: 'offline'
+}
+
+class MemberStats:
+    """Per-guild member status counters and a bot-wide user -> guilds index, kept up to date from gateway events."""
+    
+    def __init__(self):
+        self.counts: Dict[int, Dict[str, int]] = {}
+        
+        # user ID -> IDs of the counted guilds the user is in, packed since most users share only a few
+        self.user_guilds: Dict[int, array] = {}
+        self.counted_guilds: Set[int] = set()
+        
+        # Users indexed in each unchunked guild, whose guild.members holds only a few of them
+        self.unchunked_users: Dict[int, Set[int]] = {}
+    
+    @property
+    def unique_users(self) -> int:
+        """Number of distinct users across all counted guilds."""
+        return len(self.user_guilds)
+    
+    def guilds_of(self, user_id: int) -> Tuple[int, ...]:
+        """IDs of the counted guilds a user is in."""
+        return tuple(self.user_guilds.get(user_id, ()))
+    
+    def _add_user(self, user_id: int, guild_id: int):
+        users = self.unchunked_users.get(guild_id)
+        if users is not None:
+            users.add(user_id)
+        guilds = self.user_guilds.get(user_id)
+        if guilds is None:
+            self.user_guilds[user_id] = array('Q', (guild_id,))
+        elif guild_id not in guilds:
+            guilds.append(guild_id)
+    
+    def _remove_user(self, user_id: int, guild_id: int):
+        users = self.unchunked_users.get(guild_id)
+        if users is not None:
+            users.discard(user_id)
+        guilds = self.user_guilds.get(user_id)
+        if guilds is None or guild_id not in guilds:
+            return
+        guilds.remove(guild_id)
+        if not guilds:
+            del self.user_guilds[user_id]
+    
+    @staticmethod
+    def _empty() -> Dict[str, int]:
+        return {'online': 0, 'idle': 0, 'dnd': 0, 'offline': 0, 'bots': 0}
+    
+    def rebuild(self, guild: discord.Guild) -> Dict[str, int]:
+        """Recount a guild's members in a single pass."""
+        if guild.chunked:
+            self.unchunked_users.pop(guild.id, None)
+        else:
+            self.unchunked_users.setdefault(guild.id, set())
+        
+        counts = self._empty()
+        for member in guild.members:
+            counts[STATUS_KEYS.get(member.status, 'offline')] += 1
+            if member.bot:
+                counts['bots'] += 1
+            # A no-op for members already indexed, so recounting a guild is safe
+            self._add_user(member.id, guild.id)
+        
+        self.counts[guild.id] = counts
+        self.counted_guilds.add(guild.id)
+        return counts
+    
+    def get(self, guild: discord.Guild) -> Dict[str, int]:
+        """Get a guild's counters, rebuilding them if they were never built."""
+        counts = self.counts.get(guild.id)
+        if counts is None:
+            counts = self.rebuild(guild)
+        return counts
+    
+    def member_added(self, member: discord.Member):
+        """Count a member that joined."""
+        counts = self.counts.get(member.guild.id)
+        if counts is None:
+            return
+        counts[STATUS_KEYS.get(member.status, 'offline')] += 1
+        if member.bot:
+            counts['bots'] += 1
+        self._add_user(member.id, member.guild.id)
+    
+    def member_removed(self, member: discord.Member):
+        """Stop counting a member that left."""
+        counts = self.counts.get(member.guild.id)
+        if counts is None:
+            return
+        key = STATUS_KEYS.get(member.status, 'offline')
+        counts[key] = max(counts[key] - 1, 0)
+        if member.bot:
+            counts['bots'] = max(counts['bots'] - 1, 0)
+        self._remove_user(member.id, member.guild.id)
+    
+    def member_seen(self, member: discord.Member):
+        """Index a member learned about outside the member cache, e.g. from a message or a member request."""
+        if member.guild.id in self.counted_guilds:
+            self._add_user(member.id, member.guild.id)
+    
+    def member_left(self, guild_id: int, user_id: int):
+        """Drop a user's membership of a guild they left, whether or not they were cached."""
+        self._remove_user(user_id, guild_id)
+    
+    def status_changed(self, before: discord.Member, after: discord.Member):
+        """Move a member between status buckets."""
+        counts = self.counts.get(after.guild.id)
+        if counts is None:
+            return
+        old_key = STATUS_KEYS.get(before.status, 'offline')
+        new_key = STATUS_KEYS.get(after.status, 'offline')
+        if old_key != new_key:
+            counts[old_key] = max(counts[old_key] - 1, 0)
+            counts[new_key] += 1
+    
+    def forget(self, guild: discord.Guild):
+        """Drop a guild's counters and its users' memberships."""
+        self.counts.pop(guild.id, None)
+        if guild.id in self.counted_guilds:
+            self.counted_guilds.discard(guild.id)
+            # Unchunked guilds have members indexed from joins and messages that aren't in guild.members
+            users = self.unchunked_users.pop(guild.id, None)
+            user_ids = users if users is not None else [member.id for member in guild.members]
+            for user_id in user_ids:
+                self._remove_user(user_id, guild.id)
@@ -0,0 +1,320 @@
+import asyncio
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (author_id, channel_id, flags, attachment_count), followed by the content bytes
+HEADER = struct.Struct('<QQBH')
+
+# (message_id, record length), ahead of each record in a spill segment
+SPILL_HEADER = struct.Struct('<QI')
+
+FLAG_COMPRESSED = 1
+FLAG_BOT = 2
+
+# Content shorter than this is stored as-is, since zlib's overhead outweighs the saving
+COMPRESS_MIN = 64
+
+# Rough cost of a ring slot beyond the record itself (dict entry, int key, bytes header)
+ENTRY_OVERHEAD = 100
+
+DISCORD_EPOCH_MS = 1420070400000
+
+class CachedMessage(NamedTuple):
+    author_id: int
+    channel_id: int
+    content: str
+    attachments: int
+    bot: bool
+
+def pack_message(author_id: int, channel_id: int, content: str, attachments: int = 0, bot: bool = False) -> bytes:
+    """Pack a message into a compact record, compressing longer content."""
+    data = content.encode('utf-8')
+    flags = FLAG_BOT if bot else 0
+    if len(data) >= COMPRESS_MIN:
+        compressed = zlib.compress(data, 6)
+        if len(compressed) < len(data):
+            data = compressed
+            flags |= FLAG_COMPRESSED
+    return HEADER.pack(author_id, channel_id, flags, min(attachments, 0xFFFF)) + data
+
+def unpack_message(record: bytes) -> CachedMessage:
+    """Expand a packed record."""
+    author_id, channel_id, flags, attachments = HEADER.unpack_from(record)
+    data = record[HEADER.size:]
+    if flags & FLAG_COMPRESSED:
+        data = zlib.decompress(data)
+    return CachedMessage(author_id, channel_id, data.decode('utf-8'), attachments, bool(flags & FLAG_BOT))
+
+class MessageCache:
+    """
+    Per-guild rings of packed message records within a shared byte budget. A guild's
+    oldest records go first once it outgrows its share, and the least recently active
+    guild's once the whole cache is over budget. Evicted records can spill to disk.
+    """
+    
+    def __init__(
+        self,
+        budget_bytes: int = 32 * 1024 * 1024,
+        guild_bytes: int = 1024 * 1024,
+        spill_directory: Optional[str] = None,
+        spill_bytes: int = 65536,
+        retention: timedelta = timedelta(days=7)
+    ):
+        self.budget_bytes = budget_bytes
+        self.guild_bytes = guild_bytes
+        self.spill_directory = spill_directory
+        self.spill_bytes = spill_bytes
+        self.retention = retention
+        
+        # guild -> message ID -> record, guilds least recently written first
+        self.rings: OrderedDict = OrderedDict()
+        self.guild_sizes: Dict[int, int] = {}
+        self.size = 0
+        
+        # Evicted records waiting to be written, keyed by guild and segment
+        self.pending: Dict[Tuple[int, str], bytearray] = {}
+        self.pending_size = 0
+        
+        # Segment appends are handed to a writer thread so disk I/O stays off the event loop
+        self.writes: queue.Queue = queue.Queue()
+        self.writer: Optional[threading.Thread] = None
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def add(self, message) -> None:
+        """Cache a guild message as it arrives."""
+        record = pack_message(
+            message.author.id,
+            message.channel.id,
+            # Bot messages are kept only so their deletion isn't logged as unknown
+            '' if message.author.bot else message.content,
+            len(message.attachments),
+            message.author.bot
+        )
+        self.put(message.guild.id, message.id, record)
+    
+    def put(self, guild_id: int, message_id: int, record: bytes):
+        """Store a packed record, evicting old ones to stay within budget."""
+        ring = self.rings.get(guild_id)
+        if ring is None:
+            ring = self.rings[guild_id] = OrderedDict()
+            self.guild_sizes[guild_id] = 0
+        self.rings.move_to_end(guild_id)
+        
+        previous = ring.pop(message_id, None)
+        if previous is not None:
+            self._account(guild_id, -(len(previous) + ENTRY_OVERHEAD))
+        ring[message_id] = record
+        self._account(guild_id, len(record) + ENTRY_OVERHEAD)
+        
+        while self.guild_sizes[guild_id] > self.guild_bytes and len(ring) > 1:
+            self._evict(guild_id)
+        while self.size > self.budget_bytes and self.rings:
+            self._evict(next(iter(self.rings)))
+    
+    def _account(self, guild_id: int, delta: int):
+        self.guild_sizes[guild_id] += delta
+        self.size += delta
+    
+    def _evict(self, guild_id: int):
+        """Drop a guild's oldest record, spilling it if enabled."""
+        ring = self.rings[guild_id]
+        message_id, record = ring.popitem(last=False)
+        self._account(guild_id, -(len(record) + ENTRY_OVERHEAD))
+        self.evictions += 1
+        if not ring:
+            del self.rings[guild_id]
+            del self.guild_sizes[guild_id]
+        
+        if self.spill_directory:
+            self._spill(guild_id, message_id, record)
+    
+    async def get(self, guild_id: int, message_id: int) -> Optional[CachedMessage]:
+        """Look up a message, checking spilled records if it has left memory."""
+        return (await self.get_many(guild_id, [message_id]))[0]
+    
+    async def get_many(self, guild_id: int, message_ids: Iterable[int]) -> List[Optional[CachedMessage]]:
+        """Look up several messages, reading each spilled segment they need once, off the event loop."""
+        message_ids = list(message_ids)
+        ring = self.rings.get(guild_id)
+        records = {message_id: ring[message_id] for message_id in message_ids if ring and message_id in ring}
+        
+        missing = [message_id for message_id in message_ids if message_id not in records]
+        if missing and self.spill_directory:
+            segments = {self._segment(message_id) for message_id in missing}
+            # Queued records are copied here, since flush may run while the thread reads
+            pending = {segment: bytes(self.pending.get((guild_id, segment), b'')) for segment in segments}
+            records.update(await asyncio.to_thread(self._read_spilled, guild_id, missing, pending))
+        
+        found = []
+        for message_id in message_ids:
+            record = records.get(message_id)
+            if record is None:
+                self.misses += 1
+                found.append(None)
+            else:
+                self.hits += 1
+                found.append(unpack_message(record))
+        return found
+    
+    async def pop(self, guild_id: int, message_id: int) -> Optional[CachedMessage]:
+        """Look up a deleted message and drop it from memory."""
+        return (await self.pop_many(guild_id, [message_id]))[0]
+    
+    async def pop_many(self, guild_id: int, message_ids: Iterable[int]) -> List[Optional[CachedMessage]]:
+        """Look up several deleted messages, e.g. a purge, and drop them from memory."""
+        message_ids = list(message_ids)
+        cached = await self.get_many(guild_id, message_ids)
+        ring = self.rings.get(guild_id)
+        if ring:
+            for message_id in message_ids:
+                record = ring.pop(message_id, None)
+                if record is not None:
+                    self._account(guild_id, -(len(record) + ENTRY_OVERHEAD))
+            if not ring:
+                del self.rings[guild_id]
+                del self.guild_sizes[guild_id]
+        return cached
+    
+    def update(self, guild_id: int, message_id: int, content: str, cached: Optional[CachedMessage]):
+        """Replace a cached message's content after an edit."""
+        if cached is not None:
+            self.put(guild_id, message_id, pack_message(cached.author_id, cached.channel_id, content, cached.attachments, cached.bot))
+    
+    def forget_guild(self, guild_id: int):
+        """Drop every in-memory record for a guild the bot left."""
+        ring = self.rings.pop(guild_id, None)
+        if ring is not None:
+            self.size -= self.guild_sizes.pop(guild_id)
+    
+    # Disk spill
+    @staticmethod
+    def _segment(message_id: int) -> str:
+        """Name of the hourly segment a message belongs to, from the time in its ID."""
+        created = datetime.utcfromtimestamp(((message_id >> 22) + DISCORD_EPOCH_MS) / 1000)
+        return created.strftime("%Y%m%d%H")
+    
+    def _segment_path(self, guild_id: int, segment: str) -> str:
+        return os.path.join(self.spill_directory, str(guild_id), f"{segment}.seg")
+    
+    def _spill(self, guild_id: int, message_id: int, record: bytes):
+        """Queue an evicted record for the segment of the hour the message was sent."""
+        buffer = self.pending.setdefault((guild_id, self._segment(message_id)), bytearray())
+        buffer.extend(SPILL_HEADER.pack(message_id, len(record)))
+        buffer.extend(record)
+        self.pending_size += SPILL_HEADER.size + len(record)
+        
+        if self.pending_size >= self.spill_bytes:
+            self.flush()
+    
+    def flush(self):
+        """Hand all queued evicted records to the writer thread."""
+        for (guild_id, segment), data in self.pending.items():
+            self._write(self._segment_path(guild_id, segment), bytes(data))
+        
+        self.pending.clear()
+        self.pending_size = 0
+    
+    def _write(self, path: str, data: bytes):
+        """Queue an append, starting the writer thread if it isn't running."""
+        if self.writer is None or not self.writer.is_alive():
+            self.writer = threading.Thread(target=self._run_writer, name='message-cache-writer', daemon=True)
+            self.writer.start()
+        self.writes.put((path, data))
+    
+    def _run_writer(self):
+        """Append queued data to its segment file until told to stop."""
+        while True:
+            item = self.writes.get()
+            try:
+                if item is None:
+                    return
+                path, data = item
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, 'ab') as f:
+                        f.write(data)
+                except OSError as e:
+                    logger.error(f"Failed to write message cache segment {path}: {e}")
+            finally:
+                self.writes.task_done()
+    
+    def wait(self):
+        """Block until every queued append has reached disk."""
+        if self.writer is not None:
+            self.writes.join()
+    
+    def close(self):
+        """Write everything still pending and stop the writer thread."""
+        self.flush()
+        if self.writer is not None and self.writer.is_alive():
+            self.writes.put(None)
+            self.writer.join()
+        self.writer = None
+    
+    def _read_spilled(self, guild_id: int, message_ids: List[int], pending: Dict[str, bytes]) -> Dict[int, bytes]:
+        """Find messages' latest records in their hourly segments and the queued writes. Runs in a thread."""
+        wanted = set(message_ids)
+        found: Dict[int, bytes] = {}
+        # Appends handed to the writer would otherwise be missing from the files
+        self.wait()
+        for segment, queued in pending.items():
+            chunks: List[bytes] = []
+            path = self._segment_path(guild_id, segment)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'rb') as f:
+                        chunks.append(f.read())
+                except OSError as e:
+                    logger.error(f"Failed to read message cache segment {path}: {e}")
+            if queued:
+                chunks.append(queued)
+            
+            for data in chunks:
+                offset = 0
+                # Stops at a torn trailing record from an interrupted write
+                while offset + SPILL_HEADER.size <= len(data):
+                    spilled_id, length = SPILL_HEADER.unpack_from(data, offset)
+                    offset += SPILL_HEADER.size
+                    if offset + length > len(data):
+                        break
+                    if spilled_id in wanted:
+                        found[spilled_id] = data[offset:offset + length]
+                    offset += length
+        return found
+    
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete spilled segments older than the retention period. Returns the number removed."""
+        if not self.spill_directory or not os.path.isdir(self.spill_directory):
+            return 0
+        
+        cutoff = datetime.utcfromtimestamp(now or time.time()) - self.retention
+        cutoff_segment = cutoff.strftime("%Y%m%d%H")
+        removed = 0
+        for guild_dir in os.listdir(self.spill_directory):
+            directory = os.path.join(self.spill_directory, guild_dir)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.endswith('.seg') and name[:-4] < cutoff_segment:
+                    try:
+                        os.remove(os.path.join(directory, name))
+                        removed += 1
+                    except OSError as e:
+                        logger.error(f"Failed to remove message cache segment {name}: {e}")
+        return removed
+    
+    def __len__(self) -> int:
+        return sum(len(ring) for ring in self.rings.values())
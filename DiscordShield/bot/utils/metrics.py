@@ -0,0 +1,357 @@
+import asyncio
+import functools
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+import aiohttp
+from aiohttp import web
+import discord
+from discord import app_commands
+from typing import Dict, Any, Optional, Callable, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies in microseconds."""
+    
+    # Bits of precision kept per power of two (about 1.5% relative error)
+    SIGNIFICANT_BITS = 6
+    
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+    
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self.SIGNIFICANT_BITS
+        if shift <= 0:
+            return value
+        return (shift << self.SIGNIFICANT_BITS) + (value >> shift)
+    
+    def _value(self, index: int) -> int:
+        """Get the midpoint of the range a bucket index covers."""
+        shift = index >> self.SIGNIFICANT_BITS
+        if shift == 0:
+            return index
+        mantissa = index & ((1 << self.SIGNIFICANT_BITS) - 1)
+        lower = mantissa << shift
+        return lower + ((1 << shift) >> 1)
+    
+    def record(self, value_us: int):
+        """Record a single latency."""
+        value_us = max(int(value_us), 0)
+        index = self._index(value_us)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value_us
+        if self.min is None or value_us < self.min:
+            self.min = value_us
+        if value_us > self.max:
+            self.max = value_us
+    
+    def percentile(self, percent: float) -> int:
+        """Get the latency at a percentile, in microseconds."""
+        if not self.count:
+            return 0
+        
+        target = max(1, int(self.count * percent / 100 + 0.5))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(self._value(index), self.max)
+        return self.max
+    
+    def summary(self) -> Dict[str, Any]:
+        """Get count, mean and key percentiles in milliseconds."""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count / 1000, 3) if self.count else 0,
+            'min_ms': round((self.min or 0) / 1000, 3),
+            'p50_ms': round(self.percentile(50) / 1000, 3),
+            'p90_ms': round(self.percentile(90) / 1000, 3),
+            'p99_ms': round(self.percentile(99) / 1000, 3),
+            'max_ms': round(self.max / 1000, 3)
+        }
+
+class Counter:
+    """Monotonic counter. Each thread increments its own shard, so the hot path never takes a lock."""
+    
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        
+        # thread ID -> label values -> count
+        self.shards: Dict[int, Dict[Tuple, float]] = {}
+    
+    def inc(self, amount: float = 1, **labels):
+        """Add to the counter for a set of labels."""
+        shard = self.shards.get(threading.get_ident())
+        if shard is None:
+            shard = self.shards[threading.get_ident()] = {}
+        key = tuple(sorted(labels.items()))
+        shard[key] = shard.get(key, 0) + amount
+    
+    def collect(self) -> Dict[Tuple, float]:
+        """Sum every shard. Only called at scrape time."""
+        totals: Dict[Tuple, float] = {}
+        for shard in list(self.shards.values()):
+            for key, value in list(shard.items()):
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+class Gauge:
+    """Value read from a callback at scrape time, so nothing is tracked between scrapes."""
+    
+    def __init__(self, name: str, description: str, callback: Callable[[], Any], kind: str = 'gauge'):
+        self.name = name
+        self.description = description
+        self.callback = callback
+        
+        # Exported type; 'counter' for totals derived from other state
+        self.kind = kind
+    
+    def collect(self) -> Dict[Tuple, float]:
+        """Read the current value, either a number or a dict keyed by label value tuples."""
+        value = self.callback()
+        if isinstance(value, dict):
+            return value
+        return {(): value}
+
+def _format_labels(labels: Tuple) -> str:
+    """Render label pairs in Prometheus text format."""
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+class Metrics:
+    """Registry of latency histograms, counters and gauges."""
+    
+    PREFIX = 'discordshield_'
+    
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, Counter] = {}
+        self.gauges: Dict[str, Gauge] = {}
+    
+    def counter(self, name: str, description: str = "") -> Counter:
+        """Get or create a counter."""
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = Counter(name, description)
+        elif description and not counter.description:
+            counter.description = description
+        return counter
+    
+    def gauge(self, name: str, description: str, callback: Callable[[], Any], kind: str = 'gauge'):
+        """Register a value read from a callback at scrape time."""
+        self.gauges[name] = Gauge(name, description, callback, kind)
+    
+    def histogram(self, name: str) -> LatencyHistogram:
+        """Get or create the histogram for a name."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+    
+    def observe(self, name: str, seconds: float):
+        """Record a duration in seconds."""
+        self.histogram(name).record(seconds * 1_000_000)
+    
+    @contextmanager
+    def timer(self, name: str):
+        """Time the enclosed block, including any awaits inside it."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+    
+    def instrument(self, name: str, coro):
+        """Wrap a coroutine function so every call is timed under a name."""
+        @functools.wraps(coro)
+        async def wrapper(*args, **kwargs):
+            with self.timer(name):
+                return await coro(*args, **kwargs)
+        return wrapper
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get a summary of every histogram."""
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+    
+    def http_trace(self) -> aiohttp.TraceConfig:
+        """Build a trace config that counts REST requests and rate limit responses."""
+        requests = self.counter('rest_requests_total', "REST requests sent to Discord")
+        rate_limited = self.counter('rest_rate_limited_total', "REST responses with status 429")
+        
+        async def on_request_end(session, context, params):
+            status = params.response.status
+            requests.inc(method=params.method, status=status)
+            if status == 429:
+                rate_limited.inc(method=params.method)
+        
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(on_request_end)
+        return trace
+    
+    def render_prometheus(self) -> str:
+        """Render every counter, gauge and histogram in Prometheus text format."""
+        lines = []
+        
+        for name, counter in sorted(self.counters.items()):
+            metric = self.PREFIX + name
+            if counter.description:
+                lines.append(f"# HELP {metric} {counter.description}")
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in sorted(counter.collect().items()):
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+        
+        for name, gauge in sorted(self.gauges.items()):
+            metric = self.PREFIX + name
+            try:
+                values = gauge.collect()
+            except Exception as e:
+                logger.error(f"Failed to collect gauge {name}: {e}")
+                continue
+            lines.append(f"# HELP {metric} {gauge.description}")
+            lines.append(f"# TYPE {metric} {gauge.kind}")
+            for labels, value in sorted(values.items()):
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+        
+        # Histograms are exported as summaries with precomputed quantiles
+        metric = self.PREFIX + 'handler_latency_seconds'
+        lines.append(f"# HELP {metric} Handler, command and task loop latency")
+        lines.append(f"# TYPE {metric} summary")
+        for name, histogram in sorted(self.histograms.items()):
+            for quantile in (0.5, 0.9, 0.99):
+                labels = _format_labels((('handler', name), ('quantile', quantile)))
+                lines.append(f"{metric}{labels} {histogram.percentile(quantile * 100) / 1_000_000}")
+            labels = _format_labels((('handler', name),))
+            lines.append(f"{metric}_sum{labels} {histogram.total / 1_000_000}")
+            lines.append(f"{metric}_count{labels} {histogram.count}")
+        
+        return '\n'.join(lines) + '\n'
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Command tree that stamps each interaction so slash command latency can be recorded."""
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras['started'] = time.perf_counter()
+        return True
+    
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        started = interaction.extras.get('started')
+        if started is not None and interaction.command:
+            self.client.metrics.observe(
+                f"command.{interaction.command.qualified_name}",
+                time.perf_counter() - started
+            )
+        await super().on_error(interaction, error)
+
+class LoopMonitor:
+    """Samples event loop lag and dumps the loop thread's stack when a callback blocks."""
+    
+    def __init__(self, metrics: Metrics, interval: float = 0.1, stall_threshold_ms: float = 250):
+        self.metrics = metrics
+        self.interval = interval
+        self.stall_threshold = stall_threshold_ms / 1000
+        
+        self.last_tick = time.monotonic()
+        self.stalls = 0
+        self.loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+    
+    def start(self):
+        """Start sampling on the running loop and start the watchdog thread."""
+        self.loop_thread_id = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+    
+    def stop(self):
+        """Stop sampling and the watchdog."""
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+    
+    async def _sample(self):
+        """Measure how late each wakeup is compared with the requested interval."""
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.last_tick = now
+            self.metrics.observe('event_loop.lag', max(now - start - self.interval, 0))
+    
+    def _watch(self):
+        """Watchdog thread: report stalls while the loop thread is blocked."""
+        reported = False
+        while not self._stopped.wait(self.interval):
+            blocked_for = time.monotonic() - self.last_tick
+            if blocked_for < self.stall_threshold:
+                reported = False
+                continue
+            
+            # Only dump once per stall
+            if reported:
+                continue
+            reported = True
+            self.stalls += 1
+            
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else 'unavailable'
+            logger.warning(
+                f"Event loop blocked for {blocked_for * 1000:.0f}ms, loop thread stack:\n{stack}"
+            )
+
+class MetricsServer:
+    """Local HTTP endpoint exposing the bot's metrics."""
+    
+    def __init__(self, bot, host: str = '127.0.0.1', port: int = 9108):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.runner = None
+    
+    async def start(self):
+        """Start serving on the current loop."""
+        app = web.Application()
+        app.router.add_get('/latency', self.handle_latency)
+        app.router.add_get('/metrics', self.handle_metrics)
+        
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(f"Metrics endpoint listening on http://{self.host}:{self.port}")
+    
+    async def stop(self):
+        """Stop serving."""
+        if self.runner:
+            await self.runner.cleanup()
+    
+    async def handle_latency(self, request):
+        """Serve latency histograms and loop stall counts as JSON."""
+        return web.json_response({
+            'handlers': self.bot.metrics.snapshot(),
+            'loop_stalls': self.bot.loop_monitor.stalls
+        })
+    
+    async def handle_metrics(self, request):
+        """Serve counters, gauges and latency summaries for Prometheus."""
+        return web.Response(
+            text=self.bot.metrics.render_prometheus(),
+            content_type='text/plain',
+            charset='utf-8'
+        )
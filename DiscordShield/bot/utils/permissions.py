@@ -1,10 +1,119 @@
 import discord
 from discord.ext import commands
-from typing import Union, List
+from typing import Dict, Union, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+ADMINISTRATOR = discord.Permissions(administrator=True).value
+
+# Any one of these makes a member a moderator
+MODERATOR_PERMISSIONS = discord.Permissions(
+    administrator=True,
+    manage_messages=True,
+    manage_channels=True,
+    kick_members=True,
+    ban_members=True
+).value
+
+# Roles holding any of these are added to new tickets
+TICKET_ROLE_PERMISSIONS = discord.Permissions(administrator=True, manage_channels=True, manage_messages=True).value
+
+class PermissionCache:
+    """
+    Guild permission bitfields per member, the bot's permissions per channel and each guild's
+    moderator roles, folded from roles once and dropped when roles, members or overwrites change.
+    """
+    
+    def __init__(self):
+        # guild -> member -> (role IDs the value was folded from, bitfield)
+        self.members: Dict[int, Dict[int, Tuple[Tuple[int, ...], int]]] = {}
+        
+        # guild -> channel -> the bot's bitfield there
+        self.channels: Dict[int, Dict[int, int]] = {}
+        
+        # guild -> IDs of roles added to tickets
+        self.ticket_roles: Dict[int, Tuple[int, ...]] = {}
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def guild_permissions(self, member: discord.Member) -> discord.Permissions:
+        """Get a member's guild permissions, folding their roles only on a miss."""
+        if not isinstance(member, discord.Member):
+            return discord.Permissions.none()
+        guild = member.guild
+        # Ownership and timeouts are checked live; a timeout lifts without any event
+        if guild.owner_id == member.id or member.is_timed_out():
+            return member.guild_permissions
+        
+        # Keyed by the member's roles too, so a member object with newer roles is never served a stale value.
+        # Read from discord.py's role ID list, since member.roles resolves and sorts Role objects on every call
+        roles = tuple(member._roles)
+        cached = self.members.setdefault(guild.id, {})
+        entry = cached.get(member.id)
+        if entry is not None and entry[0] == roles:
+            self.hits += 1
+            value = entry[1]
+        else:
+            self.misses += 1
+            value = 0
+            for role in member.roles:
+                value |= role.permissions.value
+            cached[member.id] = (roles, value)
+        
+        return discord.Permissions.all() if value & ADMINISTRATOR else discord.Permissions(value)
+    
+    def channel_permissions(self, channel: discord.abc.GuildChannel) -> discord.Permissions:
+        """Get the bot's permissions in a channel, resolving overwrites only on a miss."""
+        if isinstance(channel, discord.Thread):
+            # Threads take their parent's overwrites, which invalidate only the parent
+            return channel.permissions_for(channel.guild.me)
+        
+        cached = self.channels.setdefault(channel.guild.id, {})
+        value = cached.get(channel.id)
+        if value is None:
+            self.misses += 1
+            value = cached[channel.id] = channel.permissions_for(channel.guild.me).value
+        else:
+            self.hits += 1
+        return discord.Permissions(value)
+    
+    def ticket_roles_for(self, guild: discord.Guild) -> List[discord.Role]:
+        """Get the roles added to a guild's tickets."""
+        role_ids = self.ticket_roles.get(guild.id)
+        if role_ids is None:
+            role_ids = self.ticket_roles[guild.id] = tuple(
+                role.id for role in guild.roles if role.permissions.value & TICKET_ROLE_PERMISSIONS
+            )
+        return [role for role in map(guild.get_role, role_ids) if role]
+    
+    def roles_changed(self, guild_id: int):
+        """Drop everything folded from a guild's roles after one was edited or deleted."""
+        self.members.pop(guild_id, None)
+        self.channels.pop(guild_id, None)
+        self.ticket_roles.pop(guild_id, None)
+    
+    def member_changed(self, guild_id: int, user_id: int, is_bot_user: bool = False):
+        """Drop a member's bitfield after their roles changed or they left."""
+        cached = self.members.get(guild_id)
+        if cached:
+            cached.pop(user_id, None)
+        if is_bot_user:
+            self.channels.pop(guild_id, None)
+    
+    def channel_changed(self, guild_id: int, channel_id: int):
+        """Drop the bot's permissions in a channel whose overwrites changed or that was deleted."""
+        cached = self.channels.get(guild_id)
+        if cached:
+            cached.pop(channel_id, None)
+    
+    def forget_guild(self, guild_id: int):
+        """Drop everything cached for a guild the bot left."""
+        self.roles_changed(guild_id)
+
+permission_cache = PermissionCache()
+
 class Permissions:
     """Permission checking utilities for the bot."""
     
@@ -13,69 +122,53 @@ class Permissions:
         """Check if user is the server owner."""
         return user.id == guild.owner_id
     
+    @staticmethod
+    def guild_permissions(user: discord.Member) -> discord.Permissions:
+        """Get a member's guild permissions from the cache."""
+        return permission_cache.guild_permissions(user)
+    
     @staticmethod
     def is_admin(user: discord.Member) -> bool:
         """Check if user has administrator permissions."""
-        return user.guild_permissions.administrator
+        return permission_cache.guild_permissions(user).administrator
     
     @staticmethod
     def is_moderator(user: discord.Member) -> bool:
         """Check if user has moderation permissions."""
-        return (
-            user.guild_permissions.administrator or
-            user.guild_permissions.manage_messages or
-            user.guild_permissions.manage_channels or
-            user.guild_permissions.kick_members or
-            user.guild_permissions.ban_members
-        )
+        return bool(permission_cache.guild_permissions(user).value & MODERATOR_PERMISSIONS)
     
     @staticmethod
     def can_manage_roles(user: discord.Member) -> bool:
         """Check if user can manage roles."""
-        return (
-            user.guild_permissions.administrator or
-            user.guild_permissions.manage_roles
-        )
+        return permission_cache.guild_permissions(user).manage_roles
     
     @staticmethod
     def can_manage_channels(user: discord.Member) -> bool:
         """Check if user can manage channels."""
-        return (
-            user.guild_permissions.administrator or
-            user.guild_permissions.manage_channels
-        )
+        return permission_cache.guild_permissions(user).manage_channels
     
     @staticmethod
     def can_kick_members(user: discord.Member) -> bool:
         """Check if user can kick members."""
-        return (
-            user.guild_permissions.administrator or
-            user.guild_permissions.kick_members
-        )
+        return permission_cache.guild_permissions(user).kick_members
     
     @staticmethod
     def can_ban_members(user: discord.Member) -> bool:
         """Check if user can ban members."""
-        return (
-            user.guild_permissions.administrator or
-            user.guild_permissions.ban_members
-        )
+        return permission_cache.guild_permissions(user).ban_members
     
     @staticmethod
     def can_manage_messages(user: discord.Member) -> bool:
         """Check if user can manage messages."""
-        return (
-            user.guild_permissions.administrator or
-            user.guild_permissions.manage_messages
-        )
+        return permission_cache.guild_permissions(user).manage_messages
     
     @staticmethod
     def has_higher_role(user: discord.Member, target: discord.Member) -> bool:
         """Check if user has a higher role than target."""
-        if user.guild_permissions.administrator:
+        if permission_cache.guild_permissions(user).administrator:
             return True
         
-        if target.guild_permissions.administrator:
+        if permission_cache.guild_permissions(target).administrator:
             return False
         
         return user.top_role > target.top_role
@@ -83,7 +176,7 @@ class Permissions:
     @staticmethod
     def check_bot_permissions(channel: discord.TextChannel, *permissions) -> bool:
         """Check if bot has required permissions in a channel."""
-        bot_perms = channel.permissions_for(channel.guild.me)
+        bot_perms = permission_cache.channel_permissions(channel)
         
         for perm in permissions:
             if not getattr(bot_perms, perm, False):
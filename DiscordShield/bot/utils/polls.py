@@ -0,0 +1,125 @@
+import asyncio
+import time
+import discord
+from datetime import timedelta
+from typing import Dict, Any, Optional
+import logging
+from .embeds import EmbedTemplate
+
+logger = logging.getLogger(__name__)
+
+POLL_EMOJIS = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
+
+POLL_TEMPLATE = EmbedTemplate(title="📊 Poll", color=discord.Color.purple())
+POLL_RESULTS_TEMPLATE = EmbedTemplate(title="📊 Poll Results", color=discord.Color.green())
+
+# Seconds between edits of one poll's embed, however many votes arrive
+POLL_EDIT_INTERVAL = 5.0
+
+# How long polls stay open when no duration is given, and the longest allowed
+DEFAULT_POLL_DURATION = timedelta(days=1)
+MAX_POLL_DURATION = timedelta(weeks=1)
+
+BAR_WIDTH = 12
+
+def poll_id(guild_id: int, message_id: int) -> str:
+    """Key of a poll in the database."""
+    return f"{guild_id}-{message_id}"
+
+def cast_vote(poll: Dict[str, Any], user_id: int, option: int) -> Optional[int]:
+    """Count a vote, replacing the user's previous one. Returns the option they switched from, if any."""
+    previous = poll['voters'].get(user_id)
+    if previous == option:
+        return None
+    if previous is not None:
+        poll['counts'][previous] -= 1
+    poll['counts'][option] += 1
+    poll['voters'][user_id] = option
+    return previous
+
+def withdraw_vote(poll: Dict[str, Any], user_id: int, option: int) -> bool:
+    """Uncount a vote when its reaction is removed. Reactions left over from a switched vote are ignored."""
+    if poll['voters'].get(user_id) != option:
+        return False
+    del poll['voters'][user_id]
+    poll['counts'][option] -= 1
+    return True
+
+def clear_votes(poll: Dict[str, Any], option: Optional[int] = None):
+    """Uncount every vote, or every vote for one option."""
+    if option is None:
+        poll['voters'].clear()
+        poll['counts'] = [0] * len(poll['options'])
+        return
+    for user_id in [user_id for user_id, voted in poll['voters'].items() if voted == option]:
+        del poll['voters'][user_id]
+    poll['counts'][option] = 0
+
+def render_poll(poll: Dict[str, Any], final: bool = False) -> discord.Embed:
+    """Build a poll's embed from its running tallies."""
+    total = sum(poll['counts'])
+    lines = []
+    for emoji, option, count in zip(POLL_EMOJIS, poll['options'], poll['counts']):
+        share = count / total if total else 0.0
+        filled = round(share * BAR_WIDTH)
+        lines.append(f"{emoji} **{option}**\n`{'█' * filled}{'░' * (BAR_WIDTH - filled)}` {count:,} ({share:.0%})")
+    
+    if final:
+        description = f"**{poll['question']}**\n\nClosed <t:{int(poll['closes_at'].timestamp())}:R>"
+    else:
+        description = f"**{poll['question']}**\n\nCloses <t:{int(poll['closes_at'].timestamp())}:R> • one vote per person"
+    
+    embed = (POLL_RESULTS_TEMPLATE if final else POLL_TEMPLATE).render(
+        description=description,
+        footer={'text': f"{total:,} vote{'s' if total != 1 else ''} • Poll created by {poll['creator_name']}"}
+    )
+    embed.add_field(name="Results" if final else "Options", value="\n".join(lines), inline=False)
+    return embed
+
+class PollEditor:
+    """Refreshes poll embeds at most once per interval per poll, folding every vote in between into one edit."""
+    
+    def __init__(self, bot, interval: float = POLL_EDIT_INTERVAL):
+        self.bot = bot
+        self.interval = interval
+        self.last_edit: Dict[str, float] = {}
+        self.pending: Dict[str, asyncio.Task] = {}
+        self.edits = 0
+    
+    def touch(self, key: str):
+        """Note that a poll's tallies changed, scheduling an edit if none is waiting."""
+        if key not in self.pending:
+            self.pending[key] = asyncio.create_task(self._edit(key))
+    
+    def forget(self, key: str):
+        """Stop editing a poll that closed or was deleted."""
+        task = self.pending.pop(key, None)
+        if task:
+            task.cancel()
+        self.last_edit.pop(key, None)
+    
+    async def _edit(self, key: str):
+        try:
+            delay = self.last_edit.get(key, 0.0) + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            
+            # Votes from here on schedule the next edit
+            self.pending.pop(key, None)
+            poll = self.bot.db.polls.get(key)
+            if not poll or poll.get('closed'):
+                return
+            
+            channel = self.bot.get_channel(poll['channel'])
+            if not channel:
+                return
+            
+            self.last_edit[key] = time.monotonic()
+            message = channel.get_partial_message(poll['message_id'])
+            # Rendered when the edit starts, so an edit still queued behind others shows the latest tallies
+            await self.bot.rest.background(channel, lambda: message.edit(embed=render_poll(poll)), key=f"poll_edit:{key}")
+            self.edits += 1
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to update poll {key}: {e}")
+        except Exception as e:
+            logger.error(f"Error updating poll {key}: {e}")
@@ -0,0 +1,74 @@
+import random
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Used by every guild until it adds questions of its own
+DEFAULT_QUESTIONS = [
+    "What's your favorite hobby and why?",
+    "If you could travel anywhere, where would you go?",
+    "What's the best advice you've ever received?",
+    "What's your favorite season and why?",
+    "If you could have dinner with anyone, who would it be?",
+    "What's a skill you'd like to learn?",
+    "What's your favorite book or movie?",
+    "If you could change one thing about the world, what would it be?",
+    "What's the most interesting place you've visited?",
+    "What's your dream job?"
+]
+
+# Longest question a guild can add, to keep the embed description short
+MAX_QUESTION_LENGTH = 300
+
+# Most custom questions a guild can keep
+MAX_QUESTIONS = 200
+
+class QuestionBank:
+    """A guild's questions, dealt from a shuffled deck so none repeats until all have been asked."""
+    
+    __slots__ = ('questions', 'deck', 'last')
+    
+    def __init__(self):
+        # Custom questions; the defaults are used while this is empty
+        self.questions: List[str] = []
+        self.deck: List[str] = []
+        self.last: Optional[str] = None
+    
+    def pool(self) -> List[str]:
+        """Get the questions currently in rotation."""
+        return self.questions or DEFAULT_QUESTIONS
+    
+    def next(self) -> str:
+        """Deal the next question, reshuffling once every question has been asked."""
+        if not self.deck:
+            self.deck = list(self.pool())
+            random.shuffle(self.deck)
+            # The deck is dealt from the end, so keep the previous question off the top
+            if len(self.deck) > 1 and self.deck[-1] == self.last:
+                self.deck[0], self.deck[-1] = self.deck[-1], self.deck[0]
+        
+        self.last = self.deck.pop()
+        return self.last
+    
+    def add(self, question: str) -> bool:
+        """Add a custom question. Returns False if it is already in the bank or the bank is full."""
+        if question in self.questions or len(self.questions) >= MAX_QUESTIONS:
+            return False
+        if not self.questions:
+            # Switching from the defaults starts a fresh deck
+            self.deck = []
+        self.questions.append(question)
+        self.deck.insert(random.randint(0, len(self.deck)), question)
+        return True
+    
+    def remove(self, question: str) -> bool:
+        """Remove a custom question."""
+        if question not in self.questions:
+            return False
+        self.questions.remove(question)
+        if question in self.deck:
+            self.deck.remove(question)
+        if not self.questions:
+            self.deck = []
+        return True
@@ -0,0 +1,207 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple, Union
+import discord
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, most urgent first
+SAFETY = 0      # timeouts, bans, kicks, lockdowns, removing filtered messages
+RESPONSE = 1    # replies and DMs to users, role changes they asked for
+BACKGROUND = 2  # logs, announcements, welcome and report embeds
+
+LANE_NAMES = {SAFETY: 'safety', RESPONSE: 'response', BACKGROUND: 'background'}
+
+# Requests a lane may start while this many are already in flight on the same bucket
+BUCKET_LIMITS = {SAFETY: 4, RESPONSE: 2, BACKGROUND: 1}
+
+# Requests a lane may start while this many are in flight overall, so lower lanes
+# always leave headroom for the ones above them
+LANE_SLOTS = {SAFETY: 50, RESPONSE: 30, BACKGROUND: 10}
+
+class RestAction:
+    """An outbound request waiting for its turn."""
+
+    __slots__ = ('lane', 'seq', 'bucket', 'factory', 'key', 'future', 'queued_at')
+
+    def __init__(self, lane: int, seq: int, bucket: str, factory: Callable[[], Awaitable[Any]], key: Optional[str], future: asyncio.Future):
+        self.lane = lane
+        self.seq = seq
+        self.bucket = bucket
+        self.factory = factory
+        self.key = key
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+class RestScheduler:
+    """Orders outbound Discord actions by priority lane with per-bucket concurrency limits."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+        # bucket -> heap of (lane, seq, action) not yet started
+        self.pending: Dict[str, List[Tuple[int, int, RestAction]]] = {}
+
+        # Heap of (lane, seq, bucket) for buckets whose next action may be startable.
+        # Entries go stale once that action starts and are skipped lazily.
+        self.ready: List[Tuple[int, int, str]] = []
+
+        self.in_flight: Dict[str, int] = {}
+        self.total_in_flight = 0
+
+        # Dedup key -> pending action
+        self.by_key: Dict[str, RestAction] = {}
+        self.queued = {lane: 0 for lane in LANE_NAMES}
+        self._seq = itertools.count()
+
+    @staticmethod
+    def bucket_for(target: Union[str, discord.abc.Snowflake]) -> str:
+        """Map a target to the rate limit bucket its requests share."""
+        if isinstance(target, str):
+            return target
+        if isinstance(target, discord.Member):
+            return f"guild:{target.guild.id}"
+        if isinstance(target, discord.Guild):
+            return f"guild:{target.id}"
+        if isinstance(target, discord.User):
+            return f"dm:{target.id}"
+        if isinstance(target, discord.Message):
+            return f"channel:{target.channel.id}"
+        return f"channel:{target.id}"
+
+    @staticmethod
+    def dm_bucket(user: discord.abc.User) -> str:
+        """Bucket for direct messages to a user or member."""
+        return f"dm:{user.id}"
+
+    def submit(
+        self,
+        lane: int,
+        target: Union[str, discord.abc.Snowflake],
+        factory: Callable[[], Awaitable[Any]],
+        key: Optional[str] = None
+    ) -> asyncio.Future:
+        """Queue an action. Returns a future for its result, shared with any identical pending action."""
+        if key is not None:
+            existing = self.by_key.get(key)
+            if existing is not None:
+                self.bot.metrics.counter('rest_deduplicated_total').inc(lane=LANE_NAMES[lane])
+                if lane < existing.lane:
+                    self._promote(existing, lane)
+                return existing.future
+
+        bucket = self.bucket_for(target)
+        seq = next(self._seq)
+        action = RestAction(lane, seq, bucket, factory, key, asyncio.get_running_loop().create_future())
+
+        heapq.heappush(self.pending.setdefault(bucket, []), (lane, seq, action))
+        self.queued[lane] += 1
+        if key is not None:
+            self.by_key[key] = action
+
+        self._mark_ready(bucket)
+        self._pump()
+        return action.future
+
+    async def run(self, lane: int, target, factory: Callable[[], Awaitable[Any]], key: Optional[str] = None) -> Any:
+        """Queue an action and wait for its result. Exceptions from the request are raised here."""
+        # The future may be shared with other callers, so cancelling this one must not cancel it for them
+        return await asyncio.shield(self.submit(lane, target, factory, key))
+
+    async def safety(self, target, factory: Callable[[], Awaitable[Any]], key: Optional[str] = None) -> Any:
+        """Run a moderation or anti-abuse action ahead of everything else."""
+        return await asyncio.shield(self.submit(SAFETY, target, factory, key))
+
+    async def response(self, target, factory: Callable[[], Awaitable[Any]], key: Optional[str] = None) -> Any:
+        """Run a user-facing reply or requested change."""
+        return await asyncio.shield(self.submit(RESPONSE, target, factory, key))
+
+    async def background(self, target, factory: Callable[[], Awaitable[Any]], key: Optional[str] = None) -> Any:
+        """Run a log, announcement or other non-urgent send."""
+        return await asyncio.shield(self.submit(BACKGROUND, target, factory, key))
+
+    def _promote(self, action: RestAction, lane: int):
+        """Move a pending action up to a more urgent lane."""
+        queue = self.pending[action.bucket]
+        for index, (_, seq, queued) in enumerate(queue):
+            if queued is action:
+                queue[index] = (lane, seq, action)
+                break
+        heapq.heapify(queue)
+
+        self.queued[action.lane] -= 1
+        self.queued[lane] += 1
+        action.lane = lane
+
+        self._mark_ready(action.bucket)
+        self._pump()
+
+    def _mark_ready(self, bucket: str):
+        """Offer a bucket's next action to the dispatcher."""
+        queue = self.pending.get(bucket)
+        if queue:
+            lane, seq, _ = queue[0]
+            heapq.heappush(self.ready, (lane, seq, bucket))
+
+    def _pump(self):
+        """Start every action the limits currently allow, most urgent first."""
+        while self.ready:
+            lane, seq, bucket = self.ready[0]
+            queue = self.pending.get(bucket)
+            if not queue or queue[0][1] != seq:
+                heapq.heappop(self.ready)
+                continue
+
+            # Everything behind this entry is in the same or a lower lane
+            if self.total_in_flight >= LANE_SLOTS[lane]:
+                return
+
+            heapq.heappop(self.ready)
+            if self.in_flight.get(bucket, 0) >= BUCKET_LIMITS[lane]:
+                # Offered again when one of the bucket's requests finishes
+                continue
+
+            _, _, action = heapq.heappop(queue)
+            if not queue:
+                del self.pending[bucket]
+            self._start(action)
+            self._mark_ready(bucket)
+
+    def _start(self, action: RestAction):
+        """Run an action now."""
+        if action.key is not None:
+            self.by_key.pop(action.key, None)
+        self.queued[action.lane] -= 1
+        self.in_flight[action.bucket] = self.in_flight.get(action.bucket, 0) + 1
+        self.total_in_flight += 1
+
+        lane_name = LANE_NAMES[action.lane]
+        self.bot.metrics.counter('rest_actions_total').inc(lane=lane_name)
+        self.bot.metrics.observe(f"rest.wait.{lane_name}", time.perf_counter() - action.queued_at)
+        asyncio.create_task(self._execute(action))
+
+    async def _execute(self, action: RestAction):
+        try:
+            result = await action.factory()
+        except asyncio.CancelledError:
+            action.future.cancel()
+            raise
+        except Exception as e:
+            if not action.future.done():
+                action.future.set_exception(e)
+        else:
+            if not action.future.done():
+                action.future.set_result(result)
+        finally:
+            remaining = self.in_flight.get(action.bucket, 1) - 1
+            if remaining:
+                self.in_flight[action.bucket] = remaining
+            else:
+                self.in_flight.pop(action.bucket, None)
+            self.total_in_flight -= 1
+
+            self._mark_ready(action.bucket)
+            self._pump()
@@ -0,0 +1,192 @@
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Whether a guild matches messages against the shared cache and contributes flags to it
+SCAM_FILTER_MODES = ('off', 'on')
+
+# How long a flagged fingerprint or domain keeps matching after its last flag
+SCAM_TTL = 24 * 3600
+
+# Messages shorter than this once normalized are too generic to fingerprint
+MIN_FINGERPRINT_LENGTH = 20
+
+# A linked message posted by this many authors in as many guilds within the window is flagged without a moderator
+CROSS_GUILD_THRESHOLD = 3
+SIGHTING_WINDOW = 10 * 60
+
+# Text outside the links a message needs before it can be flagged without a moderator, so bare links never are
+MIN_SIGHTING_TEXT = 20
+
+MAX_FLAGGED = 100000
+MAX_SIGHTINGS = 50000
+
+# Domains, and their subdomains, that are never flagged on their own; messages linking them can still match by fingerprint
+SAFE_DOMAINS = frozenset({
+    'discord.com', 'discordapp.com', 'discordapp.net', 'tenor.com', 'giphy.com',
+    'youtube.com', 'youtu.be', 'github.com', 'twitter.com', 'x.com', 'reddit.com',
+    'wikipedia.org', 'google.com', 'steampowered.com', 'steamcommunity.com', 'twitch.tv'
+})
+
+# Host, then path; the query and fragment that follow are matched but dropped
+URL_PATTERN = re.compile(r'https?://([^\s/?#<>]+)([^\s?#<>]*)[^\s<>]*', re.IGNORECASE)
+MENTION_PATTERN = re.compile(r'<(?:@[!&]?|#)\d+>|@everyone|@here')
+INVISIBLE_PATTERN = re.compile('[\u00ad\u200b-\u200f\u2060-\u2064\ufeff]')
+SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def normalize(content: str) -> str:
+    """Fold a message to the text that stays the same when it's reposted with tweaks."""
+    text = unicodedata.normalize('NFKC', content).casefold()
+    # Links keep their host and path; scams vary the query per post, while the path tells pages apart
+    text = URL_PATTERN.sub(lambda link: link.group(1) + link.group(2), INVISIBLE_PATTERN.sub('', text))
+    text = MENTION_PATTERN.sub(' ', text)
+    return SEPARATOR_PATTERN.sub(' ', text).strip()
+
+def fingerprint(content: str) -> Optional[int]:
+    """Fingerprint a message's normalized text, or None if it's too short to tell apart."""
+    text = normalize(content)
+    return _hash(text) if len(text) >= MIN_FINGERPRINT_LENGTH else None
+
+def link_domains(content: str) -> List[str]:
+    """Hostnames of the links in a message, without credentials, port or www."""
+    domains = []
+    for link in URL_PATTERN.finditer(content):
+        host = unicodedata.normalize('NFKC', link.group(1)).casefold().rsplit('@', 1)[-1].split(':', 1)[0].rstrip('.')
+        if host.startswith('www.'):
+            host = host[4:]
+        if host and host not in domains:
+            domains.append(host)
+    return domains
+
+def is_safe_domain(domain: str) -> bool:
+    """Whether a hostname is a safe domain or a subdomain of one."""
+    parts = domain.split('.')
+    return any('.'.join(parts[i:]) in SAFE_DOMAINS for i in range(len(parts) - 1))
+
+class ScamCache:
+    """
+    Process-wide fingerprints of scam messages and hashes of their link domains, flagged in one
+    guild and matched in every guild until they expire.
+    """
+    
+    def __init__(self, ttl: float = SCAM_TTL, max_flagged: int = MAX_FLAGGED):
+        self.ttl = ttl
+        self.max_flagged = max_flagged
+        
+        # Hash -> expiry, soonest first since every entry lives for the same TTL
+        self.fingerprints: OrderedDict = OrderedDict()
+        self.domains: OrderedDict = OrderedDict()
+        
+        # Fingerprint of a linked message -> (first seen, guilds it was posted in, its authors)
+        self.sightings: OrderedDict = OrderedDict()
+        
+        self.matches = 0
+        self.flags = 0
+    
+    def _put(self, table: OrderedDict, key: int, now: float):
+        table[key] = now + self.ttl
+        table.move_to_end(key)
+        while len(table) > self.max_flagged:
+            table.popitem(last=False)
+    
+    @staticmethod
+    def _expire(table: OrderedDict, now: float):
+        while table:
+            key, expires_at = next(iter(table.items()))
+            if expires_at > now:
+                return
+            del table[key]
+    
+    def _live(self, table: OrderedDict, key: int, now: float) -> bool:
+        expires_at = table.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del table[key]
+            return False
+        return True
+    
+    def flag(self, content: str, include_domains: bool = True, now: Optional[float] = None) -> Tuple[bool, List[str]]:
+        """Flag a message as a scam. Returns whether it could be fingerprinted and the domains flagged."""
+        now = now or time.monotonic()
+        self.flags += 1
+        fingerprinted = False
+        value = fingerprint(content)
+        if value is not None:
+            self._put(self.fingerprints, value, now)
+            self.sightings.pop(value, None)
+            fingerprinted = True
+        
+        flagged_domains = []
+        if include_domains:
+            for domain in link_domains(content):
+                if not is_safe_domain(domain):
+                    self._put(self.domains, _hash(domain), now)
+                    flagged_domains.append(domain)
+        return fingerprinted, flagged_domains
+    
+    def match(self, content: str, now: Optional[float] = None) -> Optional[str]:
+        """Check a message against flagged fingerprints and domains. Returns what matched, if anything."""
+        now = now or time.monotonic()
+        self._expire(self.fingerprints, now)
+        self._expire(self.domains, now)
+        if not self.fingerprints and not self.domains:
+            return None
+        
+        value = fingerprint(content)
+        if value is not None and self._live(self.fingerprints, value, now):
+            self.matches += 1
+            return 'message'
+        
+        if self.domains:
+            for domain in link_domains(content):
+                if self._live(self.domains, _hash(domain), now):
+                    self.matches += 1
+                    return f'link to {domain}'
+        return None
+    
+    def observe(self, content: str, guild_id: int, author_id: int, now: Optional[float] = None) -> bool:
+        """
+        Note where and by whom a linked message was posted, flagging it once enough authors have
+        posted it across enough guilds. Returns True if it was flagged.
+        """
+        if not any(not is_safe_domain(domain) for domain in link_domains(content)):
+            return False
+        if len(normalize(URL_PATTERN.sub(' ', content))) < MIN_SIGHTING_TEXT:
+            return False
+        value = fingerprint(content)
+        if value is None:
+            return False
+        
+        now = now or time.monotonic()
+        while self.sightings:
+            first_seen, _, _ = next(iter(self.sightings.values()))
+            if first_seen > now - SIGHTING_WINDOW and len(self.sightings) <= MAX_SIGHTINGS:
+                break
+            self.sightings.popitem(last=False)
+        
+        sighting = self.sightings.get(value)
+        if sighting is None:
+            sighting = self.sightings[value] = (now, set(), set())
+        guilds: Set[int] = sighting[1]
+        authors: Set[int] = sighting[2]
+        guilds.add(guild_id)
+        authors.add(author_id)
+        if len(guilds) < CROSS_GUILD_THRESHOLD or len(authors) < CROSS_GUILD_THRESHOLD:
+            return False
+        
+        # Only the message itself; its domains need a moderator's flag
+        self.flag(content, include_domains=False, now=now)
+        return True
+    
+    def sizes(self) -> Dict[str, int]:
+        return {'fingerprints': len(self.fingerprints), 'domains': len(self.domains), 'sightings': len(self.sightings)}
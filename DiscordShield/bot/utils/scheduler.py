@@ -1,10 +1,37 @@
 import asyncio
+import discord
 from datetime import datetime, timedelta
-from typing import Dict, List, Callable, Any
+from typing import Dict, List, Callable, Any, Optional, Set, Tuple
 import logging
+from .embeds import EmbedTemplate
+from .giveaways import GiveawayEntries, GIVEAWAY_EMOJI, entry_weight
+from .polls import render_poll
 
 logger = logging.getLogger(__name__)
 
+BIRTHDAY_TEMPLATE = EmbedTemplate(title="🎉 Happy Birthday! 🎉", color=discord.Color.gold(), timestamp=False)
+
+# Birthday mentions per announcement embed
+BIRTHDAY_BATCH_SIZE = 50
+
+# Tokens given to each member on their birthday
+BIRTHDAY_TOKENS = 100
+
+# Delay before retrying birthdays that couldn't be announced, e.g. while a guild is unavailable
+BIRTHDAY_RETRY = timedelta(minutes=5)
+
+QOTD_TEMPLATE = EmbedTemplate(title="📝 Question of the Day", color=discord.Color.purple())
+
+# Seconds past the hour over which a QOTD hour's posts are spread
+QOTD_SPREAD = 15 * 60
+
+# Guilds posting their question of the day at the same moment
+QOTD_CONCURRENCY = 8
+
+def qotd_offset(guild_id: int) -> int:
+    """Seconds past its QOTD hour a guild posts at. Stable, so each guild posts at the same time every day."""
+    return guild_id % QOTD_SPREAD
+
 class Scheduler:
     """Task scheduler for the bot."""
     
@@ -12,6 +39,18 @@ class Scheduler:
         self.bot = bot
         self.scheduled_tasks: Dict[str, Dict[str, Any]] = {}
         self.running_tasks: Dict[str, asyncio.Task] = {}
+        
+        # When the single warning expiry timer is due to fire
+        self.warning_expiry_time: Optional[datetime] = None
+        
+        # When the single birthday timer is due to fire
+        self.birthday_time: Optional[datetime] = None
+        
+        # Birthdays being announced, so a re-armed timer can't announce them twice
+        self.birthdays_in_flight: Set[Tuple[int, int]] = set()
+        
+        # Giveaway message -> reconciliation in progress, joined by anyone else who needs it
+        self.giveaway_reconciles: Dict[int, asyncio.Task] = {}
     
     async def schedule_announcement(
         self, 
@@ -59,7 +98,7 @@ class Scheduler:
             if guild:
                 channel = guild.get_channel(task_data['channel_id'])
                 if channel:
-                    await channel.send(task_data['message'])
+                    await self.bot.rest.background(channel, lambda: channel.send(task_data['message']))
                     
                     # Handle repeat
                     if task_data['repeat'] == "daily":
@@ -137,7 +176,7 @@ class Scheduler:
                     )
                     embed.set_footer(text=f"Reminder for {user.display_name}")
                     
-                    await channel.send(f"{user.mention}", embed=embed)
+                    await self.bot.rest.response(channel, lambda: channel.send(f"{user.mention}", embed=embed))
             
             # Remove completed reminder
             self.cancel_task(task_id)
@@ -193,45 +232,30 @@ class Scheduler:
             if guild:
                 channel = guild.get_channel(task_data['channel_id'])
                 if channel:
-                    try:
-                        message = await channel.fetch_message(task_data['message_id'])
-                        
-                        # Get users who reacted with 🎉
-                        reaction = None
-                        for r in message.reactions:
-                            if str(r.emoji) == "🎉":
-                                reaction = r
-                                break
+                    giveaway = self.bot.db.giveaways.get(f"{task_data['guild_id']}-{task_data['message_id']}", task_data)
+                    entries = self.bot.db.giveaway_entries.get(task_data['message_id'])
+                    if entries is None or entries.stale:
+                        entries = await self.reconcile_giveaway(channel, task_data['message_id'], giveaway.get('bonus_role_id'))
+                    
+                    if entries is not None:
+                        with self.bot.metrics.timer("task.giveaway_draw"):
+                            if giveaway.get('weighting', 'none') == 'none':
+                                winners = entries.draw(task_data['winners'])
+                            else:
+                                winners = entries.draw_weighted(task_data['winners'], entry_weight(self.bot.db, giveaway, entries))
                         
-                        if reaction and reaction.count > 1:  # Exclude bot's reaction
-                            users = []
-                            async for user in reaction.users():
-                                if not user.bot:
-                                    users.append(user)
+                        if winners:
+                            winner_mentions = [f"<@{user_id}>" for user_id in winners]
                             
-                            if users:
-                                import random
-                                winners_count = min(task_data['winners'], len(users))
-                                winners = random.sample(users, winners_count)
-                                
-                                winner_mentions = [winner.mention for winner in winners]
-                                
-                                embed = discord.Embed(
-                                    title="🎉 Giveaway Ended!",
-                                    description=f"**Prize:** {task_data['prize']}\n**Winner(s):** {', '.join(winner_mentions)}",
-                                    color=discord.Color.gold(),
-                                    timestamp=datetime.utcnow()
-                                )
-                                
-                                await channel.send(embed=embed)
-                            else:
-                                embed = discord.Embed(
-                                    title="🎉 Giveaway Ended!",
-                                    description=f"**Prize:** {task_data['prize']}\nNo valid participants!",
-                                    color=discord.Color.red(),
-                                    timestamp=datetime.utcnow()
-                                )
-                                await channel.send(embed=embed)
+                            embed = discord.Embed(
+                                title="🎉 Giveaway Ended!",
+                                description=f"**Prize:** {task_data['prize']}\n**Winner(s):** {', '.join(winner_mentions)}",
+                                color=discord.Color.gold(),
+                                timestamp=datetime.utcnow()
+                            )
+                            embed.set_footer(text=f"{len(entries):,} entries")
+                            
+                            await self.bot.rest.background(channel, lambda: channel.send(embed=embed))
                         else:
                             embed = discord.Embed(
                                 title="🎉 Giveaway Ended!",
@@ -239,17 +263,276 @@ class Scheduler:
                                 color=discord.Color.red(),
                                 timestamp=datetime.utcnow()
                             )
-                            await channel.send(embed=embed)
-                    
-                    except discord.NotFound:
-                        logger.warning(f"Giveaway message not found: {task_data['message_id']}")
+                            await self.bot.rest.background(channel, lambda: channel.send(embed=embed))
             
             # Remove completed giveaway
+            self.bot.db.giveaway_entries.pop(task_data['message_id'], None)
             self.cancel_task(task_id)
         
         except Exception as e:
             logger.error(f"Error executing giveaway end {task_id}: {e}")
     
+    async def reconcile_giveaway(self, channel, message_id: int, bonus_role_id: Optional[int] = None) -> Optional[GiveawayEntries]:
+        """
+        Rebuild a giveaway's entrants from its reaction list. Only needed when reaction
+        events may have been missed, since this pages through every reactor.
+        """
+        # Two passes at once would each replace the other's entries, so later callers wait for the first
+        task = self.giveaway_reconciles.get(message_id)
+        if task is None:
+            task = self.giveaway_reconciles[message_id] = asyncio.create_task(
+                self._reconcile_giveaway(channel, message_id, bonus_role_id)
+            )
+            task.add_done_callback(lambda _: self.giveaway_reconciles.pop(message_id, None))
+        return await asyncio.shield(task)
+    
+    async def _reconcile_giveaway(self, channel, message_id: int, bonus_role_id: Optional[int]) -> Optional[GiveawayEntries]:
+        try:
+            message = await self.bot.rest.background(channel, lambda: channel.fetch_message(message_id))
+        except discord.NotFound:
+            logger.warning(f"Giveaway message not found: {message_id}")
+            self.bot.db.giveaway_entries.pop(message_id, None)
+            return None
+        
+        # Collects reactions made and removed while the list is being paged; stays stale if paging fails
+        live = GiveawayEntries()
+        live.stale = True
+        live.withdrawn = set()
+        self.bot.db.giveaway_entries[message_id] = live
+        
+        entries = GiveawayEntries()
+        for reaction in message.reactions:
+            if str(reaction.emoji) == GIVEAWAY_EMOJI:
+                async for user in reaction.users(limit=None):
+                    if not user.bot:
+                        bonus = bool(bonus_role_id) and isinstance(user, discord.Member) and user.get_role(bonus_role_id) is not None
+                        entries.add(user.id, bonus)
+                break
+        
+        # Paged reactors may have withdrawn since their page was fetched
+        if live.cleared:
+            entries = GiveawayEntries()
+        for user_id in live.withdrawn:
+            entries.remove(user_id)
+        for user_id in live.ids:
+            entries.add(user_id, user_id in live.bonus)
+        
+        self.bot.db.giveaway_entries[message_id] = entries
+        logger.info(f"Reconciled giveaway {message_id}: {len(entries):,} entries")
+        return entries
+    
+    async def schedule_poll_close(self, poll_id: str, closes_at: datetime) -> str:
+        """
+        Schedule a poll to close.
+        Returns task ID.
+        """
+        task_id = f"poll_{poll_id}"
+        
+        self.scheduled_tasks[task_id] = {
+            'type': 'poll',
+            'poll_id': poll_id,
+            'guild_id': self.bot.db.polls[poll_id]['guild_id'],
+            'closes_at': closes_at,
+            'created_at': datetime.utcnow()
+        }
+        
+        delay = max((closes_at - datetime.utcnow()).total_seconds(), 0)
+        self.running_tasks[task_id] = asyncio.create_task(self._execute_poll_close(task_id, delay))
+        return task_id
+    
+    async def _execute_poll_close(self, task_id: str, delay: float):
+        """Close a poll and post its results from the running tallies."""
+        try:
+            await asyncio.sleep(delay)
+            
+            if task_id not in self.scheduled_tasks:
+                return
+            
+            key = self.scheduled_tasks[task_id]['poll_id']
+            poll = self.bot.db.polls.get(key)
+            self.bot.poll_editor.forget(key)
+            
+            if poll and not poll.get('closed'):
+                poll['closed'] = True
+                channel = self.bot.get_channel(poll['channel'])
+                if channel:
+                    embed = render_poll(poll, final=True)
+                    message = channel.get_partial_message(poll['message_id'])
+                    try:
+                        await self.bot.rest.background(channel, lambda: message.edit(embed=embed))
+                        await self.bot.rest.background(channel, lambda: channel.send(embed=embed, reference=message, mention_author=False))
+                    except discord.HTTPException as e:
+                        logger.warning(f"Failed to post results for poll {key}: {e}")
+            
+            self.cancel_task(task_id)
+        
+        except Exception as e:
+            logger.error(f"Error closing poll {task_id}: {e}")
+    
+    async def schedule_warning_expiry(self):
+        """
+        Arm the warning expiry timer for the next warning to lapse.
+        Only one timer runs at a time; it is re-armed if an earlier expiry appears.
+        """
+        next_expiry = self.bot.db.next_warning_expiry()
+        if next_expiry is None:
+            return
+        
+        task = self.running_tasks.get('warning_expiry')
+        if task and not task.done() and self.warning_expiry_time and self.warning_expiry_time <= next_expiry:
+            return
+        
+        if task:
+            task.cancel()
+        
+        self.warning_expiry_time = next_expiry
+        delay = max((next_expiry - datetime.utcnow()).total_seconds(), 0)
+        self.running_tasks['warning_expiry'] = asyncio.create_task(self._execute_warning_expiry(delay))
+    
+    async def _execute_warning_expiry(self, delay: float):
+        """Drop warnings that have lapsed and re-arm for the next one."""
+        try:
+            await asyncio.sleep(delay)
+            
+            expired = self.bot.db.expire_warnings()
+            if expired:
+                logger.info(f"Expired {expired} warning(s)")
+            
+            self.running_tasks.pop('warning_expiry', None)
+            self.warning_expiry_time = None
+            await self.schedule_warning_expiry()
+        
+        except Exception as e:
+            logger.error(f"Error expiring warnings: {e}")
+    
+    async def schedule_birthdays(self, retry_at: Optional[datetime] = None):
+        """
+        Arm the birthday timer for the next announcement due, or for midnight UTC when the
+        window of dates that can be due moves on. Re-armed if an earlier birthday is set.
+        Birthdays left unannounced by the last run wait until retry_at rather than firing at once.
+        """
+        now = datetime.utcnow()
+        next_run = datetime(now.year, now.month, now.day) + timedelta(days=1)
+        next_due = self.bot.db.next_birthday_due(now)
+        if next_due is not None:
+            if retry_at is not None:
+                next_due = max(next_due, retry_at)
+            next_run = min(next_run, next_due)
+        
+        task = self.running_tasks.get('birthdays')
+        if task and not task.done() and self.birthday_time and self.birthday_time <= next_run:
+            return
+        
+        if task:
+            task.cancel()
+        
+        self.birthday_time = next_run
+        delay = max((next_run - now).total_seconds(), 0)
+        self.running_tasks['birthdays'] = asyncio.create_task(self._execute_birthdays(delay))
+    
+    async def _execute_birthdays(self, delay: float):
+        """Announce the birthdays that are due and re-arm for the next one."""
+        await asyncio.sleep(delay)
+        self.running_tasks.pop('birthdays', None)
+        self.birthday_time = None
+        
+        # A failed run leaves its birthdays due, so it backs off like a partial one
+        retry = True
+        with self.bot.metrics.timer("task.birthdays"):
+            try:
+                retry = await self.announce_birthdays(self.bot.db.due_birthdays(datetime.utcnow())) > 0
+            except Exception as e:
+                logger.error(f"Error announcing birthdays: {e}")
+        
+        await self.schedule_birthdays(datetime.utcnow() + BIRTHDAY_RETRY if retry else None)
+    
+    async def announce_birthdays(self, due: List[Tuple[int, int, int]]) -> int:
+        """
+        Give birthday tokens and post one announcement per birthday channel. A birthday is only
+        marked celebrated once its announcement was sent. Returns how many were left for a retry.
+        """
+        by_guild: Dict[int, List[Tuple[int, int]]] = {}
+        for guild_id, user_id, year in due:
+            if (guild_id, user_id) not in self.birthdays_in_flight:
+                by_guild.setdefault(guild_id, []).append((user_id, year))
+        
+        announced = 0
+        claimed = {(guild_id, user_id) for guild_id, entries in by_guild.items() for user_id, _ in entries}
+        self.birthdays_in_flight |= claimed
+        try:
+            for guild_id, entries in by_guild.items():
+                guild = self.bot.get_guild(guild_id)
+                if not guild:
+                    continue
+                
+                channel_id = self.bot.db.get_guild_config(guild_id, 'birthday_channel')
+                channel = guild.get_channel(channel_id) if channel_id else None
+                if not channel:
+                    continue
+                
+                years = dict(entries)
+                fetched = await self.bot.members.fetch_many(guild, list(years))
+                members = [fetched[user_id] for user_id in years if user_id in fetched]
+                
+                for start in range(0, len(members), BIRTHDAY_BATCH_SIZE):
+                    batch = members[start:start + BIRTHDAY_BATCH_SIZE]
+                    mentions = [member.mention for member in batch]
+                    mentions = mentions[0] if len(mentions) == 1 else f"{', '.join(mentions[:-1])} and {mentions[-1]}"
+                    embed = BIRTHDAY_TEMPLATE.render(description=f"Wishing {mentions} a very happy birthday!")
+                    try:
+                        await self.bot.rest.background(channel, lambda: channel.send(embed=embed))
+                    except discord.HTTPException as e:
+                        logger.warning(f"Failed to announce birthdays in {guild.name}: {e}")
+                        continue
+                    
+                    for member in batch:
+                        self.bot.db.add_tokens(guild_id, member.id, BIRTHDAY_TOKENS)
+                        self.bot.db.mark_birthday_celebrated(guild_id, member.id, years[member.id])
+                        announced += 1
+        finally:
+            self.birthdays_in_flight -= claimed
+        
+        return len(claimed) - announced
+    
+    async def post_qotd_hour(self, hour: int):
+        """Post the question of the day for every guild scheduled at an hour, spread over the first minutes of it."""
+        guild_ids = sorted(self.bot.db.qotd_guilds(hour), key=qotd_offset)
+        if not guild_ids:
+            return
+        
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        pending = set()
+        for guild_id in guild_ids:
+            delay = start + qotd_offset(guild_id) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(pending) >= QOTD_CONCURRENCY:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.add(asyncio.create_task(self.post_qotd(guild_id)))
+        
+        if pending:
+            await asyncio.wait(pending)
+        logger.info(f"Posted QOTD for {len(guild_ids)} guild(s) at {hour:02d}:00 UTC")
+    
+    async def post_qotd(self, guild_id: int):
+        """Post a guild's next question of the day."""
+        try:
+            guild = self.bot.get_guild(guild_id)
+            if not guild:
+                return
+            
+            channel_id = self.bot.db.get_guild_config(guild_id, 'qotd_channel')
+            channel = guild.get_channel(channel_id) if channel_id else None
+            if not channel:
+                return
+            
+            embed = QOTD_TEMPLATE.render(description=self.bot.db.next_qotd_question(guild_id))
+            message = await self.bot.rest.background(channel, lambda: channel.send(embed=embed))
+            await self.bot.rest.background(channel, lambda: message.add_reaction("💭"))
+        except Exception as e:
+            logger.error(f"Error posting QOTD for guild {guild_id}: {e}")
+    
     def cancel_task(self, task_id: str) -> bool:
         """Cancel a scheduled task."""
         if task_id in self.running_tasks:
@@ -0,0 +1,164 @@
+import re
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One "<number><unit>" term of a duration, with optional separators after it.
+# Longer unit spellings come first so "min" isn't read as "m" followed by junk.
+DURATION_TERM = re.compile(
+    r"\s*(\d{1,9})\s*"
+    r"(weeks?|wks?|w|days?|d|hours?|hrs?|h|minutes?|mins?|m|seconds?|secs?|s)(?![a-z])"
+    r"\s*(?:,|and\b)?",
+    re.IGNORECASE
+)
+
+UNIT_SECONDS = {'w': 604800, 'd': 86400, 'h': 3600, 'm': 60, 's': 1}
+
+# [[YYYY-]MM-DD ]HH:MM[:SS] followed by an optional Z, UTC, UTC offset or IANA zone name
+ABSOLUTE_TIME = re.compile(
+    r"\s*(?:(?:(?P<year>\d{4})-)?(?P<month>\d{1,2})-(?P<day>\d{1,2})(?:\s+|T))?"
+    r"(?P<hour>\d{1,2}):(?P<minute>\d{2})(?::(?P<second>\d{2}))?"
+    r"\s*(?:(?P<utc>Z|UTC|GMT)|(?:UTC|GMT)?(?P<sign>[+-])(?P<offset_hours>\d{1,2})(?::?(?P<offset_minutes>\d{2}))?"
+    r"|(?P<zone>[A-Za-z_]+(?:/[A-Za-z0-9_+-]+)+))?\s*",
+    re.IGNORECASE
+)
+
+# A timezone on its own: UTC, an offset such as +2, -05:30 or UTC+5:45, or an IANA zone name
+UTC_OFFSET = re.compile(
+    r"\s*(?:(?P<utc>Z|UTC|GMT)|(?:UTC|GMT)?\s*(?P<sign>[+-])(?P<offset_hours>\d{1,2})(?::?(?P<offset_minutes>\d{2}))?"
+    r"|(?P<zone>[A-Za-z_]+(?:/[A-Za-z0-9_+-]+)+))\s*",
+    re.IGNORECASE
+)
+
+# Shown by commands when a time can't be parsed
+DURATION_EXAMPLES = "`30m`, `2h`, `1h30m`, `1d 12h`, `45 minutes`"
+TIME_EXAMPLES = "`30m`, `1h30m`, `2 hours`, `14:30`, `12-25 14:30`, `2024-12-25 14:30 UTC+2`, `2024-12-25 09:00 Europe/Berlin`"
+
+@lru_cache(maxsize=2048)
+def _duration_seconds(text: str) -> Optional[int]:
+    """Scan a normalized duration in one pass, returning its length in seconds."""
+    if not text:
+        return None
+    
+    total = 0
+    position = 0
+    while position < len(text):
+        match = DURATION_TERM.match(text, position)
+        if not match or match.end() == position:
+            return None
+        total += int(match.group(1)) * UNIT_SECONDS[match.group(2)[0]]
+        position = match.end()
+    return total
+
+def parse_duration(text: str) -> Optional[timedelta]:
+    """Parse a duration such as 30m, 1h30m, "2 hours" or "1d, 6h and 30m"."""
+    seconds = _duration_seconds(text.strip().lower())
+    if seconds is None:
+        return None
+    try:
+        return timedelta(seconds=seconds)
+    except OverflowError:
+        return None
+
+@lru_cache(maxsize=1024)
+def _absolute_parts(text: str) -> Optional[Tuple[Optional[int], Optional[int], Optional[int], int, int, int, Optional[tzinfo]]]:
+    """Split an absolute time into (year, month, day, hour, minute, second, zone)."""
+    match = ABSOLUTE_TIME.fullmatch(text)
+    if not match:
+        return None
+    
+    parts = match.groupdict()
+    zone: Optional[tzinfo] = None
+    if parts['utc']:
+        zone = timezone.utc
+    elif parts['sign']:
+        offset = timedelta(hours=int(parts['offset_hours']), minutes=int(parts['offset_minutes'] or 0))
+        if offset >= timedelta(hours=24):
+            return None
+        zone = timezone(-offset if parts['sign'] == '-' else offset)
+    elif parts['zone']:
+        try:
+            zone = ZoneInfo(parts['zone'])
+        except (ZoneInfoNotFoundError, ValueError, OSError):
+            return None
+    
+    return (
+        int(parts['year']) if parts['year'] else None,
+        int(parts['month']) if parts['month'] else None,
+        int(parts['day']) if parts['day'] else None,
+        int(parts['hour']),
+        int(parts['minute']),
+        int(parts['second'] or 0),
+        zone
+    )
+
+def parse_datetime(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Parse an absolute time as a naive UTC datetime. Times without a zone are UTC.
+    
+    A time without a date means the next time it comes round, so "09:00" is
+    tomorrow morning if 09:00 has already passed today. A date without a year
+    is in the current year, as it always was, even if it has passed.
+    """
+    parts = _absolute_parts(text.strip())
+    if parts is None:
+        return None
+    
+    year, month, day, hour, minute, second, zone = parts
+    zone = zone or timezone.utc
+    now = now or datetime.utcnow()
+    local_now = now.replace(tzinfo=timezone.utc).astimezone(zone)
+    
+    try:
+        local = datetime(
+            year or local_now.year,
+            month or local_now.month,
+            day or local_now.day,
+            hour, minute, second,
+            tzinfo=zone
+        )
+        if month is None and local <= local_now:
+            local = local + timedelta(days=1)
+    except ValueError:
+        return None
+    
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+def parse_time(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Parse a duration from now or an absolute time, as a naive UTC datetime."""
+    now = now or datetime.utcnow()
+    duration = parse_duration(text)
+    if duration is not None:
+        try:
+            return now + duration
+        except OverflowError:
+            return None
+    return parse_datetime(text, now)
+
+@lru_cache(maxsize=256)
+def parse_timezone(text: str) -> Optional[tzinfo]:
+    """Parse a timezone: UTC, a fixed offset, or an IANA zone name that keeps following its DST rules."""
+    match = UTC_OFFSET.fullmatch(text)
+    if not match:
+        return None
+    
+    parts = match.groupdict()
+    if parts['utc']:
+        return timezone.utc
+    if parts['sign']:
+        offset = timedelta(hours=int(parts['offset_hours']), minutes=int(parts['offset_minutes'] or 0))
+        if offset >= timedelta(hours=24):
+            return None
+        return timezone(-offset if parts['sign'] == '-' else offset)
+    
+    try:
+        return ZoneInfo(parts['zone'])
+    except (ZoneInfoNotFoundError, ValueError, OSError):
+        return None
+
+def timezone_name(zone: tzinfo) -> str:
+    """Get a name that parse_timezone reads back as the same zone, e.g. UTC+05:30 or Europe/Berlin."""
+    return zone.key if isinstance(zone, ZoneInfo) else str(zone)
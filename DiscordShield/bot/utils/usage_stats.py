@@ -0,0 +1,190 @@
+import math
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, date
+from typing import Dict, List, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HyperLogLog:
+    """Fixed-size cardinality estimator for unique user counts."""
+    
+    def __init__(self, precision: int = 10):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+        self.alpha = 0.7213 / (1 + 1.079 / self.size)
+    
+    @staticmethod
+    def _hash(value: int) -> int:
+        """Mix an integer ID into 64 well-distributed bits (splitmix64)."""
+        z = (value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        return z ^ (z >> 31)
+    
+    def add(self, value: int):
+        """Add a value to the estimator."""
+        h = self._hash(value)
+        index = h >> (64 - self.precision)
+        remainder = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def merge(self, other: 'HyperLogLog'):
+        """Fold another estimator of the same precision into this one."""
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+    
+    def count(self) -> int:
+        """Estimate the number of distinct values added."""
+        estimate = self.alpha * self.size * self.size / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        
+        # Small-range correction
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        
+        return int(round(estimate))
+
+class UniqueUsers:
+    """Distinct user counter that stays exact until a HyperLogLog would be smaller."""
+    
+    __slots__ = ('precision', 'exact', 'sketch')
+    
+    def __init__(self, precision: int = 10):
+        self.precision = precision
+        self.exact: Optional[array] = array('Q')
+        self.sketch: Optional[HyperLogLog] = None
+    
+    def add(self, user_id: int):
+        """Add a user to the count."""
+        if self.exact is None:
+            self.sketch.add(user_id)
+            return
+        if user_id in self.exact:
+            return
+        self.exact.append(user_id)
+        
+        # Switch once the ID list outgrows the registers it would be replaced by
+        if len(self.exact) * self.exact.itemsize > (1 << self.precision):
+            self._to_sketch()
+    
+    def _to_sketch(self):
+        """Replace the exact ID list with an estimator."""
+        self.sketch = HyperLogLog(self.precision)
+        for user_id in self.exact:
+            self.sketch.add(user_id)
+        self.exact = None
+    
+    def merge(self, other: 'UniqueUsers'):
+        """Fold another counter of the same precision into this one."""
+        if other.exact is not None:
+            for user_id in other.exact:
+                self.add(user_id)
+            return
+        if self.exact is not None:
+            self._to_sketch()
+        self.sketch.merge(other.sketch)
+    
+    def count(self) -> int:
+        """Get the exact or estimated number of distinct users."""
+        if self.exact is not None:
+            return len(self.exact)
+        return self.sketch.count()
+
+class UsageBucket:
+    """Command usage aggregated over one time bucket."""
+    
+    __slots__ = ('commands', 'successes', 'per_command', 'users')
+    
+    def __init__(self, precision: int = 10):
+        self.commands = 0
+        self.successes = 0
+        self.per_command: Dict[str, int] = {}
+        self.users = UniqueUsers(precision)
+    
+    def record(self, user_id: int, command: str, success: bool):
+        """Count a single command."""
+        self.commands += 1
+        if success:
+            self.successes += 1
+        self.per_command[command] = self.per_command.get(command, 0) + 1
+        self.users.add(user_id)
+    
+    def merge(self, other: 'UsageBucket'):
+        """Fold another bucket into this one."""
+        self.commands += other.commands
+        self.successes += other.successes
+        for command, count in other.per_command.items():
+            self.per_command[command] = self.per_command.get(command, 0) + count
+        self.users.merge(other.users)
+    
+    def top_commands(self, limit: int = 5) -> List[Tuple[str, int]]:
+        """Get the most used commands in this bucket."""
+        return sorted(self.per_command.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+class UsageStats:
+    """Rolling per-guild command usage counters bucketed by hour and day."""
+    
+    # HyperLogLog precision per bucket kind; hourly buckets are only ever read
+    # merged into a 24h figure, so they trade accuracy (~4.6%) for 512 B each
+    HOURLY_PRECISION = 9
+    DAILY_PRECISION = 10
+    
+    def __init__(self, hourly_buckets: int = 48, daily_buckets: int = 30):
+        self.hourly_buckets = hourly_buckets
+        self.daily_buckets = daily_buckets
+        
+        # guild -> bucket start (hour or day number since epoch) -> bucket
+        self.hourly: Dict[int, OrderedDict] = {}
+        self.daily: Dict[int, OrderedDict] = {}
+    
+    @staticmethod
+    def _bucket(buckets: OrderedDict, key: int, limit: int, precision: int) -> UsageBucket:
+        """Get or create a bucket, evicting the oldest past the limit."""
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = UsageBucket(precision)
+            while len(buckets) > limit:
+                buckets.popitem(last=False)
+        return bucket
+    
+    def record(self, guild_id: int, user_id: int, command: str, success: bool, timestamp: Optional[float] = None):
+        """Update the hourly and daily buckets for a command."""
+        timestamp = timestamp or time.time()
+        hour = int(timestamp // 3600)
+        
+        hourly = self.hourly.setdefault(guild_id, OrderedDict())
+        daily = self.daily.setdefault(guild_id, OrderedDict())
+        
+        self._bucket(hourly, hour, self.hourly_buckets, self.HOURLY_PRECISION).record(user_id, command, success)
+        self._bucket(daily, hour // 24, self.daily_buckets, self.DAILY_PRECISION).record(user_id, command, success)
+    
+    def day(self, guild_id: int, day: date) -> Optional[UsageBucket]:
+        """Get the aggregate for a single UTC day."""
+        day_number = (day - date(1970, 1, 1)).days
+        return self.daily.get(guild_id, {}).get(day_number)
+    
+    def last_hours(self, guild_id: int, hours: int = 24) -> UsageBucket:
+        """Combine the hourly buckets covering the last N hours."""
+        since = int(time.time() // 3600) - hours + 1
+        combined = UsageBucket(self.HOURLY_PRECISION)
+        for hour, bucket in self.hourly.get(guild_id, {}).items():
+            if hour >= since:
+                combined.merge(bucket)
+        return combined
+    
+    def daily_rows(self, guild_id: int) -> List[Dict[str, Any]]:
+        """Get one summary row per stored day, oldest first."""
+        rows = []
+        for day_number, bucket in self.daily.get(guild_id, {}).items():
+            rows.append({
+                'date': datetime.utcfromtimestamp(day_number * 86400).date(),
+                'commands': bucket.commands,
+                'successes': bucket.successes,
+                'unique_users': bucket.users.count()
+            })
+        return rows
@@ -2,21 +2,17 @@ import os
 import asyncio
 import logging
 from bot.core import DiscordBot
+from bot.utils.metrics import MetricsServer
+from bot.utils.log_sink import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging (JSON lines written from a background thread, rotated and gzipped)
+log_sink = setup_logging()
 
 logger = logging.getLogger(__name__)
 
 async def main():
     """Main entry point for the Discord bot."""
+    metrics_server = None
     try:
         # Get Discord token from environment
         token = os.getenv('DISCORD_TOKEN')
@@ -26,6 +22,12 @@ async def main():
         
         # Initialize and start the bot
         bot = DiscordBot()
+        bot.metrics.gauge('log_queue_backlog', "Log records waiting to be written", lambda: log_sink.backlog)
+        
+        # Local metrics endpoint (/latency JSON, /metrics for Prometheus)
+        metrics_server = MetricsServer(bot, port=int(os.getenv('METRICS_PORT', 9108)))
+        await metrics_server.start()
+        
         await bot.start(token)
         
     except KeyboardInterrupt:
@@ -33,7 +35,10 @@ async def main():
     except Exception as e:
         logger.error(f"Fatal error starting bot: {e}")
     finally:
+        if metrics_server:
+            await metrics_server.stop()
         logger.info("Bot shutdown complete")
+        log_sink.stop()
 
 if __name__ == "__main__":
     try: